@@ -0,0 +1,239 @@
+# animation.py
+"""Ключевая анимация трансформаций, вычисляемая пакетом для всех объектов сразу.
+
+Дорожка (Track) — ключевые кадры одного канала: позиции, углов Эйлера или масштаба.
+Animator хранит дорожки всех анимированных объектов в общих массивах, дополненных до
+наибольшего числа ключей: по строке на узел сцены или на копию InstancedMesh и по три
+канала на строку. Шаг анимации — несколько операций NumPy над всеми строками сразу:
+локальное время с учётом зацикливания, поиск отрезка между ключами, сглаживание и
+интерполяция, затем compose_matrices собирает стопку матриц модели (R, 4, 4). Число
+операций не зависит от числа объектов. Компоненты и локальные матрицы узлов — строки
+общих массивов Animator, которые перезаписываются на месте одним присваиванием; узлам
+остаётся только пометка об изменении. Копиям InstancedMesh матрицы передаются одним
+массивом.
+"""
+
+import numpy as np
+from scene import SceneNode, InstancedMesh, compose_matrices
+
+# Функции сглаживания параметра отрезка u в [0, 1]; номер в кортеже — код в массивах
+EASINGS = ("linear", "ease_in", "ease_out", "ease_in_out", "step")
+CHANNELS = ("position", "rotation", "scale")
+DEFAULTS = {"position": (0.0, 0.0, 0.0), "rotation": (0.0, 0.0, 0.0), "scale": (1.0, 1.0, 1.0)}
+
+
+def ease(u, codes):
+    """Сглаживает параметры u (R,) функциями с кодами codes (R,) из EASINGS."""
+    return np.select([codes == 1, codes == 2, codes == 3, codes == 4],
+                     [u * u, u * (2.0 - u), u * u * (3.0 - 2.0 * u), np.floor(u)], u)
+
+
+class Track:
+    """Ключевые кадры одного канала.
+
+    times — моменты ключей (K,) по возрастанию в секундах; values — значения (K, 3) для
+    одного объекта или (M, K, 3) для M копий InstancedMesh с общими моментами ключей.
+    loop повторяет дорожку с периодом от первого до последнего ключа, иначе значение
+    держится на крайних ключах. easing — функция сглаживания между ключами из EASINGS.
+    """
+
+    def __init__(self, times, values, loop=True, easing="linear"):
+        self.times = np.asarray(times, dtype=np.float64).ravel()
+        if len(self.times) == 0:
+            raise ValueError("Track needs at least one keyframe.")
+        values = np.asarray(values, dtype=np.float64)
+        self.values = values.reshape(-1 if values.ndim == 3 else 1, len(self.times), 3)
+        if np.any(np.diff(self.times) < 0):
+            raise ValueError("Keyframe times must be in ascending order.")
+        if easing not in EASINGS:
+            raise ValueError(f"Unknown easing {easing!r}; expected one of {', '.join(EASINGS)}.")
+        self.loop = loop
+        self.easing = easing
+
+    @classmethod
+    def constant(cls, value, count=1):
+        """Дорожка из одного ключа: значение не меняется."""
+        return cls([0.0], np.broadcast_to(np.asarray(value, dtype=np.float64), (count, 1, 3)))
+
+    def __len__(self):
+        return len(self.times)
+
+
+class _Channel:
+    """Дорожки одного канала всех строк: массивы, дополненные до общего числа ключей."""
+
+    def __init__(self):
+        self.times = np.zeros((0, 1))
+        self.values = np.zeros((0, 1, 3))
+        self.counts = np.zeros(0, dtype=np.intp)
+        self.loop = np.zeros(0, dtype=bool)
+        self.easing = np.zeros(0, dtype=np.intp)
+
+    def append(self, track, rows):
+        keys = max(self.times.shape[1], len(track))
+        # Лишние ключи заполняются последним: моменты +inf не попадают в поиск отрезка
+        times = np.full((rows, keys), np.inf)
+        times[:, :len(track)] = track.times
+        values = np.empty((rows, keys, 3))
+        values[:] = np.broadcast_to(track.values, (rows, len(track), 3))[:, -1:]
+        values[:, :len(track)] = np.broadcast_to(track.values, (rows, len(track), 3))
+        self.times = np.concatenate((self._widen(self.times, keys, np.inf), times))
+        self.values = np.concatenate((self._widen(self.values, keys, None), values))
+        self.counts = np.concatenate((self.counts, np.full(rows, len(track))))
+        self.loop = np.concatenate((self.loop, np.full(rows, track.loop)))
+        self.easing = np.concatenate((self.easing, np.full(rows, EASINGS.index(track.easing))))
+
+    def remove(self, keep):
+        self.times, self.values = self.times[keep], self.values[keep]
+        self.counts, self.loop, self.easing = self.counts[keep], self.loop[keep], self.easing[keep]
+
+    @staticmethod
+    def _widen(array, keys, fill):
+        extra = keys - array.shape[1]
+        if extra <= 0:
+            return array
+        pad = array[:, -1:] if fill is None else np.full(array[:, :1].shape, fill)
+        return np.concatenate((array, np.repeat(pad, extra, axis=1)), axis=1)
+
+    def evaluate(self, time):
+        """Значения канала (R, 3) в локальные моменты time (R,)."""
+        rows = np.arange(len(self.counts))
+        last = self.counts - 1
+        first_time = self.times[:, 0]
+        last_time = self.times[rows, last]
+        duration = last_time - first_time
+        looping = self.loop & (duration > 0)
+        local = np.where(looping, first_time + np.mod(time - first_time, np.where(looping, duration, 1.0)),
+                         np.clip(time, first_time, last_time))
+
+        # Отрезок [key, key + 1], в который попадает локальное время
+        key = np.clip((self.times <= local[:, None]).sum(axis=1) - 1, 0, np.maximum(last - 1, 0))
+        following = np.minimum(key + 1, last)
+        start, end = self.times[rows, key], self.times[rows, following]
+        span = end - start
+        u = np.clip((local - start) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+        u = ease(np.where(span > 0, u, 0.0), self.easing)
+        before, after = self.values[rows, key], self.values[rows, following]
+        return before + u[:, None] * (after - before)
+
+
+class Animator:
+    """Анимации узлов сцены и копий InstancedMesh, вычисляемые одним пакетом за шаг.
+
+    После apply(time) стопка матриц модели всех строк лежит в self.matrices (только для
+    чтения); узлы и копии получают свои матрицы сразу. Позиция, углы, масштаб и локальная
+    матрица анимированного узла — представления строк массивов Animator, поэтому они
+    меняются на месте при каждом apply.
+    """
+
+    def __init__(self):
+        self.channels = {name: _Channel() for name in CHANNELS}
+        self.start = np.zeros(0)   # Момент начала анимации каждой строки
+        self.speed = np.zeros(0)   # Скорость воспроизведения каждой строки
+        self.targets = []          # (цель, первая строка, число строк)
+        self.matrices = np.zeros((0, 4, 4))
+        self.time = None
+        # Массивы позиций, углов, масштабов и матриц всех строк; узлы ссылаются на свои строки
+        self._transforms = None
+        self._bindings = []        # (узел, представления его строки)
+
+    def __len__(self):
+        return len(self.start)
+
+    def add(self, target, position=None, rotation=None, scale=None, start=0.0, speed=1.0):
+        """Анимирует узел сцены или все копии InstancedMesh дорожками Track.
+
+        Для узла недостающие каналы держат его текущие значения; для копий — нулевые
+        позицию и углы и единичный масштаб, а число копий берётся из дорожек.
+        Повторный вызов для той же цели заменяет её анимацию.
+        """
+        self.remove(target)
+        tracks = {"position": position, "rotation": rotation, "scale": scale}
+        if isinstance(target, InstancedMesh):
+            counts = {len(track.values) for track in tracks.values() if track is not None}
+            if len(counts) != 1:
+                raise ValueError("Instance tracks must all animate the same number of instances.")
+            rows = counts.pop()
+            for name, track in tracks.items():
+                if track is None:
+                    tracks[name] = Track.constant(DEFAULTS[name], rows)
+        elif isinstance(target, SceneNode):
+            rows = 1
+            for name, track in tracks.items():
+                if track is None:
+                    tracks[name] = Track.constant(getattr(target, name))
+                elif len(track.values) != 1:
+                    raise ValueError("A scene node track must have values of shape (K, 3).")
+        else:
+            raise TypeError("Only SceneNode and InstancedMesh targets can be animated.")
+
+        for name, channel in self.channels.items():
+            channel.append(tracks[name], rows)
+        self.targets.append((target, len(self.start), rows))
+        self.start = np.concatenate((self.start, np.full(rows, float(start))))
+        self.speed = np.concatenate((self.speed, np.full(rows, float(speed))))
+        self.time = None
+        self._transforms = None
+
+    def remove(self, target):
+        """Прекращает анимацию цели; её трансформация остаётся последней вычисленной."""
+        for index, (other, first, rows) in enumerate(self.targets):
+            if other is target:
+                keep = np.ones(len(self.start), dtype=bool)
+                keep[first:first + rows] = False
+                for channel in self.channels.values():
+                    channel.remove(keep)
+                self.start, self.speed = self.start[keep], self.speed[keep]
+                del self.targets[index]
+                self.targets = [(other, start - rows if start > first else start, count)
+                                for other, start, count in self.targets]
+                self.time = None
+                self._transforms = None
+                return True
+        return False
+
+    def evaluate(self, time):
+        """Позиции, углы и масштабы всех строк (R, 3) в момент time без изменения целей."""
+        local = (time - self.start) * self.speed
+        return tuple(self.channels[name].evaluate(local) for name in CHANNELS)
+
+    def apply(self, time):
+        """Вычисляет анимации в момент time и раздаёт матрицы целям; возвращает self.matrices."""
+        if time == self.time or not len(self):
+            return self.matrices
+        positions, rotations, scales = self.evaluate(time)
+        if self._transforms is None:
+            self._bind()
+        transforms = self._transforms
+        transforms[0][:], transforms[1][:], transforms[2][:] = positions, rotations, scales
+        transforms[3][:] = compose_matrices(positions, rotations, scales)
+        # Узлы уже видят новые значения; остаётся пометить их мировые матрицы устаревшими
+        for node, views in self._bindings:
+            if node.local_matrix is views[3]:
+                node.mark_dirty()
+            else:
+                node.set_composed_transform(*views)  # Трансформацию узла заменили: привязываем снова
+        for target, first, rows in self.targets:
+            if isinstance(target, InstancedMesh):
+                target.set_instances(self.matrices[first:first + rows])
+        self.time = time
+        return self.matrices
+
+    def _bind(self):
+        """Выделяет массивы трансформаций всех строк и привязывает к ним узлы."""
+        rows = len(self)
+        self._transforms = (np.zeros((rows, 3)), np.zeros((rows, 3)), np.ones((rows, 3)),
+                            np.tile(np.eye(4), (rows, 1, 1)))
+        self.matrices = _read_only(self._transforms[3])
+        self._bindings = []
+        for target, first, _ in self.targets:
+            if not isinstance(target, InstancedMesh):
+                views = tuple(_read_only(array[first]) for array in self._transforms)
+                target.set_composed_transform(*views)
+                self._bindings.append((target, views))
+
+
+def _read_only(array):
+    view = array.view()
+    view.setflags(write=False)
+    return view
@@ -0,0 +1,274 @@
+# benchmark.py
+"""Воспроизводимые замеры производительности рендера без вывода в терминал.
+
+Примеры:
+    python benchmark.py                          # все сцены, таблица в консоль
+    python benchmark.py --output results.json    # сохранить результаты
+    python benchmark.py --compare results.json   # сравнить с прошлым запуском
+    python benchmark.py --scene cubes-64 sphere-32 --frames 50
+    python benchmark.py --width 400 --height 200 --workers 8   # растеризация плитками в 8 процессах
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+from camera import Camera
+from light import Light
+from object import Cube, Sphere, LevelOfDetail
+from profiler import FrameProfiler
+from renderer import Renderer
+from scene import SceneNode, InstancedMesh
+from vector import Vector3
+
+
+def make_camera():
+    """Камера демо-сцены из main.py."""
+    return Camera(
+        position=Vector3(0, 0, -10),
+        direction=Vector3(0, 0, 1),
+        up_vector=Vector3(0, 1, 0),
+        projection_type="perspective",
+        fov=90,
+        near=0.1,
+        far=100
+    )
+
+
+def grid_positions(count, depth=6.0):
+    """Детерминированная сетка позиций, помещающаяся в кадр."""
+    side = int(np.ceil(np.sqrt(count)))
+    xs = np.linspace(-9, 9, side) if side > 1 else np.zeros(1)
+    ys = np.linspace(-4.5, 4.5, side) if side > 1 else np.zeros(1)
+    positions = [(x, y, depth) for y in ys for x in xs]
+    return positions[:count], 18.0 / max(side, 1)
+
+
+def cubes_scene(count):
+    positions, spacing = grid_positions(count)
+    objects = [Cube(size=min(1.5, spacing * 0.6), color=(255, 100 + i % 156, 100)) for i in range(count)]
+    lights = [Light(Vector3(-5, 3, 0), color=(255, 255, 255))]
+    return objects, positions, lights
+
+
+def layers_scene(layers, count):
+    """Несколько одинаковых сеток кубов друг за другом: ближний слой закрывает большую часть дальних."""
+    objects, positions = [], []
+    for layer in range(layers):
+        grid, spacing = grid_positions(count, depth=4.0 + 5.0 * layer)
+        objects += [Cube(size=spacing * 0.9, color=(255, 100 + (layer * 40 + i) % 156, 100)) for i in range(count)]
+        positions += grid
+    lights = [Light(Vector3(-5, 3, 0), color=(255, 255, 255))]
+    return objects, positions, lights
+
+
+def sphere_scene(segments, smooth=False):
+    objects = [Sphere(radius=2, color=(200, 200, 255), segments=segments)]
+    objects[0].smooth_shading = smooth  # Гуро по сглаженным нормалям вершин
+    lights = [Light(Vector3(-5, 3, 0), color=(255, 255, 255))]
+    return objects, [(0, 0, 5)], lights
+
+
+def spheres_scene(count, lod):
+    """Сферы по 64 сегмента на разной глубине; с lod детализация выбирается по размеру на экране."""
+    positions, spacing = grid_positions(count)
+    positions = [(x, y, 4 + 40 * i / count) for i, (x, y, _) in enumerate(positions)]
+    radius = min(2.0, spacing * 0.4)
+    if lod:
+        objects = [LevelOfDetail(lambda s: Sphere(radius, (200, 200, 255), s), segments=(8, 16, 32, 64))] * count
+    else:
+        objects = [Sphere(radius, (200, 200, 255), 64)] * count
+    lights = [Light(Vector3(-5, 3, 0), color=(255, 255, 255))]
+    return objects, positions, lights
+
+
+def lights_scene(count):
+    objects = [Cube(size=1.5, color=(255, 100, 100)), Cube(size=1.5, color=(100, 255, 100)),
+               Cube(size=1.5, color=(100, 100, 255)), Cube(size=1.5, color=(255, 255, 100))]
+    positions = [(-3, 0, 3), (3, 0, 3), (0, 3, 3), (0, -3, 3)]
+    angles = np.arange(count) * 2 * np.pi / count
+    lights = [Light(Vector3(6 * np.cos(a), 6 * np.sin(a), 0), color=(255, 255, 255), intensity=1.0 / count)
+              for a in angles]
+    return objects, positions, lights
+
+
+def dashboard_scene(count, moving):
+    """Сетка кубов, из которых вращаются только moving; остальные неподвижны."""
+    objects, positions, lights = cubes_scene(count)
+    return objects, positions, lights, set(range(0, count, max(count // moving, 1)))
+
+
+def instances_scene(count):
+    """Поле копий одного куба: одна общая геометрия и массивы матриц и цветов."""
+    side = int(np.ceil(np.sqrt(count)))
+    xs, ys = np.meshgrid(np.linspace(-30, 30, side), np.linspace(-15, 15, side))
+    positions = np.stack((xs.ravel(), ys.ravel(), np.full(side * side, 20.0)), axis=1)[:count]
+    colors = np.stack((np.full(count, 255), 100 + np.arange(count) % 156, np.full(count, 100)), axis=1)
+    field = InstancedMesh(Cube(size=min(0.5, 36.0 / side)))
+    field.set_transforms(positions, colors=colors)
+    lights = [Light(Vector3(-5, 3, 0), color=(255, 255, 255))]
+    return [field], [(0, 0, 0)], lights
+
+
+# Стандартный набор сцен: имя -> построитель (объекты, позиции, источники света)
+SCENES = {
+    "cubes-4": lambda: cubes_scene(4),
+    "cubes-64": lambda: cubes_scene(64),
+    "cubes-256": lambda: cubes_scene(256),
+    "sphere-8": lambda: sphere_scene(8),
+    "sphere-16": lambda: sphere_scene(16),
+    "sphere-32": lambda: sphere_scene(32),
+    "sphere-64": lambda: sphere_scene(64),
+    "sphere-32-smooth": lambda: sphere_scene(32, smooth=True),
+    "spheres-16": lambda: spheres_scene(16, lod=False),
+    "spheres-16-lod": lambda: spheres_scene(16, lod=True),
+    "lights-1": lambda: lights_scene(1),
+    "lights-8": lambda: lights_scene(8),
+    "lights-32": lambda: lights_scene(32),
+    "dashboard-256": lambda: dashboard_scene(256, 4),
+    "layers-4x64": lambda: layers_scene(4, 64),
+    "instances-1k": lambda: instances_scene(1000),
+    "instances-10k": lambda: instances_scene(10000),
+}
+
+
+def frame_checksum(framebuffer):
+    """Контрольная сумма символов и цветов кадра: позволяет заметить изменения изображения между коммитами."""
+    digest = hashlib.sha1(framebuffer.glyphs.tobytes())
+    palette = np.array([(0, 0, 0)] + framebuffer.palette[1:], dtype=np.uint8)
+    digest.update(palette[framebuffer.colors].tobytes())
+    return digest.hexdigest()[:16]
+
+
+def run_scene(name, frames=30, warmup=2, width=80, height=40, workers=1, tile_size=64, static_cache=False,
+              occlusion_culling=False):
+    """Рендерит сцену frames раз без вывода и возвращает словарь с метриками.
+
+    Контрольная сумма берётся с самого первого кадра (t = 0), поэтому не зависит от числа кадров.
+    Построитель сцены может вернуть четвёртым элементом номера анимируемых объектов
+    (по умолчанию вращаются все).
+    """
+    objects, positions, lights, *animated = SCENES[name]()
+    animated = animated[0] if animated else None
+    camera = make_camera()
+    renderer = Renderer(width, height, workers=workers, tile_size=tile_size, static_cache=static_cache,
+                        occlusion_culling=occlusion_culling)
+    nodes = [obj if isinstance(obj, SceneNode) else SceneNode(obj, position=position)
+             for obj, position in zip(objects, positions)]
+    # Копии InstancedMesh вращаются по отдельности, как отдельные объекты других сцен
+    instance_positions = [node.matrices[:, :3, 3].copy() if isinstance(node, InstancedMesh) else None
+                          for node in nodes]
+
+    profiler = FrameProfiler(window=frames)
+    stage_totals = {}
+    for frame in range(warmup + frames):
+        t = frame * 0.05  # Фиксированный шаг анимации: кадры одинаковы между запусками
+        profiler.begin_frame()
+        for i, node in enumerate(nodes):
+            if animated is not None and i not in animated:
+                continue
+            if instance_positions[i] is not None:
+                k = np.arange(len(node))
+                rotations = np.stack((np.full(k.size, t * 0.6), t * (1 + k % 3), np.zeros(k.size)), axis=1)
+                node.set_transforms(instance_positions[i], rotations)
+            else:
+                node.rotation = (t * 0.6, t * (1 + i % 3), 0)
+        framebuffer = renderer.render_offscreen(nodes, camera, lights)
+
+        if frame == 0:
+            checksum = frame_checksum(framebuffer)
+        if frame < warmup:
+            continue
+        profiler.end_frame(counters=renderer.frame_stats)
+        for stage, seconds in renderer.stage_times.items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+
+    renderer.close()
+
+    summary = profiler.summary()
+    frame_ms = summary["stages"]["frame"]
+    return {
+        "scene": name,
+        "frames": frames,
+        "width": renderer.screen_width,
+        "height": renderer.screen_height,
+        "workers": workers,
+        "fps": 1000.0 / frame_ms["mean"],
+        "frame_ms": {key: frame_ms[key] for key in ("mean", "p50", "p95", "p99")},
+        "stages_ms": {stage: total / frames * 1000.0 for stage, total in stage_totals.items()},
+        "counters": {name: values["mean"] for name, values in summary["counters"].items()},
+        "checksum": checksum,
+    }
+
+
+def environment():
+    """Сведения об окружении для сравнения результатов между машинами и коммитами."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def print_table(results, baseline=None):
+    baseline = {r["scene"]: r for r in (baseline or {}).get("results", [])}
+    print(f"{'scene':<12} {'fps':>9} {'mean ms':>9} {'p95 ms':>9}  stages (ms)")
+    for result in results:
+        stages = " ".join(f"{stage}={ms:.2f}" for stage, ms in result["stages_ms"].items())
+        line = (f"{result['scene']:<12} {result['fps']:>9.1f} {result['frame_ms']['mean']:>9.2f} "
+                f"{result['frame_ms']['p95']:>9.2f}  {stages}")
+        old = baseline.get(result["scene"])
+        if old:
+            line += f"  x{result['fps'] / old['fps']:.2f} vs baseline"
+            if old.get("checksum") != result["checksum"]:
+                line += " (image changed)"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the renderer on standard scenes without terminal output.")
+    parser.add_argument("--scene", nargs="+", choices=sorted(SCENES), help="scenes to run (default: all)")
+    parser.add_argument("--frames", type=int, default=30, help="measured frames per scene")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured frames per scene")
+    parser.add_argument("--width", type=int, default=80, help="renderer width (doubled internally)")
+    parser.add_argument("--height", type=int, default=40, help="renderer height")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="rasterizer processes (0 = one per CPU core, 1 = single process)")
+    parser.add_argument("--tile-size", type=int, default=64, help="screen tile size for parallel rasterization")
+    parser.add_argument("--static-cache", action="store_true",
+                        help="cache unchanged objects in a static layer between frames")
+    parser.add_argument("--occlusion", action="store_true",
+                        help="draw front to back and reject occluded objects and triangles (Hi-Z)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    workers = args.workers if args.workers > 0 else None
+    results = [run_scene(name, args.frames, args.warmup, args.width, args.height, workers, args.tile_size,
+                         args.static_cache, args.occlusion)
+               for name in (args.scene or SCENES)]
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
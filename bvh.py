@@ -0,0 +1,349 @@
+# bvh.py
+"""Иерархии ограничивающих объёмов (BVH) для пространственных запросов.
+
+BVH строится по осевым рамкам (AABB) элементов: элементы упорядочиваются по кодам
+Мортона центров, группируются в листья по leaf_size штук, а листья попарно
+объединяются в уровни до корня. Дерево хранится массивами по уровням, поэтому и
+обновление рамок, и запросы выполняются векторно — по одному проходу на уровень,
+то есть за O(log N) операций NumPy плюс размер ответа.
+"""
+
+import numpy as np
+from scene import SceneNode, InstancedMesh, iter_drawables
+
+LEAF_SIZE = 4
+# Дерево перестраивается, когда его стоимость выросла во столько раз с момента постройки
+REBUILD_THRESHOLD = 1.5
+# Сетки с меньшим числом треугольников проверяются лучом целиком, без BVH
+MESH_BVH_MIN_TRIANGLES = 64
+
+
+def morton_codes(points):
+    """30-битные коды Мортона точек (N, 3), нормированных по их общей рамке."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    low = points.min(axis=0)
+    span = points.max(axis=0) - low
+    span[span == 0] = 1.0
+    quantized = ((points - low) / span * 1023).astype(np.uint64)
+
+    # Раздвигаем 10 бит каждой координаты так, чтобы между ними было по два нулевых бита
+    spread = quantized
+    spread = (spread | (spread << np.uint64(16))) & np.uint64(0x030000FF)
+    spread = (spread | (spread << np.uint64(8))) & np.uint64(0x0300F00F)
+    spread = (spread | (spread << np.uint64(4))) & np.uint64(0x030C30C3)
+    spread = (spread | (spread << np.uint64(2))) & np.uint64(0x09249249)
+    return spread[:, 0] | (spread[:, 1] << np.uint64(1)) | (spread[:, 2] << np.uint64(2))
+
+
+def surface_areas(mins, maxs):
+    extent = np.maximum(maxs - mins, 0.0)
+    return 2.0 * (extent[:, 0] * extent[:, 1] + extent[:, 1] * extent[:, 2] + extent[:, 2] * extent[:, 0])
+
+
+def ray_boxes(origin, direction, mins, maxs):
+    """Пересечение луча с рамками (K,): параметры входа и выхода (tmin, tmax).
+
+    Луч пересекает рамку, если tmax >= max(tmin, 0).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse = 1.0 / np.asarray(direction, dtype=np.float64)
+        t1 = (mins - origin) * inverse
+        t2 = (maxs - origin) * inverse
+    # fmin/fmax пропускают NaN, возникающие для лучей, лежащих в плоскости грани рамки
+    tmin = np.fmax.reduce(np.fmin(t1, t2), axis=1)
+    tmax = np.fmin.reduce(np.fmax(t1, t2), axis=1)
+    return tmin, tmax
+
+
+def ray_triangles(origin, direction, v0, v1, v2):
+    """Расстояния (в параметре луча) до треугольников (K, 3) по Мёллеру — Трумбору; inf — промах.
+
+    Треугольники считаются двусторонними.
+    """
+    edge1 = v1 - v0
+    edge2 = v2 - v0
+    p = np.cross(direction, edge2)
+    determinant = np.einsum("ij,ij->i", edge1, p)
+    valid = np.abs(determinant) > 1e-12
+    inverse = 1.0 / np.where(valid, determinant, 1.0)
+    s = origin - v0
+    u = np.einsum("ij,ij->i", s, p) * inverse
+    q = np.cross(s, edge1)
+    v = (q @ direction) * inverse
+    t = np.einsum("ij,ij->i", edge2, q) * inverse
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+class BVH:
+    """BVH по рамкам элементов (mins, maxs) формы (N, 3).
+
+    refit обновляет рамки элементов и узлов без перестройки; если после этого суммарная
+    площадь узлов (относительно корня) выросла больше чем в rebuild_threshold раз по
+    сравнению с моментом постройки, дерево перестраивается.
+    """
+
+    def __init__(self, mins, maxs, leaf_size=LEAF_SIZE, rebuild_threshold=REBUILD_THRESHOLD):
+        self.mins = np.array(mins, dtype=np.float64).reshape(-1, 3)
+        self.maxs = np.array(maxs, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self.rebuild_threshold = rebuild_threshold
+        self.rebuilds = 0
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.mins)
+
+    def rebuild(self):
+        """Перестраивает дерево по текущим рамкам элементов."""
+        self.order = np.argsort(morton_codes((self.mins + self.maxs) / 2), kind="stable")
+        self._refit_nodes()
+        self._built_cost = self.cost()
+        self.rebuilds += 1
+
+    def refit(self, mins, maxs, indices=None):
+        """Заменяет рамки всех элементов (или элементов indices) и обновляет узлы.
+
+        Возвращает True, если дерево пришлось перестроить.
+        """
+        if indices is None:
+            self.mins[:] = mins
+            self.maxs[:] = maxs
+        else:
+            self.mins[indices] = mins
+            self.maxs[indices] = maxs
+        self._refit_nodes()
+        if self.cost() > self.rebuild_threshold * self._built_cost:
+            self.rebuild()
+            return True
+        return False
+
+    def cost(self):
+        """Сумма площадей поверхностей узлов, делённая на площадь корня; меньше — лучше."""
+        if not self.levels:
+            return 0.0
+        root = surface_areas(*self.levels[-1])[0]
+        total = sum(surface_areas(mins, maxs).sum() for mins, maxs in self.levels)
+        return total / root if root > 0 else float(len(self.levels))
+
+    def _refit_nodes(self):
+        """Пересчитывает рамки листьев и внутренних узлов снизу вверх."""
+        self.levels = []
+        if len(self) == 0:
+            return
+        starts = np.arange(0, len(self), self.leaf_size)
+        mins = np.minimum.reduceat(self.mins[self.order], starts)
+        maxs = np.maximum.reduceat(self.maxs[self.order], starts)
+        self.levels.append((mins, maxs))
+        while len(mins) > 1:
+            # Узел уровня выше объединяет соседние пары; непарный последний узел переходит как есть
+            pairs = len(mins) // 2
+            merged_mins = mins[::2].copy()
+            merged_maxs = maxs[::2].copy()
+            merged_mins[:pairs] = np.minimum(mins[0:2 * pairs:2], mins[1:2 * pairs:2])
+            merged_maxs[:pairs] = np.maximum(maxs[0:2 * pairs:2], maxs[1:2 * pairs:2])
+            mins, maxs = merged_mins, merged_maxs
+            self.levels.append((mins, maxs))
+
+    def _traverse(self, test):
+        """Индексы элементов (по возрастанию), для рамок которых и рамок всех их предков test истинен."""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp)
+        nodes = np.zeros(1, dtype=np.intp)
+        for level in range(len(self.levels) - 1, -1, -1):
+            mins, maxs = self.levels[level]
+            nodes = nodes[test(mins[nodes], maxs[nodes])]
+            if level > 0:
+                children = np.stack((2 * nodes, 2 * nodes + 1), axis=1).ravel()
+                nodes = children[children < len(self.levels[level - 1][0])]
+        slots = (nodes[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+        items = self.order[slots[slots < len(self)]]
+        return np.sort(items[test(self.mins[items], self.maxs[items])])
+
+    def query_frustum(self, planes):
+        """Элементы, рамки которых хотя бы частично лежат по видимую сторону всех плоскостей (K, 4)."""
+        planes = np.asarray(planes, dtype=np.float64)
+
+        def test(mins, maxs):
+            inside = np.ones(len(mins), dtype=bool)
+            for normal, offset in zip(planes[:, :3], planes[:, 3]):
+                # Вершина рамки, дальше всех продвинутая вдоль нормали плоскости
+                farthest = np.where(normal >= 0, maxs, mins)
+                inside &= farthest @ normal + offset >= 0
+            return inside
+
+        return self._traverse(test)
+
+    def query_sphere(self, center, radius):
+        """Элементы, рамки которых пересекают шар."""
+        center = np.asarray(center, dtype=np.float64)
+
+        def test(mins, maxs):
+            nearest = np.clip(center, mins, maxs)
+            return ((nearest - center) ** 2).sum(axis=1) <= radius * radius
+
+        return self._traverse(test)
+
+    def query_ray(self, origin, direction, max_distance=np.inf):
+        """Элементы, рамки которых пересекает луч, и параметры входа в них; по возрастанию входа."""
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+
+        def test(mins, maxs):
+            tmin, tmax = ray_boxes(origin, direction, mins, maxs)
+            return (tmax >= np.maximum(tmin, 0.0)) & (tmin <= max_distance)
+
+        items = self._traverse(test)
+        entry = np.maximum(ray_boxes(origin, direction, self.mins[items], self.maxs[items])[0], 0.0)
+        order = np.argsort(entry, kind="stable")
+        return items[order], entry[order]
+
+
+def mesh_bvh(geometry):
+    """BVH по треугольникам геометрии в координатах модели; кэшируется в самой геометрии.
+
+    Возвращает (bvh, triangles, triangle_faces), где triangles и triangle_faces — массивы
+    индексной сетки geometry.mesh(). Дерево перестраивается вместе с сеткой.
+    """
+    mesh = geometry.mesh()
+    cached = getattr(geometry, "_bvh", None)
+    if cached is None or cached[0] is not mesh:
+        corners = mesh.vertices[mesh.triangles]
+        bvh = BVH(corners.min(axis=1), corners.max(axis=1))
+        cached = (mesh, (bvh, mesh.triangles, mesh.triangle_faces))
+        geometry._bvh = cached
+    return cached[1]
+
+
+def raycast_geometry(geometry, origin, direction, max_distance=np.inf):
+    """Ближайшее пересечение луча с гранями геометрии: (t, номер грани) или None."""
+    if len(geometry.vertices) == 0:
+        return None
+    mesh = geometry.mesh()
+    triangles, triangle_faces = mesh.triangles, mesh.triangle_faces
+    if len(triangles) >= MESH_BVH_MIN_TRIANGLES:
+        bvh, triangles, triangle_faces = mesh_bvh(geometry)
+        candidates, _ = bvh.query_ray(origin, direction, max_distance)
+    else:
+        candidates = np.arange(len(triangles))
+    if candidates.size == 0:
+        return None
+    corners = geometry.vertices[triangles[candidates]]
+    t = ray_triangles(origin, direction, corners[:, 0], corners[:, 1], corners[:, 2])
+    best = int(np.argmin(t))
+    if not np.isfinite(t[best]) or t[best] > max_distance:
+        return None
+    return float(t[best]), int(triangle_faces[candidates[best]])
+
+
+class RayHit:
+    """Результат трассировки луча: объект, расстояние вдоль луча, точка, грань и номер копии."""
+
+    def __init__(self, obj, distance, point, face, instance=None):
+        self.object = obj
+        self.distance = distance
+        self.point = point
+        self.face = face
+        self.instance = instance  # Номер копии для InstancedMesh
+
+    def __repr__(self):
+        return f"RayHit({self.object!r}, distance={self.distance:.3f}, face={self.face})"
+
+
+def _model_ray(matrix, origin, direction):
+    """Переводит луч в координаты модели; параметр t вдоль луча при этом не меняется."""
+    inverse = np.linalg.inv(matrix)
+    return inverse[:3, :3] @ origin + inverse[:3, 3], inverse[:3, :3] @ direction
+
+
+def raycast_object(obj, origin, direction, max_distance=np.inf):
+    """Ближайшее пересечение луча с объектом, узлом сцены или копиями InstancedMesh; RayHit или None."""
+    origin = np.asarray(origin, dtype=np.float64)
+    direction = np.asarray(direction, dtype=np.float64)
+    best = None
+    if isinstance(obj, InstancedMesh):
+        matrices = obj.instance_world_matrices()
+        centers, radii = obj.instance_spheres(matrices)
+        # Копии, сферы которых луч не задевает, отбрасываются сразу
+        offset = centers - origin
+        along = np.maximum(offset @ direction / (direction @ direction), 0.0)
+        distances = np.linalg.norm(offset - along[:, None] * direction, axis=1)
+        for instance in np.flatnonzero(distances <= radii).tolist():
+            hit = raycast_geometry(obj.geometry, *_model_ray(matrices[instance], origin, direction),
+                                   max_distance if best is None else best.distance)
+            if hit is not None:
+                best = RayHit(obj, hit[0], origin + hit[0] * direction, hit[1], instance)
+        return best
+    if isinstance(obj, SceneNode):
+        hit = raycast_geometry(obj.geometry, *_model_ray(obj.world_matrix, origin, direction), max_distance)
+    else:
+        hit = raycast_geometry(obj, origin, direction, max_distance)
+    if hit is not None:
+        best = RayHit(obj, hit[0], origin + hit[0] * direction, hit[1])
+    return best
+
+
+class SceneIndex:
+    """BVH по объектам сцены с инкрементальным обновлением.
+
+    Рамки объектов строятся по их ограничивающим сферам. update() пересчитывает рамки
+    только узлов с изменившимся transform_version (Object3D без узла — всегда) и обновляет
+    дерево; при изменении состава сцены дерево строится заново.
+    """
+
+    def __init__(self, root, leaf_size=LEAF_SIZE, rebuild_threshold=REBUILD_THRESHOLD):
+        self.root = root  # SceneNode или список объектов
+        self.leaf_size = leaf_size
+        self.rebuild_threshold = rebuild_threshold
+        self.objects = []
+        self.bvh = None
+        self._versions = []
+
+    @staticmethod
+    def object_bounds(objects):
+        """Рамки (mins, maxs) объектов по их ограничивающим сферам."""
+        spheres = [obj.bounding_sphere() for obj in objects]
+        centers = np.array([center for center, _ in spheres], dtype=np.float64).reshape(-1, 3)
+        radii = np.array([radius for _, radius in spheres], dtype=np.float64).reshape(-1, 1)
+        return centers - radii, centers + radii
+
+    def update(self):
+        """Приводит индекс в соответствие со сценой; возвращает число обновлённых объектов."""
+        roots = [self.root] if isinstance(self.root, SceneNode) else self.root
+        objects = list(iter_drawables(roots))
+        if self.bvh is None or objects != self.objects:
+            self.objects = objects
+            self.bvh = BVH(*self.object_bounds(objects), self.leaf_size, self.rebuild_threshold)
+            self._versions = [getattr(obj, "transform_version", None) for obj in objects]
+            return len(objects)
+
+        changed = [i for i, obj in enumerate(objects)
+                   if not isinstance(obj, SceneNode) or obj.transform_version != self._versions[i]]
+        if changed:
+            self.bvh.refit(*self.object_bounds([objects[i] for i in changed]), indices=changed)
+            for i in changed:
+                self._versions[i] = getattr(objects[i], "transform_version", None)
+        return len(changed)
+
+    def frustum(self, planes):
+        """Объекты, рамки которых пересекают пирамиду видимости, в порядке обхода сцены."""
+        return [self.objects[i] for i in self.bvh.query_frustum(planes).tolist()]
+
+    def within(self, center, radius):
+        """Объекты, рамки которых пересекают шар (например, область действия источника света)."""
+        return [self.objects[i] for i in self.bvh.query_sphere(center, radius).tolist()]
+
+    def raycast(self, origin, direction, max_distance=np.inf):
+        """Ближайшее пересечение луча с гранями объектов сцены: RayHit или None."""
+        items, entries = self.bvh.query_ray(origin, direction, max_distance)
+        best = None
+        for index, entry in zip(items.tolist(), entries.tolist()):
+            if best is not None and entry > best.distance:
+                break  # Остальные рамки начинаются дальше найденного пересечения
+            hit = raycast_object(self.objects[index], origin, direction,
+                                 max_distance if best is None else best.distance)
+            if hit is not None:
+                best = hit
+        return best
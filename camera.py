@@ -4,6 +4,9 @@ import numpy as np
 from vector import Vector3
 
 class Camera:
+    # Ортографическая проекция не делит на w: координаты клипа масштабируются этим коэффициентом
+    ORTHOGRAPHIC_SCALE = 0.5
+
     def __init__(self, position, direction, up_vector, projection_type="perspective", fov=45, near=0.1, far=100):
         self.position = position.to_numpy()
         self.direction = direction.normalize()
@@ -26,6 +29,12 @@ class Camera:
         if self.direction.length() == 0 or self.up_vector.length() == 0:
             raise ValueError("Direction and up_vector cannot be zero vectors.")
         
+        # Кэш матриц: пересчитываются только при реальном изменении параметров камеры
+        self._view_key = None
+        self._projection_key = None
+        self._projection_matrix = None
+        self._full_matrix = None
+
         # Обновление оси X и Y
         self.update_axes()
 
@@ -59,8 +68,41 @@ class Camera:
             [x_axis[2], y_axis[2], z_axis[2], 0],
             [-np.dot(x_axis, self.position), -np.dot(y_axis, self.position), -np.dot(z_axis, self.position), 1]
         ])
+        self.view_matrix.setflags(write=False)
+        self._view_key = self._get_view_key()
+        self._full_matrix = None
+
+    def _get_view_key(self):
+        """Ключ состояния, от которого зависит матрица вида."""
+        return (tuple(self.position),
+                (self.direction.x, self.direction.y, self.direction.z),
+                (self.up_vector.x, self.up_vector.y, self.up_vector.z))
+
+    def _get_projection_key(self):
+        """Ключ состояния, от которого зависит матрица проекции."""
+        return (self.projection_type, self.fov, self.near, self.far, self.aspect_ratio)
+
+    def _refresh_matrices(self):
+        """Пересобирает кэшированные матрицы, если параметры камеры изменились."""
+        if self._get_view_key() != self._view_key:
+            self.update_axes()
+
+        projection_key = self._get_projection_key()
+        if projection_key != self._projection_key:
+            self._projection_matrix = self._build_projection_matrix()
+            self._projection_matrix.setflags(write=False)
+            self._projection_key = projection_key
+            self._full_matrix = None
+
+        if self._full_matrix is None:
+            self._full_matrix = np.dot(self._projection_matrix, self.view_matrix)
+            self._full_matrix.setflags(write=False)
 
     def get_projection_matrix(self):
+        self._refresh_matrices()
+        return self._projection_matrix
+
+    def _build_projection_matrix(self):
         if self.projection_type == "perspective":
             # Улучшенная матрица перспективной проекции
             f = 1.0 / np.tan(np.radians(self.fov) / 2.0)
@@ -84,8 +126,51 @@ class Camera:
                 [0, 0, 0, 1]
             ])
 
+    def projection_center(self):
+        """Центр проекции в однородных мировых координатах (4,).
+
+        Это точка, которую полная матрица отображает в x = y = w = 0. Для перспективы
+        она конечна и нормирована к w = 1; для ортографии лежит на бесконечности (w = 0)
+        и задаёт направление к наблюдателю.
+        """
+        full_matrix = self.get_full_matrix()
+        if self.projection_type == "perspective":
+            rows = full_matrix[[0, 1, 3]]
+        else:
+            rows = np.vstack((full_matrix[:2], [0, 0, 0, 1]))
+        center = np.linalg.svd(rows)[2][-1]
+        if self.projection_type == "perspective":
+            return center / center[3]
+        # Направление на бесконечности ориентируем к наблюдателю
+        if np.dot(center[:3], self.direction.to_numpy()) > 0:
+            center = -center
+        return center
+
+    def depth_plane(self):
+        """Плоскость глубины (4,): глубина точки p равна p @ plane[:3] + plane[3] в мировых единицах.
+
+        Плоскость проходит через центр проекции (projection_center) параллельно плоскости
+        экрана, нормаль смотрит на видимую сторону. Для перспективы глубина пропорциональна
+        однородной координате w, поэтому по экрану линейно меняется 1 / глубина; для
+        ортографии линейна по экрану сама глубина.
+        """
+        if self.projection_type == "perspective":
+            plane = self.get_full_matrix()[3] * np.sign(self.get_projection_matrix()[3, 2])
+        else:
+            # Центр проекции на бесконечности задаёт направление к наблюдателю
+            toward_viewer = self.projection_center()[:3]
+            plane = np.append(-toward_viewer, toward_viewer @ self.position)
+        return plane / np.linalg.norm(plane[:3])
+
+    def depth(self, points):
+        """Глубина точек (N, 3) — расстояние до плоскости depth_plane()."""
+        plane = self.depth_plane()
+        return np.asarray(points) @ plane[:3] + plane[3]
+
     def get_view_matrix(self):
+        self._refresh_matrices()
         return self.view_matrix
 
     def get_full_matrix(self):
-        return np.dot(self.get_projection_matrix(), self.view_matrix)
\ No newline at end of file
+        self._refresh_matrices()
+        return self._full_matrix
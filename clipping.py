@@ -0,0 +1,100 @@
+# clipping.py
+"""Отсечение треугольников в однородных координатах до деления на w.
+
+Вершина задаётся тройкой (X, Y, W), для которой NDC = (X / W, Y / W) и W > 0 на видимой
+стороне. Для перспективы это координаты клипа, приведённые к W > 0 перед камерой; для
+ортографии W = 1. Треугольник, целиком лежащий за одной из плоскостей экрана или за
+ближней плоскостью, отбрасывается. Треугольник, пересекающий ближнюю плоскость или
+плоскости защитной полосы (|NDC| <= GUARD_BAND), разрезается на многоугольник и снова
+делится на треугольники. Всё, что остаётся за краем экрана внутри полосы, обрезает
+растеризатор по рамке экрана (scissor), поэтому его работа ограничена видимой областью.
+"""
+
+import numpy as np
+
+# Полуширина защитной полосы в NDC: края экрана — на ±1
+GUARD_BAND = 4.0
+
+
+def clip_coordinates(vertices, camera):
+    """Однородные координаты (N, 3) = (X, Y, W) вершин (N, 3) в мировых координатах."""
+    full_matrix = camera.get_full_matrix()
+    if camera.projection_type == "perspective":
+        # Перед камерой знак w совпадает со знаком P[3, 2]; приводим видимую сторону к W > 0
+        rows = full_matrix[[0, 1, 3]] * np.sign(camera.get_projection_matrix()[3, 2])
+        return vertices @ rows[:, :3].T + rows[:, 3]
+    # Ортография не делит на w: координаты масштабируются, W = 1
+    coordinates = np.empty((len(vertices), 3))
+    coordinates[:, :2] = (vertices @ full_matrix[:2, :3].T + full_matrix[:2, 3]) * camera.ORTHOGRAPHIC_SCALE
+    coordinates[:, 2] = 1.0
+    return coordinates
+
+
+def clip_planes(camera, extent):
+    """Плоскости (K, 4) в координатах (X, Y, W, 1): точка внутри, если расстояние >= 0.
+
+    extent — полуширина области в NDC (1 — край экрана, GUARD_BAND — защитная полоса).
+    Для перспективы добавляется ближняя плоскость, как у frustum_planes.
+    """
+    planes = [(1.0, 0.0, extent, 0.0), (-1.0, 0.0, extent, 0.0),
+              (0.0, 1.0, extent, 0.0), (0.0, -1.0, extent, 0.0)]
+    if camera.projection_type == "perspective":
+        planes.append((0.0, 0.0, 1.0, -abs(camera.get_projection_matrix()[3, 2]) * camera.near))
+    return np.array(planes)
+
+
+def plane_distances(coordinates, planes):
+    """Расстояния (..., K) от точек (..., 3) до плоскостей (K, 4)."""
+    return coordinates @ planes[:, :3].T + planes[:, 3]
+
+
+def clip_triangles(corners, planes):
+    """Разрезает треугольники (T, 3, C) плоскостями (K, 4) и делит результат веером.
+
+    Первые три столбца вершины — (X, Y, W), остальные — атрибуты, интерполируемые
+    линейно вместе с ними. Все треугольники обрабатываются пакетом: многоугольники
+    хранятся в массиве (T, M, C) с числом вершин в каждом и по очереди режутся каждой
+    плоскостью (Сазерленд — Ходжман). Возвращает треугольники (S, 3, C) и номер
+    исходного треугольника для каждого (S,) в порядке возрастания.
+    """
+    polygons = np.asarray(corners, dtype=np.float64)
+    counts = np.full(len(polygons), 3)
+    for plane in planes:
+        polygons, counts = _clip_polygons(polygons, counts, plane)
+
+    # Веер из первой вершины: многоугольник с k вершинами даёт k - 2 треугольника
+    fan = np.arange(1, polygons.shape[1] - 1)
+    source, second = np.nonzero(fan[None, :] < (counts - 1)[:, None])
+    second = fan[second]
+    triangles = np.stack((polygons[source, 0], polygons[source, second], polygons[source, second + 1]), axis=1)
+    return triangles, source
+
+
+def _clip_polygons(polygons, counts, plane):
+    """Отрезает от выпуклых многоугольников (N, M, C) часть за одной плоскостью."""
+    size = polygons.shape[1]
+    slots = np.arange(size)
+    valid = slots[None, :] < counts[:, None]
+    distances = plane_distances(polygons[:, :, :3], plane[None, :])[:, :, 0]
+    inside = (distances >= 0) | ~valid
+    if inside.all():
+        return polygons, counts
+
+    # Ребро i -> i + 1 (последнее замыкается на первую вершину) даёт свою начальную вершину,
+    # если она внутри, и точку пересечения, если концы по разные стороны плоскости
+    following = np.where(slots[None, :] + 1 < counts[:, None], slots[None, :] + 1, 0)
+    rows = np.arange(len(polygons))[:, None]
+    next_points = polygons[rows, following]
+    next_distances = distances[rows, following]
+    crossing = valid & ((distances >= 0) != (next_distances >= 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = distances / (distances - next_distances)
+    intersections = polygons + np.where(crossing, t, 0.0)[:, :, None] * (next_points - polygons)
+
+    candidates = np.stack((polygons, intersections), axis=2).reshape(len(polygons), 2 * size, -1)
+    keep = np.stack((valid & (distances >= 0), crossing), axis=2).reshape(len(polygons), 2 * size)
+    # Оставленные вершины сдвигаются в начало строки с сохранением порядка обхода
+    order = np.argsort(~keep, axis=1, kind="stable")
+    counts = np.count_nonzero(keep, axis=1)
+    width = max(int(counts.max(initial=0)), 3)
+    return candidates[rows, order[:, :width]], counts
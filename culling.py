@@ -0,0 +1,58 @@
+# culling.py
+
+import numpy as np
+
+
+def frustum_planes(camera):
+    """Плоскости пирамиды видимости (K, 4) в мировых координатах.
+
+    Точка p видима, если planes[:, :3] @ p + planes[:, 3] >= 0 для всех плоскостей.
+    Плоскости построены по той же матрице и тем же правилам, что и проекция рендерера,
+    и нормированы, поэтому расстояние до них можно сравнивать с радиусом сферы.
+    """
+    matrix = camera.get_full_matrix()
+    unit_w = np.array([0.0, 0.0, 0.0, 1.0])
+    if camera.projection_type == "perspective":
+        # Перед камерой знак w совпадает со знаком P[3, 2]; приводим видимую сторону к w > 0
+        depth_row = camera.get_projection_matrix()[3, 2]
+        matrix = matrix * np.sign(depth_row)
+        w = matrix[3]
+        planes = np.array([
+            w + matrix[0],  # Левая
+            w - matrix[0],  # Правая
+            w + matrix[1],  # Нижняя
+            w - matrix[1],  # Верхняя
+            w - abs(depth_row) * camera.near * unit_w,  # Ближняя
+        ])
+    else:  # orthographic
+        # |x * scale| <= 1 и |y * scale| <= 1 без деления на w
+        scale = camera.ORTHOGRAPHIC_SCALE
+        planes = np.array([
+            unit_w + scale * matrix[0],
+            unit_w - scale * matrix[0],
+            unit_w + scale * matrix[1],
+            unit_w - scale * matrix[1],
+        ])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def spheres_in_frustum(centers, radii, planes):
+    """Маска сфер (K,), хотя бы частично попадающих в пирамиду видимости."""
+    distances = np.asarray(centers).reshape(-1, 3) @ planes[:, :3].T + planes[:, 3]
+    return np.all(distances >= -np.reshape(radii, (-1, 1)), axis=1)
+
+
+def back_facing(normals, points, center):
+    """Маска граней (F,), отвёрнутых от центра проекции.
+
+    normals — нормали граней (F, 3), points — любая вершина каждой грани (F, 3),
+    center — результат Camera.projection_center(). Грани без нормали (NaN) считаются
+    невидимыми.
+    """
+    if center[3] != 0:
+        to_viewer = center[:3] / center[3] - points
+    else:  # Параллельная проекция: направление на наблюдателя одинаково для всех граней
+        to_viewer = center[:3]
+    with np.errstate(invalid="ignore"):
+        facing = np.einsum("ij,ij->i", normals, np.broadcast_to(to_viewer, normals.shape))
+    return ~(facing > 0)
@@ -1,23 +1,217 @@
 # engine.py
+from time import perf_counter, sleep
 from renderer import Renderer
 from camera import Camera
 from vector import Vector3
+from scene import SceneNode, iter_drawables
+from bvh import SceneIndex
+from culling import frustum_planes
+from profiler import FrameProfiler
+from terminal_input import TerminalInput
+from recording import Recorder
+from frameserver import FrameServer
+from quality import QualityController
+from animation import Animator
+
+# Последний отрезок ожидания кадра добирается активным ожиданием: sleep просыпается неточно
+SPIN_TIME = 0.001
+
 class Engine:
-    def __init__(self):
-        self.objects = []
+    def __init__(self, renderer=None, camera=None):
+        self.scene = SceneNode(name="scene")  # Корень графа сцены
         self.lights = []
+        self.renderer = renderer if renderer is not None else Renderer()
+        if camera is None:
+            camera = Camera(position=Vector3(0, 0, -5), direction=Vector3(0, 0, -1), up_vector=Vector3(0, 1, 0))
+        self.camera = camera
+        # BVH по объектам сцены: обновляется перед отрисовкой и запросами
+        self.index = SceneIndex(self.scene)
+        # Время стадий и счётчики последних кадров; выгрузка — profiler.to_json / to_csv
+        self.profiler = FrameProfiler()
+        # Игровой цикл: время симуляции, обработчики шага и клавиш
+        self.time = 0.0
+        self.running = False
+        self.update_callbacks = []
+        self.key_bindings = {}
+        self.skipped_updates = 0
+        # Адаптивное качество (quality.QualityController), см. set_frame_budget
+        self.quality = None
+        # Ключевая анимация узлов и копий: вычисляется одним пакетом перед каждым кадром
+        self.animator = Animator()
+
+    @property
+    def objects(self):
+        """Узлы сцены с геометрией в порядке обхода графа."""
+        return list(iter_drawables([self.scene]))
+
+    def add_object(self, obj, parent=None, **transform):
+        """Добавляет в сцену узел или Object3D (оборачивая его в узел) и возвращает узел.
 
-    def add_object(self, obj):
-        self.objects.append(obj)
+        Дополнительные аргументы (position, rotation, scale, color, name) передаются
+        новому узлу, если obj — это Object3D.
+        """
+        node = obj if isinstance(obj, SceneNode) else SceneNode(obj, **transform)
+        (parent if parent is not None else self.scene).add_child(node)
+        return node
 
     def add_light(self, light):
         self.lights.append(light)
 
-    def update(self):
-        # Логика обновления состояния игры
-        pass
+    def on_update(self, callback):
+        """Регистрирует callback(engine, dt), вызываемый на каждом шаге симуляции."""
+        self.update_callbacks.append(callback)
+        return callback
+
+    def animate(self, target, position=None, rotation=None, scale=None, start=None, speed=1.0):
+        """Анимирует узел сцены или копии InstancedMesh дорожками animation.Track.
+
+        start — момент времени симуляции, с которого идёт анимация (по умолчанию текущий).
+        """
+        self.animator.add(target, position, rotation, scale,
+                          start=self.time if start is None else start, speed=speed)
+
+    def bind_key(self, key, callback):
+        """Вызывает callback(engine) при нажатии клавиши key (символ или escape-последовательность)."""
+        self.key_bindings[key] = callback
+
+    def handle_keys(self, keys):
+        for key in keys:
+            callback = self.key_bindings.get(key)
+            if callback is not None:
+                callback(self)
+
+    def update(self, dt):
+        """Один шаг симуляции длиной dt секунд."""
+        for callback in self.update_callbacks:
+            callback(self, dt)
+        self.time += dt
+
+    def stop(self):
+        """Завершает run() после текущего кадра."""
+        self.running = False
+
+    def run(self, fps=30, timestep=1 / 60, max_updates=5, duration=None, input_source=None):
+        """Игровой цикл: фиксированный шаг симуляции и отрисовка не чаще fps кадров в секунду.
+
+        Симуляция всегда продвигается шагами timestep, сколько бы ни длился кадр. Если
+        отрисовка не успевает, между кадрами выполняется до max_updates шагов, а остальное
+        отставание отбрасывается (счётчик self.skipped_updates), чтобы не уйти в спираль
+        догоняния. Клавиши читаются без блокировки перед каждым кадром. fps=None снимает
+        ограничение частоты кадров; duration ограничивает время работы в секундах.
+        По выходе из цикла запись и рассылка останавливаются, а рендерер закрывается.
+        """
+        frame_time = 1.0 / fps if fps else 0.0
+        self.running = True
+        with (input_source if input_source is not None else TerminalInput()) as keys:
+            start = previous = deadline = perf_counter()
+            accumulator = 0.0
+            try:
+                while self.running:
+                    now = perf_counter()
+                    accumulator += now - previous
+                    previous = now
+
+                    self.handle_keys(keys.poll())
+                    steps = 0
+                    while accumulator >= timestep and steps < max_updates:
+                        self.update(timestep)
+                        accumulator -= timestep
+                        steps += 1
+                    if accumulator >= timestep:
+                        self.skipped_updates += int(accumulator // timestep)
+                        accumulator %= timestep
+
+                    self.render()
+                    if duration is not None and perf_counter() - start >= duration:
+                        break
+
+                    # Следующий кадр — через frame_time после предыдущего срока; опоздавший
+                    # кадр сдвигает расписание, а не догоняется пачкой кадров без ожидания
+                    deadline = max(deadline + frame_time, perf_counter())
+                    wait_until(deadline)
+            finally:
+                self.running = False
+                self.stop_recording()
+                self.stop_serving()
+                self.renderer.close()
+
+    def set_frame_budget(self, seconds, **options):
+        """Держит время кадра в пределах seconds, понижая и повышая качество отрисовки.
+
+        options передаются QualityController (настройки, пороги, паузы); None отключает
+        адаптацию и возвращает лучшее качество.
+        """
+        if seconds is None:
+            if self.quality is not None:
+                self.quality.set_level(0)
+            self.quality = None
+            return None
+        self.quality = QualityController(self.renderer, seconds, **options)
+        return self.quality
+
+    def start_recording(self, file, depth=False, keyframe_interval=60):
+        """Начинает запись показываемых кадров в файл или поток (см. recording.Player)."""
+        self.stop_recording()
+        renderer = self.renderer
+        renderer.recorder = Recorder(file, renderer.screen_width, renderer.screen_height, renderer.SYMBOLS,
+                                     depth=depth, keyframe_interval=keyframe_interval)
+        return renderer.recorder
+
+    def stop_recording(self):
+        if self.renderer.recorder is not None:
+            self.renderer.recorder.close()
+            self.renderer.recorder = None
+
+    def serve(self, address, local_output=False):
+        """Рассылает кадры по адресу "host:port" или пути Unix-сокета (см. frameserver).
+
+        Кадр рисуется один раз на всех клиентов; local_output оставляет вывод в свой терминал.
+        """
+        self.stop_serving()
+        self.renderer.server = FrameServer(address, self.renderer.SYMBOLS).start()
+        self.renderer.local_output = local_output
+        return self.renderer.server
+
+    def stop_serving(self):
+        if self.renderer.server is not None:
+            self.renderer.server.close()
+            self.renderer.server = None
+            self.renderer.local_output = True
+
+    def pick(self, column, row):
+        """Объект под клеткой экрана (column, row): RayHit ближайшей грани или None."""
+        self.index.update()
+        origin, direction = self.renderer.screen_ray(self.camera, column + 0.5, row + 0.5)
+        return self.index.raycast(origin, direction)
+
+    def objects_near(self, center, radius):
+        """Объекты, рамки которых пересекают шар (например, область действия источника света)."""
+        self.index.update()
+        return self.index.within(center, radius)
 
     def render(self):
-        renderer = Renderer()
-        camera = Camera(position=Vector3(0, 0, -5), direction=Vector3(0, 0, -1), up_vector=Vector3(0, 1, 0))
-        renderer.render(self.objects, camera, self.lights)
\ No newline at end of file
+        # Рендереру передаются только объекты, чьи рамки пересекают пирамиду видимости
+        self.profiler.begin_frame()
+        start = perf_counter()
+        # Трансформации анимированных объектов на текущее время симуляции
+        self.animator.apply(self.time)
+        animate_time = perf_counter() - start
+        self.index.update()
+        visible = self.index.frustum(frustum_planes(self.camera))
+        index_time = perf_counter() - start - animate_time
+        # Индекс уже развернул иерархию: потомки не добавляются к видимым узлам повторно
+        self.renderer.render(visible, self.camera, self.lights, flattened=True)
+        counters = self.renderer.frame_stats
+        if self.quality is not None:
+            self.quality.update(perf_counter() - start)
+            counters = dict(counters, quality_level=self.quality.level)
+        self.profiler.end_frame(dict(self.renderer.stage_times, animate=animate_time, index=index_time), counters)
+
+
+def wait_until(deadline):
+    """Спит до момента deadline по perf_counter: sleep с запасом, затем активное ожидание."""
+    remaining = deadline - perf_counter()
+    if remaining > SPIN_TIME:
+        sleep(remaining - SPIN_TIME)
+    while perf_counter() < deadline:
+        pass
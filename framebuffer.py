@@ -0,0 +1,136 @@
+# framebuffer.py
+
+import numpy as np
+from rasterizer import rasterize_triangles, nearest_fragments
+
+
+class Framebuffer:
+    """Многоразовый буфер кадра: плоскости глубины, символов и цветов.
+
+    Плоскости выделяются один раз и очищаются на месте каждый кадр. Символ хранится
+    индексом в градации рендерера (0 — пустая клетка), цвет — индексом в палитре
+    (0 — цвет не задан). Строки для вывода собираются только при показе кадра.
+    """
+
+    # Палитра сбрасывается при очистке, если разрослась больше этого размера
+    PALETTE_LIMIT = 4096
+    # Типы плоскостей в порядке размещения в общем буфере (по убыванию выравнивания)
+    PLANES = (("depth", np.float32), ("colors", np.uint16), ("glyphs", np.uint8))
+
+    def __init__(self, width, height, buffer=None):
+        """buffer — необязательная память (например, SharedMemory.buf) размером не меньше
+        Framebuffer.buffer_size(width, height), в которой размещаются плоскости. Содержимое
+        такой памяти не меняется: её владелец очищает буфер сам."""
+        self.width = width
+        self.height = height
+        offset = 0
+        for name, dtype in self.PLANES:
+            if buffer is None:
+                plane = np.zeros((height, width), dtype=dtype)
+            else:
+                plane = np.ndarray((height, width), dtype=dtype, buffer=buffer, offset=offset)
+                offset += plane.nbytes
+            setattr(self, name, plane)
+        if buffer is None:
+            self.depth.fill(np.inf)
+        # Палитра общая для всех кадров: цвета объектов стабильны между кадрами.
+        # Версия меняется при сбросе палитры, чтобы потребители не путали старые индексы
+        self.palette = [None]
+        self._palette_index = {}
+        self.palette_version = 0
+
+    @classmethod
+    def buffer_size(cls, width, height):
+        """Размер памяти в байтах для плоскостей буфера кадра width x height."""
+        return sum(np.dtype(dtype).itemsize for _, dtype in cls.PLANES) * width * height
+
+    def clear(self):
+        """Очищает все плоскости на месте, не выделяя новую память."""
+        self.depth.fill(np.inf)
+        self.glyphs.fill(0)
+        self.colors.fill(0)
+        if len(self.palette) > self.PALETTE_LIMIT:
+            self.palette = [None]
+            self._palette_index = {}
+            self.palette_version += 1
+
+    def resample(self, source):
+        """Заполняет плоскости из буфера кадра другого размера ближайшими пикселями.
+
+        Палитра не копируется, а берётся общей с source: индексы цветов остаются верны.
+        """
+        rows = np.arange(self.height) * source.height // self.height
+        columns = np.arange(self.width) * source.width // self.width
+        for name, _ in self.PLANES:
+            np.take(np.take(getattr(source, name), rows, axis=0), columns, axis=1, out=getattr(self, name))
+        self.palette = source.palette
+        self._palette_index = source._palette_index
+        self.palette_version = source.palette_version
+
+    def color_index(self, color):
+        """Возвращает индекс цвета (r, g, b) в палитре, добавляя его при необходимости."""
+        r, g, b = (int(c) for c in color)
+        index = self._palette_index.get((r << 16) | (g << 8) | b)
+        if index is None:
+            index = int(self.color_indices([(r, g, b)])[0])
+        return index
+
+    def color_indices(self, colors):
+        """Индексы палитры (K,) для массива цветов (K, 3), добавляя новые цвета в палитру.
+
+        Цвета упаковываются в целые ключи 0xRRGGBB, и каждый уникальный ключ ищется один раз.
+        """
+        colors = np.asarray(colors).reshape(-1, 3).astype(np.int64)
+        keys = (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        lookup = self._palette_index.get
+        indices = np.array([lookup(key, 0) for key in unique.tolist()], dtype=np.int64)
+
+        missing = np.flatnonzero(indices == 0)
+        if missing.size:
+            start = len(self.palette)
+            if start + missing.size - 1 > np.iinfo(self.colors.dtype).max:
+                raise ValueError("Framebuffer palette is full.")
+            indices[missing] = np.arange(start, start + missing.size)
+            new_keys = unique[missing]
+            new_colors = np.stack((new_keys >> 16, (new_keys >> 8) & 255, new_keys & 255), axis=1)
+            self.palette.extend(map(tuple, new_colors.tolist()))
+            self._palette_index.update(zip(new_keys.tolist(), indices[missing].tolist()))
+        return indices.astype(self.colors.dtype)[inverse.ravel()]
+
+    def write(self, ys, xs, depth, glyphs, colors):
+        """Записывает фрагменты с попиксельным тестом глубины.
+
+        Фрагменты могут перекрываться: в каждом пикселе побеждает ближайший, а при
+        равной глубине — поданный раньше. Возвращает число записанных пикселей.
+        """
+        depth = np.asarray(depth, dtype=np.float32)
+        nearest = nearest_fragments(ys, xs, depth, self.width)
+        ys, xs, depth = ys[nearest], xs[nearest], depth[nearest]
+
+        closer = depth < self.depth[ys, xs]
+        ys, xs = ys[closer], xs[closer]
+        self.depth[ys, xs] = depth[closer]
+        self.glyphs[ys, xs] = np.asarray(glyphs)[nearest][closer]
+        self.colors[ys, xs] = np.asarray(colors)[nearest][closer]
+        return ys.size
+
+    def draw_triangles(self, points, depths, intensities, colors, levels, rect=None, perspective=False):
+        """Растеризует экранные треугольники и записывает их фрагменты с тестом глубины.
+
+        points — вершины (T, 3, 2) в координатах буфера, depths и intensities — вершинные
+        глубина и освещённость (T, 3), colors — индексы палитры (T,), levels — число
+        символов градации. rect ограничивает запись прямоугольником (x0, y0, x1, y1).
+        perspective=True — глубины положительны и пропорциональны w перспективной
+        проекции: тогда по экрану интерполируется 1 / глубина, что даёт точную глубину
+        в каждом пикселе. Возвращает (число фрагментов, число записанных пикселей).
+        """
+        tris, ys, xs, weights = rasterize_triangles(points, self.width, self.height, rect)
+        # Глубина и освещение интерполируются для каждого фрагмента отдельно
+        if perspective:
+            depth = 1.0 / np.einsum("ij,ij->i", weights, 1.0 / depths[tris])
+        else:
+            depth = np.einsum("ij,ij->i", weights, depths[tris])
+        intensity = np.einsum("ij,ij->i", weights, intensities[tris])
+        glyphs = np.clip((intensity * levels).astype(int), 0, levels - 1)
+        return ys.size, self.write(ys, xs, depth, glyphs, colors[tris])
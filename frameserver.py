@@ -0,0 +1,259 @@
+# frameserver.py
+"""Рассылка кадров по сети: кадр рисуется и кодируется один раз для всех зрителей.
+
+FrameServer принимает подключения по TCP или Unix-сокету и отправляет каждому
+клиенту ANSI-поток, как у TerminalPresenter: клиентам, получившим предыдущий кадр
+полностью, — разность с ним, новым и отставшим — полный кадр. Разность кодируется
+один раз на кадр, полный кадр — только если он кому-то нужен.
+
+Сеть обслуживает фоновый поток; publish только кладёт байты в очереди клиентов и
+никогда не ждёт сокет. Если клиент не успел принять предыдущий кадр, новые кадры
+ему не ставятся в очередь, пока он не догонит, после чего он получает один полный
+кадр: медленные клиенты пропускают кадры и отстают не больше чем на кадр.
+
+Тонкий клиент: python frameserver.py ADDRESS — пишет полученные байты в терминал.
+"""
+
+import os
+import socket
+import stat
+import sys
+import threading
+import selectors
+
+from presenter import TerminalPresenter, RESET_COLOR, SHOW_CURSOR
+
+SEND_SIZE = 1 << 16
+
+
+def parse_address(address):
+    """"host:port" или ":port" — TCP (по умолчанию 127.0.0.1), иначе путь Unix-сокета.
+
+    Возвращает (семейство сокета, адрес для bind/connect).
+    """
+    if isinstance(address, tuple):
+        return socket.AF_INET, address
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def _remove_socket(path):
+    """Удаляет Unix-сокет по пути path (например, от прошлого запуска).
+
+    Другие файлы не трогает: возвращает False, если по пути лежит не сокет.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return True
+    if not stat.S_ISSOCK(mode):
+        return False
+    os.unlink(path)
+    return True
+
+
+class _Client:
+    def __init__(self, connection, address):
+        self.connection = connection
+        self.address = address
+        self.pending = bytearray()  # Байты, ещё не принятые сокетом
+        self.synced = False         # Получил ли клиент предыдущий кадр полностью (в очередь)
+        self.dropped = 0
+        self.events = selectors.EVENT_READ
+
+
+class FrameServer:
+    """Сервер кадров: publish(framebuffer) рассылает кадр всем подключённым клиентам."""
+
+    def __init__(self, address, symbols, backlog=16, send_buffer=1 << 18):
+        self.family, self.address = parse_address(address)
+        # Сокет от прошлого запуска удаляется; любой другой файл по этому пути — ошибка
+        if self.family == socket.AF_UNIX and not _remove_socket(self.address):
+            raise FileExistsError(f"{self.address} exists and is not a socket; refusing to replace it.")
+        self._delta = TerminalPresenter(symbols)
+        self._full = TerminalPresenter(symbols)
+        self._clients = []
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._wake_read.setblocking(False)
+        self._wake_write.setblocking(False)
+        self._running = False
+        # Буфер отправки ядра ограничивается, чтобы отставание медленного клиента было
+        # видно по очереди сервера, а не копилось мегабайтами в сокете
+        self.send_buffer = send_buffer
+        # Счётчики
+        self.frames = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+        self._listener = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(self.address)
+        self._listener.listen(backlog)
+        self._listener.setblocking(False)
+        if self.family == socket.AF_INET:
+            self.address = self._listener.getsockname()  # Порт 0 заменяется выбранным системой
+        self._thread = threading.Thread(target=self._run, name="frame-server", daemon=True)
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def start(self):
+        """Запускает сетевой поток; возвращает self."""
+        if not self._running:
+            self._running = True
+            self._selector.register(self._listener, selectors.EVENT_READ, "accept")
+            self._selector.register(self._wake_read, selectors.EVENT_READ, "wake")
+            self._thread.start()
+        return self
+
+    def publish(self, framebuffer):
+        """Кодирует кадр и ставит его в очереди клиентов; не блокируется на сети."""
+        self.frames += 1
+        with self._lock:
+            clients = list(self._clients)
+        if not clients:
+            self._delta.invalidate()  # Следующий клиент всё равно начнёт с полного кадра
+            return
+        delta = self._delta.encode(framebuffer).encode("utf-8")
+        full = None
+
+        with self._lock:
+            for client in self._clients:
+                if client.pending:
+                    # Клиент не принял предыдущий кадр: этот пропускается, потом — полный кадр
+                    client.synced = False
+                    client.dropped += 1
+                    self.frames_dropped += 1
+                    continue
+                if client.synced:
+                    client.pending += delta
+                else:
+                    if full is None:
+                        self._full.invalidate()
+                        full = self._full.encode(framebuffer).encode("utf-8")
+                    client.pending += full
+                    client.synced = True
+        self._wake()
+
+    def close(self):
+        """Останавливает сетевой поток и закрывает все соединения."""
+        if self._running:
+            self._running = False
+            self._wake()
+            self._thread.join()
+        with self._lock:
+            for client in self._clients:
+                client.connection.close()
+            self._clients.clear()
+        self._selector.close()
+        self._listener.close()
+        self._wake_read.close()
+        self._wake_write.close()
+        if self.family == socket.AF_UNIX:
+            _remove_socket(self.address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _wake(self):
+        try:
+            self._wake_write.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Поток уже разбужен
+
+    def _run(self):
+        while self._running:
+            # Запись ждём только от клиентов с неотправленными байтами
+            with self._lock:
+                for client in self._clients:
+                    events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.pending else 0)
+                    if events != client.events:
+                        self._selector.modify(client.connection, events, client)
+                        client.events = events
+            for key, events in self._selector.select():
+                if key.data == "accept":
+                    self._accept()
+                elif key.data == "wake":
+                    try:
+                        while self._wake_read.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._service(key.data, events)
+
+    def _accept(self):
+        while True:
+            try:
+                connection, address = self._listener.accept()
+            except BlockingIOError:
+                return
+            connection.setblocking(False)
+            if self.send_buffer:
+                connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+            if self.family == socket.AF_INET:
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = _Client(connection, address)
+            with self._lock:
+                self._clients.append(client)
+            self._selector.register(connection, selectors.EVENT_READ, client)
+
+    def _service(self, client, events):
+        try:
+            if events & selectors.EVENT_READ:
+                # Клиент ничего не присылает; пустое чтение означает закрытие соединения
+                if not client.connection.recv(4096):
+                    raise ConnectionResetError
+            if events & selectors.EVENT_WRITE:
+                with self._lock:
+                    data = bytes(client.pending[:SEND_SIZE])
+                sent = client.connection.send(data)
+                with self._lock:
+                    del client.pending[:sent]
+                self.bytes_sent += sent
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._disconnect(client)
+
+    def _disconnect(self, client):
+        self._selector.unregister(client.connection)
+        client.connection.close()
+        with self._lock:
+            self._clients.remove(client)
+
+
+def run_client(address, stream=None):
+    """Тонкий клиент: подключается к серверу и пишет принятые байты в терминал как есть."""
+    output = stream if stream is not None else sys.stdout.buffer
+    family, address = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as connection:
+        connection.connect(address)
+        try:
+            while True:
+                data = connection.recv(SEND_SIZE)
+                if not data:
+                    break
+                output.write(data)
+                output.flush()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            output.write((RESET_COLOR + SHOW_CURSOR + "\n").encode("utf-8"))
+            output.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python frameserver.py HOST:PORT | UNIX_SOCKET_PATH")
+    run_client(sys.argv[1])
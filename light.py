@@ -1,3 +1,4 @@
+import numpy as np
 from vector import Vector3
 
 class Light:
@@ -17,4 +18,65 @@ class Light:
         
     def copy_position(self):
         """Returns a copy of the light's position vector."""
-        return Vector3(self.position.x, self.position.y, self.position.z)
\ No newline at end of file
+        return Vector3(self.position.x, self.position.y, self.position.z)
+
+# Коэффициенты модели освещения (доли фоновой, диффузной и зеркальной составляющих)
+AMBIENT = 0.2
+DIFFUSE = 0.6
+SPECULAR = 0.2
+SHININESS = 16
+
+
+class LightArray:
+    """Параметры набора источников света, упакованные в массивы для пакетного расчёта."""
+
+    def __init__(self, lights):
+        self.count = len(lights)
+        self.positions = np.array([(l.position.x, l.position.y, l.position.z) for l in lights],
+                                  dtype=np.float64).reshape(-1, 3)
+        self.colors = np.array([l.color for l in lights], dtype=np.float64).reshape(-1, 3) / 255.0
+        self.intensities = np.array([l.intensity for l in lights], dtype=np.float64)
+        self.attenuation = np.array([l.attenuation for l in lights], dtype=np.float64).reshape(-1, 3)
+
+    def calculate_attenuation(self, distances):
+        """То же, что Light.calculate_attenuation, для матрицы расстояний (N, L)."""
+        constant, linear, quadratic = self.attenuation.T
+        attenuation = 1.0 / (constant + linear * distances + quadratic * distances * distances)
+        return np.clip(attenuation, 0.1, 1.0)
+
+    def shade(self, points, normals, eye, specular=True):
+        """Освещённость точек (N, 3) с нормалями (N, 3) от всех источников сразу.
+
+        Для каждой пары (точка, источник) считаются фоновая, диффузная и зеркальная
+        (Фонг) составляющие с затуханием источника; вклады суммируются с учётом цвета
+        источников. Возвращает RGB-освещённость (N, 3), где 1.0 — полная яркость канала.
+        specular=False пропускает зеркальную составляющую (дешевле, немного темнее).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if self.count == 0 or len(points) == 0:
+            return np.zeros((len(points), 3))
+        normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+
+        # Направления на источники (N, L, 3) и расстояния до них (N, L)
+        to_light = self.positions[None, :, :] - points[:, None, :]
+        distances = np.linalg.norm(to_light, axis=2)
+        light_dirs = to_light / np.maximum(distances, 1e-12)[:, :, None]
+
+        n_dot_l = np.einsum("nk,nlk->nl", normals, light_dirs)
+        diffuse = np.maximum(0.1, n_dot_l)
+        if not specular:
+            strength = (AMBIENT + DIFFUSE * diffuse) * self.calculate_attenuation(distances) * self.intensities
+            return strength @ self.colors
+
+        # Направление на наблюдателя (N, 3)
+        to_eye = np.asarray(eye, dtype=np.float64) - points
+        view_dirs = to_eye / np.maximum(np.linalg.norm(to_eye, axis=1), 1e-12)[:, None]
+
+        # Отражённый луч r = 2 (n·l) n - l; блик — степень его косинуса с направлением взгляда
+        reflect_dirs = 2.0 * n_dot_l[:, :, None] * normals[:, None, :] - light_dirs
+        r_dot_v = np.einsum("nlk,nk->nl", reflect_dirs, view_dirs)
+        specular = np.maximum(0.0, r_dot_v) ** SHININESS
+
+        strength = ((AMBIENT + DIFFUSE * diffuse + SPECULAR * specular) *
+                    self.calculate_attenuation(distances) * self.intensities)
+        return strength @ self.colors
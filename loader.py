@@ -0,0 +1,225 @@
+# loader.py
+"""Загрузка сеток из Wavefront OBJ и двоичного STL с кэшем в двоичном формате.
+
+Файлы читаются блоками и разбираются векторно, без списка Python на каждую вершину
+или грань. После первой загрузки рядом с файлом (или в cache_dir) сохраняется кэш:
+заголовок, массив вершин float64 (N, 3) и массив треугольников int32 (T, 3). Повторная
+загрузка отображает кэш в память без копирования; кэш пересоздаётся, если исходный
+файл изменился.
+"""
+
+import os
+import re
+import struct
+
+import numpy as np
+from object import Object3D
+
+CACHE_SUFFIX = ".meshcache"
+CACHE_MAGIC = b"MESHCACH"
+CACHE_VERSION = 1
+# magic, версия, число вершин, число треугольников, размер и время изменения исходного файла
+CACHE_HEADER = struct.Struct("<8sIxxxxQQQQ")
+CACHE_HEADER_SIZE = 64  # Заголовок дополняется до 64 байт, чтобы массивы были выровнены
+
+CHUNK_SIZE = 1 << 24  # Размер блока чтения OBJ в байтах
+STL_CHUNK_TRIANGLES = 1 << 20
+STL_RECORD = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+
+# Всё после первого '/' в описании вершины грани (текстурные координаты и нормали)
+_FACE_REFERENCES = re.compile(rb"/\S*")
+
+
+def load_mesh(path, color=(255, 255, 255), cache=True, cache_dir=None):
+    """Загружает сетку из .obj или .stl в Object3D, используя двоичный кэш."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".obj":
+        return load_obj(path, color, cache, cache_dir)
+    if extension == ".stl":
+        return load_stl(path, color, cache, cache_dir)
+    raise ValueError(f"Unsupported mesh format: {extension!r}")
+
+
+def load_obj(path, color=(255, 255, 255), cache=True, cache_dir=None):
+    """Загружает Wavefront OBJ: вершины (v) и грани (f); многоугольники разбиваются веером."""
+    return _load(path, _parse_obj, color, cache, cache_dir)
+
+
+def load_stl(path, color=(255, 255, 255), cache=True, cache_dir=None):
+    """Загружает двоичный STL; совпадающие вершины соседних треугольников объединяются."""
+    return _load(path, _parse_stl, color, cache, cache_dir)
+
+
+def cache_path(path, cache_dir=None):
+    """Путь к файлу кэша для исходного файла сетки."""
+    if cache_dir is None:
+        return path + CACHE_SUFFIX
+    return os.path.join(cache_dir, os.path.basename(path) + CACHE_SUFFIX)
+
+
+def read_cache(path, source_stat=None):
+    """Отображает файл кэша в память; возвращает (vertices, triangles) только для чтения.
+
+    Если передан source_stat, а кэш построен по другой версии исходного файла, либо кэш
+    повреждён, возвращает None.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(CACHE_HEADER_SIZE)
+    except OSError:
+        return None
+    if len(header) < CACHE_HEADER_SIZE:
+        return None
+    magic, version, vertex_count, triangle_count, size, mtime = CACHE_HEADER.unpack_from(header)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None
+    if source_stat is not None and (size, mtime) != (source_stat.st_size, source_stat.st_mtime_ns):
+        return None
+    expected = CACHE_HEADER_SIZE + vertex_count * 24 + triangle_count * 12
+    if os.path.getsize(path) != expected:
+        return None
+
+    vertices = np.zeros((0, 3))
+    triangles = np.zeros((0, 3), dtype=np.int32)
+    if vertex_count:
+        vertices = np.memmap(path, dtype="<f8", mode="r", offset=CACHE_HEADER_SIZE, shape=(vertex_count, 3))
+    if triangle_count:
+        triangles = np.memmap(path, dtype="<i4", mode="r", offset=CACHE_HEADER_SIZE + vertex_count * 24,
+                              shape=(triangle_count, 3))
+    return vertices, triangles
+
+
+def write_cache(path, vertices, triangles, source_stat):
+    """Записывает кэш сетки атомарно: сначала во временный файл, затем переименованием."""
+    header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(vertices), len(triangles),
+                               source_stat.st_size, source_stat.st_mtime_ns)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(header.ljust(CACHE_HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(vertices, dtype="<f8").tobytes())
+            f.write(np.ascontiguousarray(triangles, dtype="<i4").tobytes())
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.unlink(temporary)  # Недописанный кэш не оставляем
+        raise
+
+
+def _load(path, parse, color, cache, cache_dir):
+    source_stat = os.stat(path)
+    target = cache_path(path, cache_dir)
+    cached = read_cache(target, source_stat) if cache else None
+    if cached is None:
+        vertices, triangles = parse(path)
+        if cache:
+            try:
+                write_cache(target, vertices, triangles, source_stat)
+                cached = read_cache(target, source_stat)
+            except OSError:
+                pass  # Каталог только для чтения или нет места: сетка загружается без кэша
+        if cached is None:
+            cached = (vertices, triangles)
+    vertices, triangles = cached
+    return Object3D(vertices, triangles, color)
+
+
+def _parse_obj(path):
+    """Разбирает OBJ блоками; возвращает вершины (N, 3) float64 и треугольники (T, 3) int32."""
+    vertex_chunks = []
+    triangle_chunks = []
+    vertex_count = 0
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(CHUNK_SIZE)
+            data = tail + block
+            if block:
+                # Неполная последняя строка переносится в следующий блок
+                cut = data.rfind(b"\n") + 1
+                data, tail = data[:cut], data[cut:]
+            elif not data:
+                break
+            vertices, triangles = _parse_obj_block(data, vertex_count)
+            vertex_chunks.append(vertices)
+            triangle_chunks.append(triangles)
+            vertex_count += len(vertices)
+            if not block:
+                break
+
+    vertices = np.concatenate(vertex_chunks) if vertex_chunks else np.zeros((0, 3))
+    triangles = np.concatenate(triangle_chunks) if triangle_chunks else np.zeros((0, 3), dtype=np.int64)
+    if triangles.size and (triangles.min() < 0 or triangles.max() >= len(vertices)):
+        raise ValueError(f"{path}: face references a missing vertex")
+    return vertices, triangles.astype(np.int32)
+
+
+def _parse_obj_block(data, vertex_offset):
+    """Разбирает блок целых строк OBJ; индексы граней переводятся в нумерацию с нуля."""
+    lines = data.split(b"\n")
+    vertex_lines = [line[2:] for line in lines if line.startswith(b"v ")]
+    vertices = _parse_numbers(vertex_lines, float, 3)
+
+    face_lines = [(i, line[2:]) for i, line in enumerate(lines) if line.startswith(b"f ")]
+    if not face_lines:
+        return vertices, np.zeros((0, 3), dtype=np.int64)
+
+    # Отрицательные индексы отсчитываются от числа вершин, объявленных до строки грани
+    is_vertex = np.fromiter((line.startswith(b"v ") for line in lines), dtype=bool, count=len(lines))
+    declared = vertex_offset + np.cumsum(is_vertex)
+    rows = np.array([i for i, _ in face_lines])
+    text = _FACE_REFERENCES.sub(b"", b"\n".join(line for _, line in face_lines))
+
+    # Число вершин каждой грани — число начал чисел в её строке
+    chars = np.frombuffer(text, dtype=np.uint8)
+    space = (chars == ord(" ")) | (chars == ord("\t")) | (chars == ord("\r")) | (chars == ord("\n"))
+    starts = ~space
+    starts[1:] &= space[:-1]
+    line = np.cumsum(chars == ord("\n"))
+    counts = np.bincount(line[starts], minlength=len(face_lines))
+    indices = np.array(text.split(), dtype=np.int64)
+    if indices.size != counts.sum():
+        raise ValueError("malformed face line in OBJ file")
+    owner = np.repeat(np.arange(len(face_lines)), counts)
+    indices = np.where(indices < 0, indices + declared[rows][owner], indices - 1)
+
+    # Веерное разбиение многоугольников: (first, k, k + 1) для k = 1 .. count - 2
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    fan = np.maximum(counts - 2, 0)
+    first = np.repeat(starts, fan)
+    k = np.arange(fan.sum()) - np.repeat(np.cumsum(fan) - fan, fan) + 1
+    triangles = np.stack((indices[first], indices[first + k], indices[first + k + 1]), axis=1)
+    return vertices, triangles
+
+
+def _parse_numbers(lines, dtype, width):
+    """Первые width чисел каждой строки в массив (len(lines), width)."""
+    if not lines:
+        return np.zeros((0, width), dtype=dtype)
+    values = np.array(b"\n".join(lines).split(), dtype=dtype)
+    if values.size == len(lines) * width:
+        return values.reshape(-1, width)
+    # В строках есть дополнительные значения (w, цвет вершины): разбираем построчно
+    return np.array([line.split()[:width] for line in lines], dtype=dtype)
+
+
+def _parse_stl(path):
+    """Читает двоичный STL блоками; возвращает уникальные вершины и треугольники (T, 3) int32."""
+    with open(path, "rb") as f:
+        header = f.read(84)
+        if len(header) < 84:
+            raise ValueError(f"{path}: not a binary STL file")
+        (count,) = struct.unpack_from("<I", header, 80)
+        if os.path.getsize(path) != 84 + count * STL_RECORD.itemsize:
+            raise ValueError(f"{path}: not a binary STL file (ASCII STL is not supported)")
+        corners = np.empty((count * 3, 3), dtype=np.float32)
+        for start in range(0, count, STL_CHUNK_TRIANGLES):
+            records = np.fromfile(f, dtype=STL_RECORD, count=min(STL_CHUNK_TRIANGLES, count - start))
+            corners[start * 3:(start + len(records)) * 3] = records["vertices"].reshape(-1, 3)
+
+    # STL хранит вершины каждого треугольника отдельно; объединяем совпадающие по битам
+    corners += 0.0  # -0.0 -> 0.0, чтобы одинаковые точки совпадали побитово
+    keys = corners.view(np.dtype((np.void, 12))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    vertices = corners[first].astype(np.float64)
+    return vertices, inverse.reshape(-1, 3).astype(np.int32)
@@ -1,40 +1,34 @@
 # main.py
 
+import argparse
+import numpy as np
+from engine import Engine
+from animation import Track
 from renderer import Renderer
-from object import Cube, Sphere, Plane
+from object import Cube
+from scene import SceneNode
 from light import Light
 from camera import Camera
-from vector import Vector3, Matrix4
-from time import sleep
+from vector import Vector3
+
+# Positions and colors of the demo cubes
+CUBE_POSITIONS = [
+    (-3, 0, 3),  # Left
+    (3, 0, 3),   # Right
+    (0, 3, 3),   # Top
+    (0, -3, 3)   # Bottom
+]
+CUBE_COLORS = [
+    (255, 100, 100),  # Red cube
+    (100, 255, 100),  # Green cube
+    (100, 100, 255),  # Blue cube
+    (255, 255, 100)   # Yellow cube
+]
+# Period of the spin animation; angular speeds are 0.3 and 0.5 rad/s times the cube number
+SPIN_PERIOD = 20 * np.pi
 
 def create_scene():
-    """Create a scene with multiple objects and light sources"""
-    # Initialize objects
-    objects = [
-        Cube(size=1.5, color=(255, 100, 100)),  # Red cube
-        Cube(size=1.5, color=(100, 255, 100)),  # Green cube
-        Cube(size=1.5, color=(100, 100, 255)),  # Blue cube
-        Cube(size=1.5, color=(255, 255, 100))   # Yellow cube
-    ]
-    
-    # Position objects
-    translations = [
-        Matrix4.translation(-3, 0, 3),  # Left
-        Matrix4.translation(3, 0, 3),   # Right
-        Matrix4.translation(0, 3, 3),   # Top
-        Matrix4.translation(0, -3, 3)   # Bottom
-    ]
-    
-    for obj, trans in zip(objects, translations):
-        obj.transform(trans)
-    
-    # Initialize lights with different colors
-    lights = [
-        Light(Vector3(-5, 3, 0), color=(255, 100, 100)),  # Red light
-        Light(Vector3(5, 3, 0), color=(100, 255, 100)),   # Green light
-        Light(Vector3(0, 5, 0), color=(100, 100, 255))    # Blue light
-    ]
-    
+    """Create an engine with a scene of multiple objects and light sources"""
     # Initialize camera
     camera = Camera(
         position=Vector3(0, 0, -10),
@@ -45,52 +39,54 @@ def create_scene():
         near=0.1,
         far=100
     )
+    # Кадр выводится в фоновом потоке, пока рисуется следующий
+    engine = Engine(renderer=Renderer(pipelined=True), camera=camera)
+
+    # All cubes share one model-space mesh; each node only carries its transform and color
+    cube = Cube(size=1.5)
+    for position, color in zip(CUBE_POSITIONS, CUBE_COLORS):
+        engine.add_object(SceneNode(cube, position=position, color=color))
+    
+    # Initialize lights with different colors
+    engine.add_light(Light(Vector3(-5, 3, 0), color=(255, 100, 100)))  # Red light
+    engine.add_light(Light(Vector3(5, 3, 0), color=(100, 255, 100)))   # Green light
+    engine.add_light(Light(Vector3(0, 5, 0), color=(100, 100, 255)))   # Blue light
     
-    return objects, lights, camera
+    return engine
 
-def update_objects(objects, time):
-    """Update object rotations"""
-    for i, obj in enumerate(objects):
-        # Reset object vertices
-        obj.vertices = Cube(size=1.5, color=obj.color).vertices
-        
-        # Apply unique rotation to each object
-        rotation = Matrix4.rotation_y(time * 0.5 * (i + 1))
-        rotation = rotation @ Matrix4.rotation_x(time * 0.3 * (i + 1))
-        obj.transform(rotation)
-        
-        # Reapply position
-        translations = [
-            Matrix4.translation(-3, 0, 3),
-            Matrix4.translation(3, 0, 3),
-            Matrix4.translation(0, 3, 3),
-            Matrix4.translation(0, -3, 3)
-        ]
-        obj.transform(translations[i])
+def animate_objects(engine):
+    """Spin every object with a looping keyframe track; all tracks are evaluated in one batch"""
+    for i, node in enumerate(engine.objects):
+        # Over SPIN_PERIOD seconds both angles turn by whole revolutions, so the loop is seamless
+        turns = np.array([0.3, 0.5, 0.0]) * (i + 1) * SPIN_PERIOD
+        engine.animate(node, rotation=Track([0.0, SPIN_PERIOD], [(0.0, 0.0, 0.0), turns]), start=0.0)
 
-def main():
-    objects, lights, camera = create_scene()
-    renderer = Renderer()
-    time = 0
-    projection_toggle = True
-    while True:
-        # Handle projection toggle
-        import msvcrt
-        if msvcrt.kbhit():
-            key = msvcrt.getch()
-            if key == b'p':
-                projection_toggle = not projection_toggle
-                camera.projection_type = "perspective" if projection_toggle else "orthographic"
-                print(f"Switched to {camera.projection_type} projection")
+def toggle_projection(engine):
+    """Switch the camera between perspective and orthographic projection"""
+    camera = engine.camera
+    camera.projection_type = "orthographic" if camera.projection_type == "perspective" else "perspective"
+    engine.renderer.flush()  # Не смешиваем сообщение с кадром, который ещё выводится
+    print(f"Switched to {camera.projection_type} projection")
+    engine.renderer.presenter.invalidate()  # Сообщение испортило экран: следующий кадр целиком
 
-        # Update object rotations
-        time += 0.01
-        update_objects(objects, time)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rotating cubes demo.")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="broadcast frames to clients at HOST:PORT or a Unix socket path "
+                             "instead of drawing locally (view with: python frameserver.py ADDRESS)")
+    args = parser.parse_args(argv)
 
-        # Render the scene
-        renderer.render(objects, camera, lights)
-        input()  # Ожидание ввода от пользователя
-        sleep(0.001)  # Задержка для управления скоростью отображения
+    engine = create_scene()
+    if args.serve:
+        engine.serve(args.serve)
+    # Вращение зависит от времени симуляции, а не от числа кадров
+    animate_objects(engine)
+    engine.bind_key("p", toggle_projection)
+    engine.bind_key("q", Engine.stop)
+    try:
+        engine.run(fps=30)
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
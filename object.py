@@ -1,86 +1,205 @@
 # object.py
 
-import math
-from vector import Vector3  # Импортируем класс Vector3 из файла vector.py
+import functools
+import numpy as np
+from vector import Vector3, transform_points  # Импортируем векторные утилиты из файла vector.py
 
 DEBUG = False  # Установите True для включения отладки
 
+
+def as_vertex_array(vertices):
+    """Приводит список Vector3 или массивоподобные данные к непрерывному массиву (N, 3)."""
+    if isinstance(vertices, np.ndarray):
+        array = vertices
+    else:
+        vertices = list(vertices)
+        if vertices and isinstance(vertices[0], Vector3):
+            array = [(v.x, v.y, v.z) for v in vertices]
+        else:
+            array = vertices
+    array = np.ascontiguousarray(array, dtype=np.float64)
+    return array.reshape(-1, 3)
+
+
+def fan_triangles(faces):
+    """Разбивает грани веером на треугольники: (T, 3) индексов вершин и (T,) номеров граней."""
+    if isinstance(faces, np.ndarray) and faces.ndim == 2 and faces.shape[1] == 3:
+        return faces.astype(np.intp), np.arange(len(faces))  # Грани уже треугольные
+    if isinstance(faces, np.ndarray) and faces.ndim == 2:
+        sizes = np.full(len(faces), faces.shape[1], dtype=np.intp)
+    else:
+        sizes = np.array([len(face) for face in faces], dtype=np.intp)
+    if len(faces) and np.all(sizes == sizes[0]) and sizes[0] >= 3:
+        # Все грани одной арности: разбиение без цикла по граням
+        polygons = np.asarray(faces, dtype=np.intp)
+        k = np.arange(1, sizes[0] - 1)
+        triangles = np.stack((np.repeat(polygons[:, :1], len(k), axis=1),
+                              polygons[:, k], polygons[:, k + 1]), axis=2).reshape(-1, 3)
+        return triangles, np.repeat(np.arange(len(faces)), len(k))
+    triangles = [(face[0], face[k], face[k + 1]) for face in faces for k in range(1, len(face) - 1)]
+    face_ids = [i for i, face in enumerate(faces) for _ in range(1, len(face) - 1)]
+    return (np.array(triangles, dtype=np.intp).reshape(-1, 3), np.array(face_ids, dtype=np.intp))
+
+
+def face_corners(faces):
+    """Первые три вершины каждой грани (F, 3); у граней меньше чем из трёх вершин — -1."""
+    if isinstance(faces, np.ndarray) and faces.ndim == 2 and faces.shape[1] >= 3:
+        return faces[:, :3].astype(np.intp)
+    corners = np.full((len(faces), 3), -1, dtype=np.intp)
+    for i, face in enumerate(faces):
+        if len(face) >= 3:
+            corners[i] = face[:3]
+    return corners
+
+
+def corner_normals(vertices, corners):
+    """Единичные нормали граней (F, 3) по их первым трём вершинам corners (F, 3).
+
+    У граней без нормали (меньше трёх вершин, индексы за пределами массива вершин,
+    вырожденная геометрия) строка заполнена NaN.
+    """
+    normals = np.full((len(corners), 3), np.nan)
+    valid = np.all((corners >= 0) & (corners < len(vertices)), axis=1)
+    if DEBUG and not valid.all():
+        print(f"Ошибка: {np.count_nonzero(~valid)} граней без нормали или с несуществующими вершинами.")
+    if not valid.any():
+        return normals
+    corners = np.where(valid[:, None], corners, 0)
+
+    v0 = vertices[corners[:, 0]]
+    cross = np.cross(vertices[corners[:, 1]] - v0, vertices[corners[:, 2]] - v0)
+    lengths = np.linalg.norm(cross, axis=1)
+    valid &= lengths > 0  # Вырожденные грани дают нулевую нормаль
+
+    normals[valid] = cross[valid] / lengths[valid, None]
+    return normals
+
+
+def vertex_normals(vertices, triangles):
+    """Сглаженные нормали вершин (N, 3), взвешенные по площади прилежащих треугольников.
+
+    Вершины с одинаковыми координатами (шов UV-сферы) получают общую нормаль. У вершин
+    без треугольников нормаль NaN.
+    """
+    valid = np.all((triangles >= 0) & (triangles < len(vertices)), axis=1)
+    triangles = triangles[valid]
+    # Векторное произведение рёбер направлено по нормали, а его длина — удвоенная площадь
+    v0 = vertices[triangles[:, 0]]
+    cross = np.cross(vertices[triangles[:, 1]] - v0, vertices[triangles[:, 2]] - v0)
+
+    # Вершины сливаются по координатам, округлённым до 1e-9
+    _, welded = np.unique(np.round(vertices, 9) + 0.0, axis=0, return_inverse=True)
+    welded = welded.ravel()
+    owners = welded[triangles].ravel()
+    sums = np.stack([np.bincount(owners, np.repeat(cross[:, axis], 3), minlength=welded.max(initial=-1) + 1)
+                     for axis in range(3)], axis=1)
+    normals = sums[welded]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        return np.where(lengths > 0, normals / lengths, np.nan)
+
+
+class IndexedMesh:
+    """Индексная треугольная сетка с нормалями, посчитанными один раз в координатах модели.
+
+    triangles — индексы вершин (T, 3) int32, triangle_faces — номер исходной грани
+    каждого треугольника (T,) int32, face_corners — первые три вершины каждой грани (F, 3)
+    (-1 у граней меньше чем из трёх вершин), face_normals — единичные нормали граней (F, 3),
+    vertex_normals — сглаженные нормали вершин (N, 3). Все массивы только для чтения;
+    при отрисовке нормали лишь умножаются на матрицу нормалей (vector.normal_matrix).
+    """
+
+    def __init__(self, vertices, faces):
+        self.vertices = as_vertex_array(vertices)
+        triangles, triangle_faces = fan_triangles(faces)
+        self.triangles = _frozen(triangles.astype(np.int32))
+        self.triangle_faces = _frozen(triangle_faces.astype(np.int32))
+        self.face_corners = _frozen(face_corners(faces))
+        self.face_normals = _frozen(corner_normals(self.vertices, self.face_corners))
+        self.vertex_normals = _frozen(vertex_normals(self.vertices, self.triangles))
+
+
 class Object3D:
     def __init__(self, vertices, faces, color):
-        self.vertices = vertices  # Список вершин (объекты Vector3)
-        self.faces = faces        # Список граней (индексы вершин)
+        self.vertices = as_vertex_array(vertices)  # Массив вершин (N, 3)
+        self.faces = faces        # Список граней (индексы вершин) или массив индексов (F, k)
         self.color = color        # Цвет объекта
+        self.double_sided = False  # Двусторонние грани не отсекаются как задние
+        self.smooth_shading = False  # Гуро: освещение по сглаженным нормалям вершин
+        self._mesh = None          # Кэш индексной сетки с нормалями
+
+    @property
+    def vertices(self):
+        """Вершины (N, 3) только для чтения. Сетку меняют заменой массива (например,
+        методом transform): по замене пересчитываются кэши сетки и узлы сцены."""
+        return self._vertices
+
+    @vertices.setter
+    def vertices(self, vertices):
+        # Только для чтения — своё представление массива; массив вызывающего не меняется
+        array = as_vertex_array(vertices).view()
+        array.setflags(write=False)
+        self._vertices = array
 
     def transform(self, matrix):
-        """Применяет матрицу трансформации к вершинам объекта."""
-        self.vertices = [matrix * v for v in self.vertices]  # Умножаем матрицу на каждую вершину
+        """Применяет матрицу трансформации ко всем вершинам объекта одним умножением."""
+        self.vertices = transform_points(matrix, self.vertices)
+
+    def mesh(self):
+        """Индексная сетка IndexedMesh с нормалями граней и вершин.
+
+        Строится один раз и пересоздаётся, только если массив вершин заменён (например,
+        методом transform) или изменился список граней.
+        """
+        key = (id(self.faces), len(self.faces))
+        if self._mesh is None or self._mesh[0] is not self.vertices or self._mesh[1] != key:
+            self._mesh = (self.vertices, key, IndexedMesh(self.vertices, self.faces))
+        return self._mesh[2]
+
+    def world_vertices(self):
+        """Вершины в мировых координатах: у Object3D они хранятся уже преобразованными."""
+        return self.vertices
+
+    def world_face_normals(self):
+        """Нормали граней в мировых координатах (F, 3); для Object3D совпадают с нормалями сетки."""
+        return self.mesh().face_normals
+
+    def world_vertex_normals(self):
+        """Сглаженные нормали вершин в мировых координатах (N, 3)."""
+        return self.mesh().vertex_normals
+
+    def bounding_sphere(self):
+        """Ограничивающая сфера вершин: центр (3,) в центре AABB и радиус."""
+        if len(self.vertices) == 0:
+            return np.zeros(3), 0.0
+        center = (self.vertices.min(axis=0) + self.vertices.max(axis=0)) / 2
+        radius = np.sqrt(((self.vertices - center) ** 2).sum(axis=1).max())
+        return center, radius
 
     def calculate_normals(self):
         """Вычисляет нормали для каждой грани объекта."""
-        normals = [None] * len(self.faces)  # Инициализация списка нормалей с None
-        if DEBUG:
-            print(f"Количество вершин: {len(self.vertices)}")
-            print(f"Количество граней: {len(self.faces)}")
-
-        for i, face in enumerate(self.faces):
-            if DEBUG:
-                print(f"Обрабатываем грань: {face}")
-            if len(face) < 3:  # Убедитесь, что грань состоит как минимум из 3 вершин
-                continue
-            
-            # Проверяем индексы перед доступом
-            for index in face:
-                if index >= len(self.vertices):
-                    if DEBUG:
-                        print(f"Ошибка: индекс {index} выходит за пределы вершин.")
-                    return normals  # Завершаем выполнение, если индекс неверный
-
-            # Получаем вершины грани
-            v1 = self.vertices[face[1]] - self.vertices[face[0]]
-            v2 = self.vertices[face[2]] - self.vertices[face[0]]
-
-            # Выводим векторы для отладки
-            if DEBUG:
-                print(f"v1: {v1}, v2: {v2}")
-
-            # Проверяем, не нулевые ли векторы
-            if v1.length() == 0 or v2.length() == 0:
-                if DEBUG:
-                    print("Ошибка: один из векторов равен нулю.")
-                continue
-            
-            # Вычисляем нормаль с помощью векторного произведения
-            normal = v1.cross(v2)
-            
-            # Проверяем, не является ли нормаль нулевым вектором
-            if normal.length() == 0:
-                if DEBUG:
-                    print("Ошибка: нормаль равна нулю, пропускаем.")
-                continue
-            
-            normal = normal.normalize()
-            normals[i] = normal  # Сохраняем нормаль в соответствующий индекс
-        return normals
+        return [None if np.isnan(n[0]) else Vector3(n[0], n[1], n[2]) for n in self.mesh().face_normals.tolist()]
 
 class Cube(Object3D):
     def __init__(self, size=1, color=(255, 255, 255)):
         half_size = size / 2
-        vertices = [
-            Vector3(-half_size, -half_size, -half_size),
-            Vector3(half_size, -half_size, -half_size),
-            Vector3(half_size, half_size, -half_size),
-            Vector3(-half_size, half_size, -half_size),
-            Vector3(-half_size, -half_size, half_size),
-            Vector3(half_size, -half_size, half_size),
-            Vector3(half_size, half_size, half_size),
-            Vector3(-half_size, half_size, half_size),
-        ]
+        vertices = np.array([
+            (-1, -1, -1),
+            (1, -1, -1),
+            (1, 1, -1),
+            (-1, 1, -1),
+            (-1, -1, 1),
+            (1, -1, 1),
+            (1, 1, 1),
+            (-1, 1, 1),
+        ], dtype=np.float64) * half_size
         faces = [
-            (0, 1, 2, 3),  # Передняя грань
+            # Обход каждой грани выбран так, чтобы нормаль смотрела наружу
+            (0, 3, 2, 1),  # Передняя грань
             (4, 5, 6, 7),  # Задняя грань
             (0, 1, 5, 4),  # Нижняя грань
             (2, 3, 7, 6),  # Верхняя грань
-            (0, 3, 7, 4),  # Левая грань
+            (0, 4, 7, 3),  # Левая грань
             (1, 2, 6, 5),  # Правая грань
         ]
         super().__init__(vertices, faces, color)
@@ -89,64 +208,110 @@ class Plane(Object3D):
     def __init__(self, width=1, height=1, color=(255, 255, 255)):
         half_width = width / 2
         half_height = height / 2
-        vertices = [
-            Vector3(-half_width, -half_height, 0),  # Нижний левый угол
-            Vector3(half_width, -half_height, 0),   # Нижний правый угол
-            Vector3(half_width, half_height, 0),    # Верхний правый угол
-            Vector3(-half_width, half_height, 0),   # Верхний левый угол
-        ]
+        vertices = np.array([
+            (-half_width, -half_height, 0),  # Нижний левый угол
+            (half_width, -half_height, 0),   # Нижний правый угол
+            (half_width, half_height, 0),    # Верхний правый угол
+            (-half_width, half_height, 0),   # Верхний левый угол
+        ], dtype=np.float64)
         faces = [
             (0, 1, 2, 3),  # Единая грань плоскости
         ]
         super().__init__(vertices, faces, color)
+        self.double_sided = True  # Плоскость видна с обеих сторон
+
+@functools.lru_cache(maxsize=64)
+def sphere_mesh(radius, segments):
+    """Вершины и грани UV-сферы; результат общий для всех сфер с теми же параметрами.
+
+    Возвращает массивы только для чтения: вершины ((segments + 1)^2, 3) и
+    четырёхугольные грани (segments^2, 4).
+    """
+    # Генерация вершин: сетка (segments + 1) x (segments + 1) по углам theta/phi
+    theta = np.arange(segments + 1) * np.pi / segments  # Угол по вертикали
+    phi = np.arange(segments + 1) * 2 * np.pi / segments  # Угол по горизонтали
+    sin_theta = np.sin(theta)[:, None]
+    vertices = np.empty((segments + 1, segments + 1, 3), dtype=np.float64)
+    vertices[..., 0] = radius * sin_theta * np.cos(phi)
+    vertices[..., 1] = radius * sin_theta * np.sin(phi)
+    vertices[..., 2] = radius * np.cos(theta)[:, None]
+
+    # Генерация граней
+    i, j = np.meshgrid(np.arange(segments), np.arange(segments), indexing="ij")
+    first = (i * (segments + 1) + j).ravel()
+    second = first + segments + 1
+    faces = np.stack((first, second, second + 1, first + 1), axis=1)
+    return _frozen(vertices.reshape(-1, 3)), _frozen(faces)
+
+
+@functools.lru_cache(maxsize=64)
+def cylinder_mesh(radius, height, segments):
+    """Вершины и боковые грани цилиндра; результат общий для цилиндров с теми же параметрами."""
+    # Генерация вершин: чередуем нижнее и верхнее кольцо
+    angle = np.arange(segments) * 2 * np.pi / segments
+    vertices = np.empty((segments, 2, 3), dtype=np.float64)
+    vertices[..., 0] = (radius * np.cos(angle))[:, None]
+    vertices[..., 1] = (radius * np.sin(angle))[:, None]
+    vertices[:, 0, 2] = -height / 2  # Нижняя грань
+    vertices[:, 1, 2] = height / 2   # Верхняя грань
+
+    # Генерация граней
+    i = np.arange(segments)
+    next_index = (i + 1) % segments
+    faces = np.stack((i * 2, next_index * 2, next_index * 2 + 1, i * 2 + 1), axis=1)
+    return _frozen(vertices.reshape(-1, 3)), _frozen(faces)
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
 
 class Sphere(Object3D):
     def __init__(self, radius=1, color=(255, 255, 255), segments=12):
-        self.vertices = []
-        self.faces = []
-        self.color = color
-
-        # Генерация вершин
-        for i in range(segments + 1):
-            theta = i * math.pi / segments  # Угол по вертикали
-            for j in range(segments + 1):
-                phi = j * 2 * math.pi / segments  # Угол по горизонтали
-                x = radius * math.sin(theta) * math.cos(phi)
-                y = radius * math.sin(theta) * math.sin(phi)
-                z = radius * math.cos(theta)
-                self.vertices.append(Vector3(x, y, z))
-
-        # Генерация граней
-        for i in range(segments):
-            for j in range(segments):
-                first = (i * (segments + 1)) + j
-                second = first + segments + 1
-                # Проверяем, чтобы индексы не выходили за пределы
-                if second + 1 < len(self.vertices) and first + 1 < len(self.vertices):
-                    self.faces.append((first, second, second + 1, first + 1))
-
-        super().__init__(self.vertices, self.faces, color)
-
-        # Проверьте количество вершин и граней
-        # print(f"Количество вершин: {len(self.vertices)}")
-        # print(f"Количество граней: {len(self.faces)}")
+        # Сетка берётся из кэша: одинаковые сферы разделяют вершины и грани
+        vertices, faces = sphere_mesh(float(radius), int(segments))
+        super().__init__(vertices, faces, color)
+
 class Cylinder(Object3D):
     def __init__(self, radius=1, height=2, color=(255, 255, 255), segments=12):
-        self.vertices = []
-        self.faces = []
-        self.color = color
-
-        # Генерация вершин
-        for i in range(segments):
-            angle = i * 2 * math.pi / segments
-            x = radius * math.cos(angle)
-            y = radius * math.sin(angle)
-            self.vertices.append(Vector3(x, y, -height / 2))  # Нижняя грань
-            self.vertices.append(Vector3(x, y, height / 2))   # Верхняя грань
-
-        # Генерация граней
-        for i in range(segments):
-            next_index = (i + 1) % segments
-            self.faces.append((i * 2, next_index * 2, next_index * 2 + 1, i * 2 + 1))
-
-        super().__init__(self.vertices, self.faces, color)
\ No newline at end of file
+        vertices, faces = cylinder_mesh(float(radius), float(height), int(segments))
+        super().__init__(vertices, faces, color)
+
+
+class LevelOfDetail:
+    """Варианты одной геометрии с разным числом сегментов; выбор по размеру на экране.
+
+    factory(segments) строит геометрию (например, lambda s: Sphere(1, segments=s)).
+    Варианты создаются по первому требованию и кэшируются. select выбирает наименьшее
+    число сегментов, при котором на сегмент приходится не больше pixels_per_segment
+    пикселей окружности объекта на экране.
+    """
+
+    def __init__(self, factory, segments=(6, 12, 24, 48), pixels_per_segment=3.0):
+        self.factory = factory
+        self.segments = tuple(sorted(segments))
+        self.pixels_per_segment = pixels_per_segment
+        self._levels = {}
+
+    def level(self, segments):
+        """Геометрия с заданным числом сегментов."""
+        geometry = self._levels.get(segments)
+        if geometry is None:
+            geometry = self._levels[segments] = self.factory(segments)
+        return geometry
+
+    def segments_for(self, screen_radius):
+        """Число сегментов для объекта с радиусом screen_radius пикселей на экране."""
+        needed = 2 * np.pi * screen_radius / self.pixels_per_segment
+        for segments in self.segments:
+            if segments >= needed:
+                return segments
+        return self.segments[-1]
+
+    def select(self, screen_radius):
+        return self.level(self.segments_for(screen_radius))
+
+    def bounding_sphere(self):
+        """Ограничивающая сфера самого детального варианта; охватывает и остальные."""
+        return self.level(self.segments[-1]).bounding_sphere()
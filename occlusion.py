@@ -0,0 +1,87 @@
+# occlusion.py
+"""Иерархический Z-буфер (Hi-Z) для отсечения перекрытой геометрии.
+
+Пирамида хранит для плиток буфера кадра наибольшую записанную глубину: нулевой уровень —
+плитки tile x tile пикселей, каждый следующий — максимум по 2 x 2 плиткам предыдущего.
+Если ближайшая точка объекта или треугольника дальше, чем самый дальний пиксель всех
+плиток, которые накрывает его экранная рамка, ни один его фрагмент не пройдёт тест
+глубины, и его можно не освещать и не растеризовать. Рамка проверяется на уровне, где
+она накрывает не больше 2 x 2 клеток, поэтому проверка стоит четыре выборки на элемент.
+"""
+
+import numpy as np
+
+TILE_SIZE = 8
+
+
+class DepthPyramid:
+    """Пирамида наибольших глубин плиток буфера кадра width x height."""
+
+    def __init__(self, width, height, tile_size=TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        columns = -(-width // tile_size)
+        rows = -(-height // tile_size)
+        shapes = [(rows, columns)]
+        while shapes[-1] != (1, 1):
+            rows, columns = shapes[-1]
+            shapes.append((-(-rows // 2), -(-columns // 2)))
+        self.shapes = shapes
+        sizes = [rows * columns for rows, columns in shapes]
+        self._offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        self._columns = np.array([columns for _, columns in shapes])
+        # Все уровни подряд в одном массиве: выборка с любого уровня — одно обращение по индексу
+        self._cells = np.full(sum(sizes), np.inf, dtype=np.float32)
+        # Есть ли хоть одна полностью закрашенная плитка; иначе проверять нечего
+        self.occluding = False
+        # Плоскость глубины, дополненная до целых плиток; поля за экраном не влияют на максимум
+        self._padded = np.full((shapes[0][0] * tile_size, shapes[0][1] * tile_size), -np.inf, dtype=np.float32)
+
+    def update(self, depth):
+        """Пересчитывает все уровни по плоскости глубины (height, width) буфера кадра."""
+        self._padded[:self.height, :self.width] = depth
+        rows, columns = self.shapes[0]
+        level = self._padded.reshape(rows, self.tile_size, columns, self.tile_size).max(axis=(1, 3))
+        self.occluding = bool(np.isfinite(level).any())
+        for offset, (rows, columns) in zip(self._offsets, self.shapes):
+            if level.shape != (rows, columns):
+                # Нечётная сторона дополняется -inf, чтобы reshape брал ровно 2 x 2 клетки
+                padded = np.full((rows * 2, columns * 2), -np.inf, dtype=np.float32)
+                padded[:level.shape[0], :level.shape[1]] = level
+                level = padded.reshape(rows, 2, columns, 2).max(axis=(1, 3))
+            self._cells[offset:offset + rows * columns] = level.ravel()
+
+    def occluded(self, lower, upper, depths):
+        """Маска (K,) элементов, целиком скрытых уже записанной геометрией.
+
+        lower и upper — углы экранных рамок (K, 2) в координатах буфера, depths — ближайшая
+        глубина каждого элемента (K,). Рамка расширяется до целых пикселей так же, как
+        в растеризаторе, и обрезается по экрану.
+        """
+        lower = np.asarray(lower, dtype=np.float64).reshape(-1, 2)
+        upper = np.asarray(upper, dtype=np.float64).reshape(-1, 2)
+        limits = (self.width - 1, self.height - 1)
+        first = np.clip(np.floor(lower), 0, limits).astype(np.intp) // self.tile_size
+        last = np.clip(np.ceil(upper), 0, limits).astype(np.intp) // self.tile_size
+
+        # Уровень, на котором рамка занимает не больше двух клеток по каждой оси
+        level = np.zeros(len(lower), dtype=np.intp)
+        for _ in range(len(self.shapes) - 1):
+            wide = ((last >> level[:, None]) - (first >> level[:, None]) > 1).any(axis=1)
+            if not wide.any():
+                break
+            level += wide
+        first >>= level[:, None]
+        last >>= level[:, None]
+
+        base = self._offsets[level]
+        columns = self._columns[level]
+        cells = self._cells
+        farthest = np.maximum.reduce([
+            cells[base + first[:, 1] * columns + first[:, 0]],
+            cells[base + first[:, 1] * columns + last[:, 0]],
+            cells[base + last[:, 1] * columns + first[:, 0]],
+            cells[base + last[:, 1] * columns + last[:, 0]],
+        ])
+        return np.asarray(depths) > farthest
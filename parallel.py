@@ -0,0 +1,218 @@
+# parallel.py
+
+import os
+import traceback
+import weakref
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from framebuffer import Framebuffer
+
+# Столбцы упакованного описания треугольника: вершины (6), глубины (3), освещённость (3), цвет (1)
+TRIANGLE_FIELDS = 13
+# Кадр, треугольники которого в сумме накрывают рамками меньше пикселей, растеризуется в
+# своём процессе: пересылка заданий и ожидание процессов стоят дороже самой работы
+PARALLEL_MIN_AREA = 1 << 14
+
+
+def make_tiles(width, height, tile_size):
+    """Разбивает экран на плитки (x0, y0, x1, y1) по строкам; правые и нижние границы не включаются."""
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in range(0, height, tile_size)
+            for x in range(0, width, tile_size)]
+
+
+def covered_area(points, width, height):
+    """Суммарная площадь экранных рамок треугольников (T, 3, 2), обрезанных по экрану."""
+    lower = np.clip(points.min(axis=1), 0, (width, height))
+    upper = np.clip(points.max(axis=1), 0, (width, height))
+    return float(np.prod(upper - lower, axis=1).sum())
+
+
+def unpack_triangles(data):
+    """Разбирает упакованный массив (T, TRIANGLE_FIELDS) на вершины, глубины, освещённость и цвета."""
+    points = data[:, 0:6].reshape(-1, 3, 2)
+    return points, data[:, 6:9], data[:, 9:12], data[:, 12].astype(np.uint16)
+
+
+def draw_tiles(framebuffer, data, tiles, levels, perspective=False):
+    """Растеризует треугольники в каждую из плиток; возвращает (фрагменты, записанные пиксели).
+
+    Треугольники раскладываются по плиткам по ограничивающим рамкам, порядок подачи внутри
+    плитки сохраняется, поэтому результат совпадает с растеризацией всего экрана сразу.
+    """
+    points, depths, intensities, colors = unpack_triangles(data)
+    with np.errstate(invalid="ignore"):
+        min_x = points[:, :, 0].min(axis=1)
+        max_x = points[:, :, 0].max(axis=1)
+        min_y = points[:, :, 1].min(axis=1)
+        max_y = points[:, :, 1].max(axis=1)
+
+    fragments = written = 0
+    for x0, y0, x1, y1 in tiles:
+        # Рамка треугольника расширяется до целых пикселей так же, как в растеризаторе
+        members = np.flatnonzero((np.floor(min_x) < x1) & (np.ceil(max_x) >= x0) &
+                                 (np.floor(min_y) < y1) & (np.ceil(max_y) >= y0))
+        if members.size:
+            counts = framebuffer.draw_triangles(points[members], depths[members], intensities[members],
+                                                colors[members], levels, rect=(x0, y0, x1, y1),
+                                                perspective=perspective)
+            fragments += counts[0]
+            written += counts[1]
+    return fragments, written
+
+
+def _worker_main(connection, framebuffer_name, width, height):
+    """Цикл процесса-растеризатора: получает задания, пишет пиксели прямо в общий буфер кадра."""
+    shared = SharedMemory(name=framebuffer_name)
+    framebuffer = Framebuffer(width, height, buffer=shared.buf)
+    inputs = None
+    try:
+        while True:
+            job = connection.recv()
+            if job is None:
+                break
+            inputs_name, count, tiles, levels, perspective = job
+            try:
+                if inputs is None or inputs.name != inputs_name:
+                    if inputs is not None:
+                        inputs.close()
+                    inputs = SharedMemory(name=inputs_name)
+                data = np.ndarray((count, TRIANGLE_FIELDS), dtype=np.float64, buffer=inputs.buf)
+                connection.send(("ok", draw_tiles(framebuffer, data, tiles, levels, perspective)))
+                del data
+            except Exception:
+                connection.send(("error", traceback.format_exc()))
+    finally:
+        del framebuffer
+        shared.close()
+        if inputs is not None:
+            inputs.close()
+
+
+def _shutdown(processes, connections, memories):
+    """Останавливает процессы-растеризаторы и освобождает общую память."""
+    for connection in connections:
+        try:
+            connection.send(None)
+        except OSError:
+            pass
+    for process in processes:
+        process.join(timeout=1)
+        if process.is_alive():
+            process.terminate()
+    for connection in connections:
+        connection.close()
+    for memory in memories:
+        try:
+            memory.close()
+        except BufferError:
+            pass  # На память ещё ссылаются массивы; отображение освободится вместе с ними
+        memory.unlink()
+
+
+class TileRasterizer:
+    """Растеризация экранными плитками в нескольких процессах с общим буфером кадра.
+
+    Плоскости буфера кадра лежат в общей памяти: процессы пишут пиксели своих плиток
+    прямо в них, и между процессами пиксели не пересылаются. Треугольники кадра
+    упаковываются в отдельный общий блок, процессам передаются только его имя и список
+    плиток. Плитки распределяются между процессами через одну, чтобы уравнять нагрузку.
+
+    Процессов запускается не больше, чем ядер: лишние только вытесняли бы друг друга.
+    Если ядро одно, а также для кадров, в которых треугольники накрывают меньше
+    min_area пикселей (covered_area), треугольники растеризуются прямо в общий буфер
+    кадра в вызывающем процессе.
+    """
+
+    def __init__(self, width, height, workers=None, tile_size=64, min_area=PARALLEL_MIN_AREA):
+        self.width = width
+        self.height = height
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_size = tile_size
+        self.tiles = make_tiles(width, height, tile_size)
+        self.processes = min(self.workers, os.cpu_count() or 1, len(self.tiles))
+        self.min_area = min_area
+        # Число кадров, растеризованных в процессах и в вызывающем процессе
+        self.frames_parallel = 0
+        self.frames_inline = 0
+
+        self._framebuffer_memory = SharedMemory(create=True, size=Framebuffer.buffer_size(width, height))
+        self.framebuffer = Framebuffer(width, height, buffer=self._framebuffer_memory.buf)
+        self.framebuffer.clear()
+        self._inputs = None
+        self._processes = []
+        self._connections = []
+        self._memories = [self._framebuffer_memory]
+        self._finalizer = weakref.finalize(self, _shutdown, self._processes, self._connections, self._memories)
+
+    def start(self):
+        """Запускает процессы-растеризаторы (вызывается автоматически при первом кадре)."""
+        if self._processes or self.processes <= 1:
+            return
+        for _ in range(self.processes):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker_main, args=(child, self._framebuffer_memory.name, self.width, self.height),
+                daemon=True)
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._connections.append(parent)
+
+    def draw(self, points, depths, intensities, colors, levels, perspective=False):
+        """Растеризует треугольники кадра во всех плитках; возвращает (фрагменты, записанные пиксели).
+
+        Аргументы — как у Framebuffer.draw_triangles. Буфер кадра нужно очистить заранее.
+        """
+        count = len(points)
+        if count == 0:
+            return 0, 0
+        if self.processes <= 1 or covered_area(np.asarray(points), self.width, self.height) < self.min_area:
+            self.frames_inline += 1
+            return self.framebuffer.draw_triangles(points, depths, intensities, colors, levels,
+                                                   perspective=perspective)
+        self.frames_parallel += 1
+        self.start()
+        data = self._input_array(count)
+        data[:, 0:6] = np.reshape(points, (count, 6))
+        data[:, 6:9] = depths
+        data[:, 9:12] = intensities
+        data[:, 12] = colors
+        del data
+
+        workers = len(self._connections)
+        for index, connection in enumerate(self._connections):
+            connection.send((self._inputs.name, count, self.tiles[index::workers], levels, perspective))
+        fragments = written = 0
+        errors = []
+        for connection in self._connections:
+            status, result = connection.recv()
+            if status == "ok":
+                fragments += result[0]
+                written += result[1]
+            else:
+                errors.append(result)
+        if errors:
+            raise RuntimeError("Tile rasterizer worker failed:\n" + errors[0])
+        return fragments, written
+
+    def _input_array(self, count):
+        """Массив упакованных треугольников в общей памяти; блок растёт удвоением."""
+        size = count * TRIANGLE_FIELDS * 8
+        if self._inputs is None or self._inputs.size < size:
+            capacity = max(size, 1 << 16)
+            if self._inputs is not None:
+                capacity = max(capacity, 2 * self._inputs.size)
+                self._memories.remove(self._inputs)
+                self._inputs.close()
+                self._inputs.unlink()
+            self._inputs = SharedMemory(create=True, size=capacity)
+            self._memories.append(self._inputs)
+        return np.ndarray((count, TRIANGLE_FIELDS), dtype=np.float64, buffer=self._inputs.buf)
+
+    def close(self):
+        """Останавливает процессы и освобождает общую память; буфер кадра больше недействителен."""
+        self.framebuffer = None
+        self._finalizer()
@@ -0,0 +1,202 @@
+# presenter.py
+
+import sys
+import queue
+import threading
+import numpy as np
+
+HIDE_CURSOR = "\033[?25l"
+SHOW_CURSOR = "\033[?25h"
+CLEAR_SCREEN = "\033[2J"
+RESET_COLOR = "\033[0m"
+
+
+def ansi_color(color):
+    """Escape-последовательность 24-битного цвета текста."""
+    return f"\033[38;2;{color[0]};{color[1]};{color[2]}m"
+
+
+class TerminalPresenter:
+    """Выводит буфер кадра в терминал, перерисовывая только изменившиеся клетки.
+
+    Хранит предыдущий кадр, позиционирует курсор только в начале каждой серии
+    изменённых клеток и выдаёт escape-код цвета лишь при смене цвета. Весь кадр
+    уходит в терминал одной буферизованной записью.
+    """
+
+    def __init__(self, symbols, stream=None):
+        self.symbols = symbols
+        self.stream = stream if stream is not None else sys.stdout
+        self._previous_glyphs = None
+        self._previous_colors = None
+        self._color_codes = [""]
+        self._palette_version = None
+
+        # Счётчики трафика
+        self.last_frame_bytes = 0
+        self.total_bytes = 0
+        self.frames = 0
+
+    def invalidate(self):
+        """Требует полной перерисовки следующего кадра (например, после вывода сообщений)."""
+        self._previous_glyphs = None
+        self._previous_colors = None
+
+    def encode(self, framebuffer):
+        """Кодирует отличия буфера кадра от предыдущего показанного кадра в строку."""
+        glyphs, colors = framebuffer.glyphs, framebuffer.colors
+        height = framebuffer.height
+        prefix = ""
+
+        if framebuffer.palette_version != self._palette_version:
+            # Индексы палитры переназначены: кэш кодов и прошлый кадр больше не годятся
+            self._palette_version = framebuffer.palette_version
+            self._color_codes = [""]
+            self.invalidate()
+
+        if self._previous_glyphs is None or self._previous_glyphs.shape != glyphs.shape:
+            prefix = HIDE_CURSOR + CLEAR_SCREEN
+            changed = np.ones(glyphs.shape, dtype=bool)
+            self._previous_glyphs = glyphs.copy()
+            self._previous_colors = colors.copy()
+        else:
+            changed = (glyphs != self._previous_glyphs) | (colors != self._previous_colors)
+            np.copyto(self._previous_glyphs, glyphs)
+            np.copyto(self._previous_colors, colors)
+
+        ys, xs = np.nonzero(changed)
+        if ys.size == 0:
+            return ""
+
+        # Курсор переставляется только там, где серия изменённых клеток прерывается
+        run_start = np.ones(ys.size, dtype=bool)
+        run_start[1:] = (ys[1:] != ys[:-1]) | (xs[1:] != xs[:-1] + 1)
+        moves = np.full(ys.size, "", dtype=object)
+        starts = np.flatnonzero(run_start)
+        moves[starts] = [f"\033[{y + 1};{x + 1}H" for y, x in zip(ys[starts].tolist(), xs[starts].tolist())]
+
+        # Код цвета нужен, только если цвет отличается от последнего выведенного в этом кадре
+        cell_colors = colors[ys, xs]
+        colored = cell_colors != 0
+        last_colored = np.maximum.accumulate(np.where(colored, np.arange(ys.size), -1))
+        previous_color = np.zeros(ys.size, dtype=cell_colors.dtype)
+        previous_color[1:] = np.where(last_colored[:-1] >= 0, cell_colors[last_colored[:-1]], 0)
+        switch = colored & (previous_color != cell_colors)
+
+        palette = framebuffer.palette
+        while len(self._color_codes) < len(palette):
+            self._color_codes.append(ansi_color(palette[len(self._color_codes)]))
+        codes = np.full(ys.size, "", dtype=object)
+        codes[switch] = np.array(self._color_codes, dtype=object)[cell_colors[switch]]
+
+        cells = moves + codes + self.symbols[glyphs[ys, xs]]
+        # Оставляем курсор под кадром, чтобы посторонний вывод не портил изображение
+        return prefix + "".join(cells.tolist()) + f"\033[{height + 1};1H"
+
+    def present(self, framebuffer):
+        """Показывает кадр одной записью и возвращает число отправленных байт."""
+        data = self.encode(framebuffer).encode("utf-8")
+        self._write(data)
+        self.last_frame_bytes = len(data)
+        self.total_bytes += len(data)
+        self.frames += 1
+        return len(data)
+
+    def close(self):
+        """Восстанавливает цвет и курсор терминала."""
+        self._write((RESET_COLOR + SHOW_CURSOR).encode("utf-8"))
+
+    def _write(self, data):
+        if not data:
+            return
+        buffer = getattr(self.stream, "buffer", None)
+        if buffer is not None:
+            self.stream.flush()  # Сохраняем порядок с текстом, уже записанным в поток
+            buffer.write(data)
+            buffer.flush()
+        else:
+            self.stream.write(data.decode("utf-8"))
+            self.stream.flush()
+
+
+class FrameSnapshot:
+    """Копия плоскостей символов и цветов кадра для вывода в другом потоке.
+
+    Палитра берётся ссылкой: до сброса в неё только добавляются цвета, а при сбросе
+    буфер кадра заводит новый список, поэтому старые индексы снимка остаются верны.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.glyphs = np.zeros((height, width), dtype=np.uint8)
+        self.colors = np.zeros((height, width), dtype=np.uint16)
+        self.palette = [None]
+        self.palette_version = None
+
+    def copy_from(self, framebuffer):
+        np.copyto(self.glyphs, framebuffer.glyphs)
+        np.copyto(self.colors, framebuffer.colors)
+        self.palette = framebuffer.palette
+        self.palette_version = framebuffer.palette_version
+
+
+class PipelinedPresenter:
+    """Выводит кадры в фоновом потоке, пока основной поток готовит следующий кадр.
+
+    Кадр копируется в один из двух снимков (двойная буферизация) и ставится в очередь
+    на одно место. Если оба снимка заняты — один выводится, другой ждёт, — submit
+    блокируется, поэтому показ отстаёт от отрисовки не больше чем на один кадр.
+    Ошибка вывода в фоновом потоке повторно возбуждается в submit или flush.
+    """
+
+    def __init__(self, presenter, width, height):
+        self.presenter = presenter
+        self._free = queue.Queue()
+        for _ in range(2):
+            self._free.put(FrameSnapshot(width, height))
+        self._ready = queue.Queue(maxsize=1)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="presenter", daemon=True)
+        self._thread.start()
+
+    def submit(self, framebuffer):
+        """Копирует кадр и передаёт его на вывод; возвращает сразу, если есть свободный снимок."""
+        self._raise_error()
+        if not self._thread.is_alive():
+            raise RuntimeError("Presenter thread is closed.")
+        snapshot = self._free.get()
+        snapshot.copy_from(framebuffer)
+        self._ready.put(snapshot)
+
+    def flush(self):
+        """Ждёт, пока все переданные кадры будут выведены."""
+        self._ready.join()
+        self._raise_error()
+
+    def close(self):
+        """Выводит оставшиеся кадры и останавливает поток."""
+        if self._thread.is_alive():
+            self._ready.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _run(self):
+        while True:
+            snapshot = self._ready.get()
+            try:
+                if snapshot is None:
+                    return
+                if self._error is None:
+                    self.presenter.present(snapshot)
+            except Exception as error:  # Передаётся в основной поток
+                self._error = error
+            finally:
+                if snapshot is not None:
+                    self._free.put(snapshot)
+                self._ready.task_done()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
@@ -0,0 +1,120 @@
+# profiler.py
+"""Профилировщик кадров: скользящие окна времени стадий и счётчиков с выгрузкой в JSON/CSV.
+
+Запись кадра — несколько присваиваний в заранее выделенные кольцевые массивы, без
+выделения памяти, поэтому профилировщик можно не выключать. Перцентили считаются
+только при запросе сводки.
+"""
+
+import csv
+import io
+import json
+from time import perf_counter
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+CSV_FIELDS = ("kind", "name", "samples", "mean", "p50", "p95", "p99", "max", "total")
+
+
+class FrameProfiler:
+    """Скользящие окна последних window кадров по стадиям (секунды) и счётчикам.
+
+    Стадия, которой не было в кадре, не добавляет в своё окно отсчёт, поэтому
+    перцентили редких стадий (lod, instances) считаются только по кадрам, где они были.
+    Для счётчиков дополнительно хранится сумма за всё время.
+    """
+
+    def __init__(self, window=600):
+        self.window = window
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        """Забывает все накопленные отсчёты."""
+        self.frames = 0
+        self._stages = {}
+        self._counters = {}
+        self._totals = {}
+        self._frame_start = None
+
+    def begin_frame(self):
+        """Отмечает начало кадра; полное время кадра запишет end_frame."""
+        self._frame_start = perf_counter()
+
+    def end_frame(self, stage_times=None, counters=None):
+        """Записывает кадр: время стадий в секундах и счётчики (например, Renderer.frame_stats)."""
+        if not self.enabled:
+            return
+        slot = self.frames % self.window
+        # Слот переиспользуется по кругу: серии, не получившие значения в этом кадре, в нём пусты
+        for samples in self._stages.values():
+            samples[slot] = np.nan
+        for samples in self._counters.values():
+            samples[slot] = np.nan
+        if self._frame_start is not None:
+            self._series(self._stages, "frame")[slot] = perf_counter() - self._frame_start
+            self._frame_start = None
+        for stage, seconds in (stage_times or {}).items():
+            self._series(self._stages, stage)[slot] = seconds
+        for name, value in (counters or {}).items():
+            self._series(self._counters, name)[slot] = value
+            self._totals[name] = self._totals.get(name, 0) + value
+        self.frames += 1
+
+    def _series(self, series, name):
+        samples = series.get(name)
+        if samples is None:
+            samples = series[name] = np.full(self.window, np.nan)
+        return samples
+
+    def summary(self):
+        """Сводка окна: {"frames", "stages": {имя: {...мс}}, "counters": {имя: {...}}}."""
+        return {
+            "frames": self.frames,
+            "window": min(self.frames, self.window),
+            "stages": {name: _describe(samples * 1000.0) for name, samples in self._stages.items()},
+            "counters": {name: dict(_describe(samples), total=self._totals[name])
+                         for name, samples in self._counters.items()},
+        }
+
+    def to_json(self, file=None):
+        """Сводка в JSON; если передан файл (путь или поток), записывает её туда."""
+        text = json.dumps(self.summary(), indent=2)
+        if file is not None:
+            _write_text(file, text)
+        return text
+
+    def to_csv(self, file=None):
+        """Сводка в CSV по строке на стадию (мс) и счётчик; как и to_json, может писать в файл."""
+        summary = self.summary()
+        out = io.StringIO()
+        writer = csv.DictWriter(out, CSV_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for kind in ("stages", "counters"):
+            for name, values in summary[kind].items():
+                writer.writerow(dict(values, kind=kind[:-1], name=name))
+        text = out.getvalue()
+        if file is not None:
+            _write_text(file, text)
+        return text
+
+
+def _describe(samples):
+    """Число отсчётов, среднее, перцентили и максимум по непустым слотам окна."""
+    samples = samples[~np.isnan(samples)]
+    if samples.size == 0:
+        return {"samples": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+    values = np.percentile(samples, PERCENTILES).tolist()
+    result = {"samples": int(samples.size), "mean": float(samples.mean())}
+    result.update((f"p{q}", value) for q, value in zip(PERCENTILES, values))
+    result["max"] = float(samples.max())
+    return result
+
+
+def _write_text(file, text):
+    if hasattr(file, "write"):
+        file.write(text)
+    else:
+        with open(file, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
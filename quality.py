@@ -0,0 +1,183 @@
+# quality.py
+"""Адаптивное качество: держит время кадра в пределах бюджета.
+
+Контроллер получает измеренное время каждого кадра, сглаживает его и понижает или
+повышает настройки рендерера по ступеням. Какую настройку трогать, решают времена
+стадий кадра (renderer.stage_times): если дороже всего растеризация — снижается
+внутреннее разрешение, освещение — число источников и зеркальная составляющая,
+геометрия — детализация сеток. Понижение срабатывает быстро, а повышение — только
+после долгого запаса по времени и не раньше чем через паузу после прошлой смены,
+поэтому качество не скачет туда-обратно на границе бюджета. Настройки, заданные
+рендереру до подключения контроллера, служат потолком: выше них качество не поднимается.
+"""
+
+
+def _set_resolution(renderer, scale):
+    renderer.set_render_scale(scale)
+
+
+def _get_resolution(renderer):
+    return renderer.render_scale
+
+
+def _set_lighting(renderer, setting):
+    renderer.max_lights, renderer.specular = setting
+
+
+def _get_lighting(renderer):
+    return renderer.max_lights, renderer.specular
+
+
+def _lighting_rank(setting):
+    max_lights, specular = setting
+    return (float("inf") if max_lights is None else max_lights, specular)
+
+
+def _set_detail(renderer, scale):
+    renderer.detail_scale = scale
+
+
+def _get_detail(renderer):
+    return renderer.detail_scale
+
+
+class Knob:
+    """Настройка рендерера: ступени от лучшей к худшей и стадии кадра, время которых она сокращает.
+
+    getter читает текущее значение настройки у рендерера, setter задаёт его; rank
+    упорядочивает значения (больше — лучше).
+    """
+
+    def __init__(self, name, steps, stages, setter, getter, rank=None):
+        self.name = name
+        self.steps = tuple(steps)
+        self.stages = frozenset(stages)
+        self.setter = setter
+        self.getter = getter
+        self.rank = rank if rank is not None else (lambda value: value)
+
+    def ladder(self, renderer):
+        """Ступени от текущего значения у рендерера (потолок) вниз по ступеням хуже него."""
+        current = self.getter(renderer)
+        return (current,) + tuple(step for step in self.steps if self.rank(step) < self.rank(current))
+
+    def __repr__(self):
+        return f"Knob({self.name!r}, steps={self.steps})"
+
+
+DEFAULT_KNOBS = (
+    Knob("resolution", (1.0, 0.75, 0.5, 0.35), ("clear", "raster"), _set_resolution, _get_resolution),
+    # (max_lights, specular): сначала отключается блик, потом отбрасываются слабые источники
+    Knob("lighting", ((None, True), (None, False), (4, False), (2, False), (1, False)), ("shade",),
+         _set_lighting, _get_lighting, _lighting_rank),
+    Knob("detail", (1.0, 0.75, 0.5, 0.35, 0.25),
+         ("cull", "lod", "transform", "normals", "instances", "project", "clip", "occlusion"),
+         _set_detail, _get_detail),
+)
+
+
+class QualityController:
+    """Выбирает настройки качества по сглаженному времени кадра и его стадий.
+
+    budget — целевое время кадра в секундах. Качество понижается на ступень, если
+    сглаженное время превышает бюджет degrade_frames кадров подряд; понижается та
+    настройка из knobs, стадии которой в сумме дороже всего (если она уже на худшей
+    ступени — следующая по стоимости). Повышается качество, если время ниже
+    budget * upgrade_ratio upgrade_frames кадров подряд, и первой возвращается последняя
+    пониженная настройка. После каждой смены cooldown кадров ничего не меняется:
+    сглаженные времена успевают отразить новые настройки. Если сразу после повышения
+    пришлось снова понизить качество, следующая попытка вернуться к тем же настройкам
+    ждёт вдвое дольше (до max_backoff раз), чтобы не качаться между ними.
+
+    level — число ступеней, на которое качество понижено (0 — лучшее).
+    """
+
+    def __init__(self, renderer, budget, knobs=DEFAULT_KNOBS, smoothing=0.2, degrade_frames=3,
+                 upgrade_frames=30, upgrade_ratio=0.6, cooldown=10, max_backoff=16):
+        self.renderer = renderer
+        self.budget = budget
+        self.knobs = knobs
+        self.smoothing = smoothing
+        self.degrade_frames = degrade_frames
+        self.upgrade_frames = upgrade_frames
+        self.upgrade_ratio = upgrade_ratio
+        self.cooldown = cooldown
+        self.max_backoff = max_backoff
+        # Ступени каждой настройки от текущего значения рендерера вниз; рендерер не меняется
+        self.ladders = [knob.ladder(renderer) for knob in knobs]
+        self.steps = [0] * len(knobs)  # Текущая ступень каждой настройки
+        self.frame_time = None         # Сглаженное время кадра
+        self.knob_times = None         # Сглаженное время стадий каждой настройки
+        self.changes = 0
+        self._history = []             # Номера пониженных настроек в порядке понижения
+        self._upgraded = False         # Была ли последняя смена повышением
+        self._over = 0
+        self._under = 0
+        self._hold = 0
+        self._backoff = {}             # Множитель upgrade_frames для возврата к набору ступеней
+
+    @property
+    def level(self):
+        return len(self._history)
+
+    @property
+    def max_level(self):
+        return sum(len(ladder) - 1 for ladder in self.ladders)
+
+    def update(self, frame_time):
+        """Учитывает время очередного кадра в секундах; возвращает текущий уровень."""
+        stage_times = getattr(self.renderer, "stage_times", {})
+        times = [sum(stage_times.get(stage, 0.0) for stage in knob.stages) for knob in self.knobs]
+        if self.frame_time is None:
+            self.frame_time = frame_time
+            self.knob_times = times
+        else:
+            self.frame_time += self.smoothing * (frame_time - self.frame_time)
+            self.knob_times = [old + self.smoothing * (new - old) for old, new in zip(self.knob_times, times)]
+        if self._hold > 0:
+            self._hold -= 1
+            return self.level
+
+        self._over = self._over + 1 if self.frame_time > self.budget else 0
+        self._under = self._under + 1 if self.frame_time < self.budget * self.upgrade_ratio else 0
+        if self._over >= self.degrade_frames and self.level < self.max_level:
+            if self._upgraded:
+                # Повышение не удержалось: возвращаться к этим ступеням снова — вдвое позже
+                state = tuple(self.steps)
+                self._backoff[state] = min(self._backoff.get(state, 1) * 2, self.max_backoff)
+            self._degrade()
+        elif self.level > 0:
+            target = list(self.steps)
+            target[self._history[-1]] -= 1
+            if self._under >= self.upgrade_frames * self._backoff.get(tuple(target), 1):
+                self._upgrade()
+        return self.level
+
+    def set_level(self, level):
+        """Понижает или повышает качество до level ступеней (0 — лучшее) и начинает паузу."""
+        level = min(max(level, 0), self.max_level)
+        while self.level > level:
+            self._upgrade()
+        while self.level < level:
+            self._degrade()
+        self._hold = self.cooldown
+
+    def _degrade(self):
+        # Самая дорогая по времени стадий настройка из тех, что ещё можно понизить
+        times = self.knob_times or [0.0] * len(self.knobs)
+        candidates = [i for i, ladder in enumerate(self.ladders) if self.steps[i] < len(ladder) - 1]
+        index = max(candidates, key=lambda i: times[i])
+        self._change(index, 1)
+        self._history.append(index)
+        self._upgraded = False
+
+    def _upgrade(self):
+        self._change(self._history.pop(), -1)
+        self._upgraded = True
+
+    def _change(self, index, delta):
+        self.steps[index] += delta
+        self.knobs[index].setter(self.renderer, self.ladders[index][self.steps[index]])
+        self.changes += 1
+        self._over = self._under = 0
+        self._hold = self.cooldown
@@ -0,0 +1,112 @@
+# rasterizer.py
+
+import numpy as np
+
+
+def edge_function(ax, ay, bx, by, px, py):
+    """Знаковая удвоенная площадь треугольника (a, b, p); работает с массивами."""
+    return (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+
+
+def rasterize_triangles(points, width, height, rect=None):
+    """Растеризует пакет треугольников (T, 3, 2) за несколько векторных проходов.
+
+    Треугольники группируются по размеру ограничивающей рамки (степени двойки), и для
+    каждой группы рёберные функции считаются сразу по сетке (треугольник, y, x).
+    Вершины задаются в экранных координатах (x, y); пиксель покрыт, если его центр
+    лежит внутри треугольника или на ребре. rect = (x0, y0, x1, y1) — прямоугольник
+    отсечения (правая и нижняя границы не включаются); фрагменты внутри него совпадают
+    с фрагментами растеризации без отсечения. Возвращает (tris, ys, xs, weights),
+    где tris — номер треугольника для каждого фрагмента, weights — барицентрические веса (K, 3).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3, 2)
+    x0, y0 = points[:, 0, 0], points[:, 0, 1]
+    x1, y1 = points[:, 1, 0], points[:, 1, 1]
+    x2, y2 = points[:, 2, 0], points[:, 2, 1]
+    area = edge_function(x0, y0, x1, y1, x2, y2)
+
+    # Ограничивающие рамки, обрезанные по границам экрана и прямоугольнику отсечения
+    left, top, right, bottom = rect if rect is not None else (0, 0, width, height)
+    with np.errstate(invalid="ignore"):
+        min_x = np.maximum(max(0, left), np.floor(points[:, :, 0].min(axis=1)))
+        max_x = np.minimum(min(width, right) - 1, np.ceil(points[:, :, 0].max(axis=1)))
+        min_y = np.maximum(max(0, top), np.floor(points[:, :, 1].min(axis=1)))
+        max_y = np.minimum(min(height, bottom) - 1, np.ceil(points[:, :, 1].max(axis=1)))
+    keep = (np.abs(area) >= 1e-12) & (min_x <= max_x) & (min_y <= max_y)
+    candidates = np.flatnonzero(keep)
+
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp),
+             np.empty(0, dtype=np.intp), np.empty((0, 3)))
+    if candidates.size == 0:
+        return empty
+
+    min_x = min_x[candidates].astype(np.intp)
+    max_x = max_x[candidates].astype(np.intp)
+    min_y = min_y[candidates].astype(np.intp)
+    max_y = max_y[candidates].astype(np.intp)
+
+    # Класс размера рамки: ближайшая сверху степень двойки по каждой оси
+    log_x = np.ceil(np.log2(max_x - min_x + 1)).astype(np.intp)
+    log_y = np.ceil(np.log2(max_y - min_y + 1)).astype(np.intp)
+    classes, groups = np.unique(log_x * 64 + log_y, return_inverse=True)
+
+    chunks = []
+    for group, size_class in enumerate(classes.tolist()):
+        bw, bh = 1 << (size_class // 64), 1 << (size_class % 64)
+        members = np.flatnonzero(groups.ravel() == group)
+        # Ограничиваем объём одной сетки, чтобы большие треугольники не съедали память
+        step = max(1, (1 << 20) // (bw * bh))
+        for start in range(0, members.size, step):
+            chunks.append(_rasterize_group(points, area, candidates, members[start:start + step],
+                                           min_x, max_x, min_y, max_y, bw, bh))
+
+    tris = np.concatenate([c[0] for c in chunks])
+    order = np.argsort(tris, kind="stable")  # Фрагменты идут в порядке подачи треугольников
+    return (tris[order],
+            np.concatenate([c[1] for c in chunks])[order],
+            np.concatenate([c[2] for c in chunks])[order],
+            np.concatenate([c[3] for c in chunks])[order])
+
+
+def _rasterize_group(points, area, candidates, members, min_x, max_x, min_y, max_y, bw, bh):
+    """Растеризует группу треугольников с рамками не больше bw x bh."""
+    tri = candidates[members]
+    ox = min_x[members][:, None, None]
+    oy = min_y[members][:, None, None]
+    px = ox + np.arange(bw)[None, None, :] + 0.5
+    py = oy + np.arange(bh)[None, :, None] + 0.5
+
+    p = points[tri][:, :, :, None, None]
+    x0, y0, x1, y1, x2, y2 = p[:, 0, 0], p[:, 0, 1], p[:, 1, 0], p[:, 1, 1], p[:, 2, 0], p[:, 2, 1]
+    sign = np.sign(area[tri])[:, None, None]
+    w0 = edge_function(x1, y1, x2, y2, px, py) * sign
+    w1 = edge_function(x2, y2, x0, y0, px, py) * sign
+    w2 = edge_function(x0, y0, x1, y1, px, py) * sign
+
+    # Пиксели за пределами собственной рамки треугольника отбрасываем
+    inside = ((px <= max_x[members][:, None, None] + 0.5) &
+              (py <= max_y[members][:, None, None] + 0.5))
+    mask = inside & (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+    k, rows, cols = np.nonzero(mask)
+
+    weights = np.empty((k.size, 3))
+    weights[:, 0] = w0[k, rows, cols]
+    weights[:, 1] = w1[k, rows, cols]
+    weights[:, 2] = w2[k, rows, cols]
+    weights /= np.abs(area[tri])[k, None]
+    return tri[k], rows + min_y[members][k], cols + min_x[members][k], weights
+
+
+def nearest_fragments(ys, xs, depth, width):
+    """Выбирает для каждого пикселя ближайший фрагмент.
+
+    При равной глубине побеждает фрагмент, поданный раньше, что совпадает с
+    последовательным тестом глубины `depth < buffer`. Возвращает индексы победителей.
+    """
+    if depth.size == 0:
+        return np.empty(0, dtype=np.intp)
+    pixel = ys * width + xs
+    order = np.lexsort((np.arange(depth.size), depth, pixel))
+    first = np.ones(order.size, dtype=bool)
+    first[1:] = pixel[order[1:]] != pixel[order[:-1]]
+    return order[first]
@@ -0,0 +1,285 @@
+# recording.py
+"""Запись кадров в компактный двоичный поток и воспроизведение с перемоткой.
+
+Формат: заголовок файла, затем записи кадров. Каждая запись — заголовок (тип, номер
+кадра, время, размер) и сжатые zlib данные: палитра (первый индекс, число цветов,
+цвета RGB) и плоскости символов, цветов и, по желанию, глубины. Опорный кадр хранит
+плоскости и палитру целиком, разностный — XOR плоскостей с предыдущим кадром и только
+добавленные цвета палитры: неизменившиеся клетки дают нули, которые сжимаются почти
+до нуля. Опорные кадры пишутся каждые keyframe_interval кадров и при сбросе палитры.
+
+Индекса в файле нет: проигрыватель при открытии читает только заголовки записей,
+поэтому недописанный файл (например, после аварийного завершения) тоже читается.
+"""
+
+import argparse
+import struct
+import sys
+import zlib
+from time import perf_counter, sleep
+
+import numpy as np
+
+MAGIC = b"FRAMEREC"
+VERSION = 1
+# magic, версия, ширина, высота, флаги, интервал опорных кадров, длина строки символов
+FILE_HEADER = struct.Struct("<8sHHHHII")
+# тип записи, номер кадра, время в секундах от начала записи, размер сжатых данных
+RECORD_HEADER = struct.Struct("<BxxxIdI")
+PALETTE_HEADER = struct.Struct("<II")
+
+KEYFRAME = 1
+DELTA = 2
+FLAG_DEPTH = 1
+
+
+class Recorder:
+    """Пишет кадры буфера кадра в поток или файл.
+
+    Плоскости предыдущего кадра хранятся копией; на кадр приходится одна операция XOR
+    по каждой плоскости и сжатие zlib (по умолчанию самым быстрым уровнем).
+    """
+
+    def __init__(self, file, width, height, symbols, depth=False, keyframe_interval=60, level=1):
+        self._owned = not hasattr(file, "write")
+        self.stream = open(file, "wb") if self._owned else file
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.frames = 0
+        self.bytes_written = 0
+        self._previous = None
+        self._palette_size = 0
+        self._palette_version = None
+        self._start = None
+
+        text = "".join(symbols).encode("utf-8")
+        self._write(FILE_HEADER.pack(MAGIC, VERSION, width, height, FLAG_DEPTH if depth else 0,
+                                     keyframe_interval, len(text)) + text)
+
+    def record(self, framebuffer, timestamp=None):
+        """Добавляет кадр; timestamp — время в секундах (по умолчанию от первого кадра записи)."""
+        now = perf_counter()
+        if self._start is None:
+            self._start = now
+        if timestamp is None:
+            timestamp = now - self._start
+
+        planes = [framebuffer.glyphs, framebuffer.colors]
+        if self.depth:
+            planes.append(framebuffer.depth)
+        palette = framebuffer.palette
+        key = (self._previous is None or self.frames % self.keyframe_interval == 0
+               or framebuffer.palette_version != self._palette_version or len(palette) < self._palette_size)
+
+        if key:
+            start = 0
+            self._previous = [plane.copy() for plane in planes]
+            data = [plane.tobytes() for plane in planes]
+        else:
+            start = self._palette_size
+            data = []
+            for previous, plane in zip(self._previous, planes):
+                bits = _bits(plane)
+                data.append(np.bitwise_xor(_bits(previous), bits).tobytes())
+                np.copyto(previous, plane)
+        colors = np.array(palette[max(start, 1):], dtype=np.uint8).reshape(-1, 3)
+        start = max(start, 1)  # Нулевой элемент палитры — «цвет не задан»
+        payload = zlib.compress(b"".join([PALETTE_HEADER.pack(start, len(colors)), colors.tobytes()] + data),
+                                self.level)
+        self._write(RECORD_HEADER.pack(KEYFRAME if key else DELTA, self.frames, timestamp, len(payload)) + payload)
+
+        self._palette_size = len(palette)
+        self._palette_version = framebuffer.palette_version
+        self.frames += 1
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, data):
+        self.stream.write(data)
+        self.bytes_written += len(data)
+
+
+class RecordedFrame:
+    """Кадр записи; совместим с TerminalPresenter.present (символы, цвета, палитра)."""
+
+    def __init__(self, width, height, depth):
+        self.width = width
+        self.height = height
+        self.glyphs = np.zeros((height, width), dtype=np.uint8)
+        self.colors = np.zeros((height, width), dtype=np.uint16)
+        self.depth = np.full((height, width), np.inf, dtype=np.float32) if depth else None
+        self.palette = [None]
+        self.palette_version = 0
+        self.index = -1
+        self.time = 0.0
+
+
+class Player:
+    """Читает запись: последовательно, с перемоткой к любому кадру и с выводом в терминал.
+
+    Перемотка декодирует ближайший предшествующий опорный кадр и разности после него.
+    Возвращаемый кадр переиспользуется: его плоскости меняются при следующем чтении.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        header = self.file.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise ValueError(f"{path}: not a frame recording")
+        magic, version, self.width, self.height, flags, self.keyframe_interval, length = \
+            FILE_HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a frame recording (or an unsupported version)")
+        self.symbols = np.array(list(self.file.read(length).decode("utf-8")), dtype=object)
+        self.has_depth = bool(flags & FLAG_DEPTH)
+
+        # Заголовки всех записей: тип, время, смещение и размер сжатых данных
+        kinds, times, offsets, sizes = [], [], [], []
+        position = self.file.tell()
+        file_size = self.file.seek(0, 2)
+        self.file.seek(position)
+        while True:
+            record = self.file.read(RECORD_HEADER.size)
+            if len(record) < RECORD_HEADER.size:
+                break
+            kind, _, timestamp, size = RECORD_HEADER.unpack(record)
+            offset = self.file.tell()
+            if self.file.seek(size, 1) > file_size:
+                break  # Недописанная последняя запись
+            kinds.append(kind)
+            times.append(timestamp)
+            offsets.append(offset)
+            sizes.append(size)
+        self.times = np.array(times)
+        self._kinds = np.array(kinds, dtype=np.uint8)
+        self._offsets = offsets
+        self._sizes = sizes
+        self._keyframes = np.flatnonzero(self._kinds == KEYFRAME)
+        self._frame = RecordedFrame(self.width, self.height, self.has_depth)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.frame(index)
+
+    def frame(self, index):
+        """Кадр с номером index; чтение по порядку не требует повторного декодирования."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"frame {index} is out of range (recording has {len(self)} frames)")
+        current = self._frame.index
+        if current == index:
+            return self._frame
+        keyframe = self._keyframes[np.searchsorted(self._keyframes, index, side="right") - 1]
+        if not keyframe <= current < index:
+            current = keyframe - 1  # Назад или через опорный кадр: декодируем от него
+        for position in range(current + 1, index + 1):
+            self._decode(position)
+        return self._frame
+
+    def seek_time(self, seconds):
+        """Кадр, показанный в момент seconds от начала записи."""
+        return self.frame(max(int(np.searchsorted(self.times, seconds, side="right")) - 1, 0))
+
+    def play(self, presenter, speed=1.0, start=0, stop=None):
+        """Выводит кадры через presenter; speed — ускорение относительно записи, None — без пауз."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        origin = perf_counter() - (self.times[start] / speed if speed else 0.0)
+        for index in range(start, stop):
+            frame = self.frame(index)
+            if speed:
+                delay = origin + self.times[index] / speed - perf_counter()
+                if delay > 0:
+                    sleep(delay)
+            presenter.present(frame)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _decode(self, index):
+        frame = self._frame
+        self.file.seek(self._offsets[index])
+        data = memoryview(zlib.decompress(self.file.read(self._sizes[index])))
+        start, count = PALETTE_HEADER.unpack_from(data)
+        offset = PALETTE_HEADER.size
+        colors = np.frombuffer(data, dtype=np.uint8, count=count * 3, offset=offset).reshape(-1, 3)
+        offset += colors.nbytes
+
+        colors = list(map(tuple, colors.tolist()))
+        key = self._kinds[index] == KEYFRAME
+        if key and frame.palette[start:] != colors[:len(frame.palette) - start]:
+            # Палитра опорного кадра не продолжает текущую: новый список и новая версия,
+            # чтобы вывод не путал индексы; иначе кэш кодов цветов у вывода сохраняется
+            frame.palette = [None]
+            frame.palette_version += 1
+        del frame.palette[start:]
+        frame.palette.extend(colors)
+
+        planes = [frame.glyphs, frame.colors] + ([frame.depth] if self.has_depth else [])
+        for plane in planes:
+            bits = _bits(plane)
+            values = np.frombuffer(data, dtype=bits.dtype, count=bits.size, offset=offset).reshape(bits.shape)
+            offset += values.nbytes
+            if key:
+                np.copyto(bits, values)
+            else:
+                np.bitwise_xor(bits, values, out=bits)
+        frame.index = index
+        frame.time = float(self.times[index])
+
+
+def _bits(plane):
+    """Плоскость как беззнаковые целые того же размера (для XOR глубины float32)."""
+    return plane.view(np.dtype(f"u{plane.dtype.itemsize}"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or replay a frame recording.")
+    parser.add_argument("command", choices=("info", "play"))
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed (0 = as fast as possible)")
+    parser.add_argument("--start", type=float, default=0.0, help="start time in seconds")
+    args = parser.parse_args(argv)
+
+    with Player(args.path) as player:
+        if args.command == "info":
+            duration = float(player.times[-1]) if len(player) else 0.0
+            print(f"{player.width}x{player.height}, {len(player)} frames "
+                  f"({len(player._keyframes)} keyframes), {duration:.2f} s, depth: {player.has_depth}")
+            return 0
+        from presenter import TerminalPresenter
+        presenter = TerminalPresenter(player.symbols)
+        start = player.seek_time(args.start).index if len(player) else 0
+        try:
+            player.play(presenter, speed=args.speed or None, start=start)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            presenter.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
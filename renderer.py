@@ -1,168 +1,603 @@
 # renderer.py
 
 import numpy as np
-import os
-from vector import Vector3
+from time import perf_counter
+from vector import normal_matrix
+from framebuffer import Framebuffer
+from parallel import TileRasterizer
+from culling import frustum_planes, spheres_in_frustum, back_facing
+from occlusion import DepthPyramid
+from clipping import GUARD_BAND, clip_coordinates, clip_planes, plane_distances, clip_triangles
+from scene import iter_drawables, InstancedMesh
+from light import LightArray
+from static_layer import StaticLayer
+from presenter import TerminalPresenter, PipelinedPresenter, ansi_color
 
-DEBUG = False  # Установите True для включения отладки
 
 class Renderer:
-    def __init__(self, screen_width=80, screen_height=40):
+    # Расширенная градация символов для более плавного перехода
+    SYMBOLS = np.array(list(' ·.,:;+*#▒▓█'), dtype=object)
+    # Число ступеней оттенка света на канал при окраске граней
+    TINT_LEVELS = 16
+    # Число волн отрисовки от ближних объектов к дальним при отсечении перекрытых (Hi-Z)
+    OCCLUSION_WAVES = 4
+
+    def __init__(self, screen_width=80, screen_height=40, workers=1, tile_size=64, pipelined=False,
+                 static_cache=False, occlusion_culling=False):
         # Terminal characters are typically about twice as tall as they are wide
         # So we adjust the width to compensate for this
         self.screen_width = screen_width * 2  # Double the width to compensate for character aspect ratio
         self.screen_height = screen_height
+        # workers > 1 (или None — по числу ядер) включает растеризацию плитками в нескольких
+        # процессах; буфер кадра тогда лежит в общей памяти
+        self.workers = workers
+        self.tile_size = tile_size
+        self.tile_rasterizer = None
+        self._create_target(self.screen_width, self.screen_height)
+        # Внутреннее разрешение (доля размера терминала) и настройки качества; их меняет
+        # quality.QualityController. При render_scale < 1 кадр растягивается в self.output
+        self.render_scale = 1.0
+        self.output = None
+        self.detail_scale = 1.0  # Множитель экранного радиуса при выборе детализации (LOD)
+        self.max_lights = None   # Сколько самых ярких источников учитывать (None — все)
+        self.specular = True     # Считать ли зеркальную составляющую освещения
+        # Вывод в терминал: перерисовываются только изменившиеся клетки
+        self.presenter = TerminalPresenter(self.SYMBOLS)
+        # pipelined=True: кадр выводится в фоновом потоке, пока рисуется следующий
+        self.pipeline = None
+        if pipelined:
+            self.pipeline = PipelinedPresenter(self.presenter, self.screen_width, self.screen_height)
+        # Кэш слоя неподвижных объектов (static_layer.StaticLayer), если включён
+        self.static_layer = StaticLayer() if static_cache else None
+        # Отсечение перекрытой геометрии по пирамиде глубин (occlusion.DepthPyramid)
+        self.occlusion_culling = occlusion_culling
+        self._depth_pyramid = None
+        # Запись кадров (recording.Recorder): каждый показанный кадр дописывается в неё
+        self.recorder = None
+        # Рассылка кадров по сети (frameserver.FrameServer) и вывод в свой терминал
+        self.server = None
+        self.local_output = True
+        # Время стадий последнего кадра в секундах
+        self.stage_times = {}
+        # Счётчики последнего кадра: объекты и грани, отброшенные отсечением, фрагменты,
+        # записанные пиксели и байты, отправленные в терминал
+        self.frame_stats = {}
+
+    def _create_target(self, width, height):
+        """Создаёт буфер кадра для растеризации (в общей памяти, если растеризация в процессах)."""
+        if self.workers is None or self.workers > 1:
+            self.tile_rasterizer = TileRasterizer(width, height, self.workers, self.tile_size)
+            self.framebuffer = self.tile_rasterizer.framebuffer
+        else:
+            # Буфер кадра выделяется один раз и очищается на месте каждый кадр
+            self.framebuffer = Framebuffer(width, height)
+
+    def set_render_scale(self, scale):
+        """Задаёт внутреннее разрешение долей размера терминала (0 < scale <= 1).
+
+        Кадр растеризуется в уменьшенный буфер и растягивается до сетки терминала
+        ближайшими пикселями. Смена масштаба пересоздаёт буфер кадра (и процессы
+        растеризации, если они используются), поэтому менять его каждый кадр не стоит.
+        """
+        scale = min(max(float(scale), 0.05), 1.0)
+        if scale == self.render_scale:
+            return
+        width = max(1, round(self.screen_width * scale))
+        height = max(1, round(self.screen_height * scale))
+        version = self.framebuffer.palette_version
+        if self.tile_rasterizer is not None:
+            self.tile_rasterizer.close()
+            self.tile_rasterizer = None
+        self._create_target(width, height)
+        # Новая палитра не должна совпасть версией со старой: вывод кэширует коды цветов
+        self.framebuffer.palette_version = version + 1
+        self.output = Framebuffer(self.screen_width, self.screen_height) if scale < 1.0 else None
+        self.render_scale = scale
 
     def project(self, vertex, camera):
-        homogeneous_vertex = np.array([vertex.x, vertex.y, vertex.z, 1])
-        full_matrix = camera.get_full_matrix()
-        projected_vertex = np.dot(full_matrix, homogeneous_vertex)
-
-        if abs(projected_vertex[3]) > 1e-6:
-            w = projected_vertex[3]
-            if camera.projection_type == "perspective":
-                x_2d = projected_vertex[0] / w
-                y_2d = projected_vertex[1] / w
-            else:  # orthographic
-                # Масштабируем координаты для ортографической проекции
-                scale = 0.5  # Коэффициент масштабирования
-                x_2d = projected_vertex[0] * scale
-                y_2d = projected_vertex[1] * scale
-            
-            # Общая проверка границ видимости
-            if -1 <= x_2d <= 1 and -1 <= y_2d <= 1:
-                return (x_2d, y_2d)
+        """Проецирует одну вершину в NDC; возвращает (x, y) или None, если она невидима."""
+        ndc, visible = self.project_vertices(np.reshape(vertex, (1, 3)), camera)
+        if visible[0]:
+            return (ndc[0, 0], ndc[0, 1])
         return None
 
+    def project_vertices(self, vertices, camera):
+        """Проецирует все вершины объекта одним умножением на кэшированную матрицу камеры.
+
+        Возвращает массив (N, 2) координат в NDC и маску вершин, попавших в [-1, 1].
+        """
+        ndc, visible = self._project_ndc(vertices, camera)
+        # Общая проверка границ видимости
+        visible &= np.all((ndc >= -1) & (ndc <= 1), axis=1)
+        return ndc, visible
+
+    def _project_ndc(self, vertices, camera):
+        """Переводит вершины в NDC; маска отмечает вершины с ненулевым w."""
+        full_matrix = camera.get_full_matrix()
+        projected = vertices @ full_matrix[:, :3].T + full_matrix[:, 3]
+
+        w = projected[:, 3]
+        visible = np.abs(w) > 1e-6
+        if camera.projection_type == "perspective":
+            ndc = projected[:, :2] / np.where(visible, w, 1.0)[:, None]
+        else:  # orthographic
+            # Масштабируем координаты для ортографической проекции
+            ndc = projected[:, :2] * camera.ORTHOGRAPHIC_SCALE
+        return ndc, visible
+
+    def screen_radii(self, centers, radii, camera):
+        """Радиусы сфер (K,) на экране в пикселях буфера кадра.
+
+        Сфера проецируется центром и шестью точками на концах её осей; радиус — наибольшее
+        расстояние от проекции центра. Сферы, пересекающие плоскость камеры, получают
+        бесконечный радиус.
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        offsets = np.vstack((np.zeros(3), np.eye(3), -np.eye(3)))
+        points = centers[:, None, :] + np.reshape(radii, (-1, 1, 1)) * offsets
+        ndc, projectable = self._project_ndc(points.reshape(-1, 3), camera)
+        if camera.projection_type == "perspective":
+            # Точки за камерой проецируются с переворотом: такие сферы считаем большими
+            w = points.reshape(-1, 3) @ camera.get_full_matrix()[3, :3] + camera.get_full_matrix()[3, 3]
+            projectable &= np.sign(w) == np.sign(camera.get_projection_matrix()[3, 2])
+        screen = self.to_screen(ndc).reshape(len(centers), len(offsets), 2)
+        distances = np.linalg.norm(screen[:, 1:] - screen[:, :1], axis=2).max(axis=1)
+        return np.where(projectable.reshape(len(centers), -1).all(axis=1), distances, np.inf)
+
+    def screen_ray(self, camera, x, y):
+        """Луч (origin, direction) через точку (x, y) буфера кадра; direction единичный.
+
+        Клетка терминала (column, row) соответствует точке (column + 0.5, row + 0.5).
+        Для перспективы луч выходит из центра проекции в видимую сторону; для ортографии
+        все лучи параллельны, а начало отнесено на camera.far назад от плоскости камеры.
+        """
+        nx = x / (self.screen_width / 2) - 1
+        ny = y / (self.screen_height / 2) - 1
+        full_matrix = camera.get_full_matrix()
+        if camera.projection_type == "perspective":
+            # Точки, проецирующиеся в (nx, ny), лежат на пересечении двух плоскостей через центр проекции
+            a = full_matrix[0] - nx * full_matrix[3]
+            b = full_matrix[1] - ny * full_matrix[3]
+            direction = np.cross(a[:3], b[:3])
+            if (full_matrix[3, :3] @ direction) * camera.get_projection_matrix()[3, 2] < 0:
+                direction = -direction
+            origin = camera.projection_center()[:3]
+        else:  # orthographic
+            scale = camera.ORTHOGRAPHIC_SCALE
+            rows = scale * full_matrix[:2]
+            rows[:, 3] -= (nx, ny)
+            direction = np.cross(rows[0, :3], rows[1, :3])
+            if direction @ camera.direction.to_numpy() < 0:
+                direction = -direction
+            # Ближайшая к камере точка прямой, отнесённая назад на дальность камеры
+            normals = rows[:, :3]
+            residual = normals @ camera.position + rows[:, 3]
+            closest = camera.position - normals.T @ np.linalg.solve(normals @ normals.T, residual)
+            direction = direction / np.linalg.norm(direction)
+            origin = closest - direction * camera.far
+        return origin, direction / np.linalg.norm(direction)
+
+    def to_screen(self, ndc):
+        """Переводит координаты NDC в координаты буфера кадра (вещественные)."""
+        return (ndc + 1) * (self.framebuffer.width / 2, self.framebuffer.height / 2)
+
     def calculate_lighting(self, point, normal, light, camera_pos):
-        """Вычисляет интенсивность освещения с учетом позиции точки и затухания света."""
-        # Вектор направления к источнику света
-        to_light = light.position - point
-        distance = to_light.length()
-        light_dir = to_light.normalize()
-
-        # Вектор направления к камере для расчета бликов
-        view_dir = (Vector3(*camera_pos) - point).normalize()
-        
-        # Ambient компонент (фоновое освещение)
-        ambient = 0.2
-        
-        # Диффузное освещение с улучшенным коэффициентом
-        diffuse = max(0.1, normal.dot(light_dir))
-        
-        # Улучшенное затухание света с расстоянием
-        attenuation = min(1.0, 1.0 / (1.0 + distance * 0.1))
-        
-        # Улучшенное отражение света (блики)
-        reflect_dir = (light_dir - normal * (2.0 * normal.dot(light_dir))).normalize()
-        specular = pow(max(0, view_dir.dot(reflect_dir)), 16)  # Уменьшили степень для более мягких бликов
-        
-        # Комбинируем все компоненты освещения с улучшенными весами
-        return (ambient + diffuse * 0.6 + specular * 0.2) * attenuation * light.intensity
+        """Вычисляет интенсивность освещения точки одним источником с учетом его затухания."""
+        rgb = LightArray([light]).shade(point.to_numpy(), normal.to_numpy(), camera_pos)
+        return float(rgb.max())
 
     def get_ansi_color(self, color):
-        return f"\033[38;2;{color[0]};{color[1]};{color[2]}m"
+        return ansi_color(color)
 
     def get_symbol_from_intensity(self, intensity):
         """Возвращает символ на основе интенсивности освещения."""
-        # Расширенная градация символов для более плавного перехода
-        symbols = ' ·.,:;+*#▒▓█'
-        index = min(int(intensity * len(symbols)), len(symbols) - 1)
-        return symbols[index]
+        return self.SYMBOLS[self.get_symbol_indices(np.array([intensity]))[0]]
+
+    def get_symbol_indices(self, intensities):
+        """Возвращает индексы символов градации для массива интенсивностей."""
+        indices = (np.asarray(intensities) * len(self.SYMBOLS)).astype(int)
+        return np.clip(indices, 0, len(self.SYMBOLS) - 1)
+
+    def _tinted_color_indices(self, base_colors, rgb):
+        """Индексы палитры для треугольников с базовыми цветами base_colors (T, 3) под освещением rgb (T, 3, 3).
+
+        Яркость передаётся символом, поэтому базовый цвет умножается только на оттенок
+        света (RGB, делённый на максимальный канал), квантованный до TINT_LEVELS ступеней,
+        чтобы палитра оставалась небольшой.
+        """
+        light = rgb.mean(axis=1)
+        peak = light.max(axis=1, keepdims=True)
+        tint = np.where(peak > 0, light / np.where(peak > 0, peak, 1.0), 1.0)
+        levels = np.round(tint * self.TINT_LEVELS).astype(np.int64)
+        tinted = np.round(np.asarray(base_colors, dtype=np.int64) * levels / self.TINT_LEVELS)
+        return self.framebuffer.color_indices(tinted)
+
+    def _instance_geometry(self, obj, planes, projection_center, stats):
+        """Собирает геометрию всех видимых копий InstancedMesh одним пакетом.
+
+        Возвращает вершины (M, 3), треугольники (T, 3) с индексами в этих вершинах,
+        нормали в вершинах треугольников (T, 3, 3) и цвета (T, 3) либо None, если ни
+        одна копия не видна.
+        """
+        geometry = obj.geometry
+        face_count = len(geometry.faces)
+        matrices = obj.instance_world_matrices()
+        stats["objects"] += len(matrices) - 1
+        stats["faces"] += len(matrices) * face_count
+
+        # Отсечение копий пирамидой видимости по ограничивающим сферам
+        centers, radii = obj.instance_spheres(matrices)
+        inside = spheres_in_frustum(centers, radii, planes)
+        culled = len(matrices) - int(np.count_nonzero(inside))
+        stats["objects_culled"] += culled
+        stats["faces_culled"] += culled * face_count
+        if not inside.any():
+            return None
+        matrices = matrices[inside]
+        linear = matrices[:, :3, :3]
+
+        # Вершины всех копий (K, N, 3) одним умножением
+        vertices = np.einsum("kij,nj->kni", linear, geometry.vertices) + matrices[:, None, :3, 3]
+
+        # Нормали граней копий: нормали модели из кэша сетки, умноженные на матрицы нормалей
+        mesh = geometry.mesh()
+        normal_matrices = normal_matrix(matrices)
+        normals = np.einsum("kij,fj->kfi", normal_matrices, mesh.face_normals)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normals /= np.linalg.norm(normals, axis=2, keepdims=True)
+
+        # Задние грани отбрасываются сразу для всех копий
+        visible = ~np.isnan(normals[:, :, 0])
+        if not obj.double_sided:
+            first = mesh.face_corners[:, 0]
+            back = back_facing(normals.reshape(-1, 3), vertices[:, first].reshape(-1, 3),
+                               projection_center).reshape(visible.shape) & visible
+            stats["faces_culled"] += int(np.count_nonzero(back))
+            visible &= ~back
+        triangles, triangle_faces = mesh.triangles, mesh.triangle_faces
+        keep = visible[:, triangle_faces]
+        instance, triangle = np.nonzero(keep)
+        triangles = triangles[triangle]
+
+        if obj.smooth_shading:
+            vertex_normals = np.einsum("kij,nj->kni", normal_matrices, mesh.vertex_normals)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                vertex_normals /= np.linalg.norm(vertex_normals, axis=2, keepdims=True)
+            corner_normals = vertex_normals[instance[:, None], triangles]
+        else:
+            corner_normals = np.repeat(normals[instance, triangle_faces[triangle]][:, None], 3, axis=1)
+
+        return (vertices.reshape(-1, 3),
+                triangles + (instance * len(geometry.vertices))[:, None],
+                corner_normals,
+                obj.colors[inside][instance])
+
+    def _active_lights(self, lights):
+        """Источники для освещения кадра: не больше max_lights самых ярких."""
+        if self.max_lights is None or len(lights) <= self.max_lights:
+            return lights
+        return sorted(lights, key=lambda light: light.intensity, reverse=True)[:self.max_lights]
+
+    def _timed(self, stage, start):
+        """Добавляет к времени стадии кадра прошедший интервал и возвращает текущий момент."""
+        now = perf_counter()
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + now - start
+        return now
+
+    def flush(self):
+        """Дожидается вывода всех отрисованных кадров (нужно перед посторонним выводом в терминал)."""
+        if self.pipeline is not None:
+            self.pipeline.flush()
+
+    def close(self):
+        """Выводит оставшиеся кадры, останавливает поток вывода и процессы растеризации и,
+        если кадры выводились в терминал, восстанавливает его цвет и курсор."""
+        if self.pipeline is not None:
+            self.pipeline.close()
+        if self.tile_rasterizer is not None:
+            self.tile_rasterizer.close()
+        if self.presenter.frames:
+            self.presenter.close()
+
+    def render(self, objects, camera, lights, flattened=False):
+        """Рисует кадр и выводит его в терминал; flattened — как у render_offscreen."""
+        framebuffer = self.render_offscreen(objects, camera, lights, flattened)
+        if self.output is not None:
+            # Уменьшенное внутреннее разрешение растягивается до сетки терминала
+            start = perf_counter()
+            self.output.resample(framebuffer)
+            framebuffer = self.output
+            self._timed("upscale", start)
+        if self.recorder is not None:
+            start = perf_counter()
+            self.recorder.record(framebuffer)
+            self._timed("record", start)
+        if self.server is not None:
+            start = perf_counter()
+            self.server.publish(framebuffer)
+            self._timed("broadcast", start)
+        if not self.local_output:
+            return
+
+        # Выводим экранный буфер одной записью; в конвейерном режиме кадр только
+        # передаётся потоку вывода, а байты считаются по последнему выведенному кадру
+        start = perf_counter()
+        if self.pipeline is not None:
+            self.pipeline.submit(framebuffer)
+            self.frame_stats["bytes"] = self.presenter.last_frame_bytes
+        else:
+            self.frame_stats["bytes"] = self.presenter.present(framebuffer)
+        self._timed("present", start)
+
+    def _draw_objects(self, objects, camera, lights, framebuffer, start):
+        """Отсекает, освещает и растеризует объекты в framebuffer с тестом глубины.
+
+        Счётчики добавляются к self.frame_stats, время стадий — к self.stage_times.
+        Возвращает момент окончания последней стадии.
+        """
+        stats = self.frame_stats
+        # Отсечение: пирамида видимости по объектам и задние грани по нормалям
+        planes = frustum_planes(camera)
+        projection_center = camera.projection_center()
+        # Пирамида видимости проверяется сразу для ограничивающих сфер всех объектов;
+        # копии InstancedMesh проверяются по отдельности при сборке их геометрии
+        single = [obj for obj in objects if not isinstance(obj, InstancedMesh)]
+        spheres = [obj.bounding_sphere() for obj in single]
+        in_frustum = spheres_in_frustum([c for c, _ in spheres], [r for _, r in spheres], planes)
+        start = self._timed("cull", start)
+
+        # Детализация узлов с LevelOfDetail выбирается по их размеру на экране
+        lod = [i for i, obj in enumerate(single) if getattr(obj, "lod", None) is not None and in_frustum[i]]
+        if lod:
+            radii = self.screen_radii([spheres[i][0] for i in lod], [spheres[i][1] for i in lod], camera)
+            for i, radius in zip(lod, radii.tolist()):
+                single[i].select_detail(radius * self.detail_scale)
+            start = self._timed("lod", start)
+
+        for obj, inside in zip(single, in_frustum.tolist()):
+            stats["faces"] += len(obj.faces)
+            if not inside:
+                stats["objects_culled"] += 1
+                stats["faces_culled"] += len(obj.faces)
+        if not self.occlusion_culling:
+            visible = iter(in_frustum.tolist())
+            objects = [obj for obj in objects if isinstance(obj, InstancedMesh) or next(visible)]
+            return self._draw_batch(objects, camera, lights, framebuffer, projection_center, planes, None, start)
+        inside = np.flatnonzero(in_frustum)
+        single = [single[i] for i in inside.tolist()]
+        instanced = [obj for obj in objects if isinstance(obj, InstancedMesh)]
+
+        # Отсечение перекрытых: объекты рисуются волнами от ближних к дальним, и после каждой
+        # волны пирамида глубин (Hi-Z) отбрасывает объекты и треугольники, скрытые нарисованным
+        pyramid = self._depth_pyramid
+        if pyramid is None or (pyramid.width, pyramid.height) != (framebuffer.width, framebuffer.height):
+            pyramid = self._depth_pyramid = DepthPyramid(framebuffer.width, framebuffer.height)
+        centers = np.array([spheres[i][0] for i in inside.tolist()], dtype=np.float64).reshape(-1, 3)
+        radii = np.array([spheres[i][1] for i in inside.tolist()], dtype=np.float64)
+        # Глубина — расстояние до единичной плоскости, поэтому ближайшая точка сферы ровно на
+        # радиус ближе центра; граница не зависит от того, где внутри сферы лежит геометрия
+        nearest = camera.depth(centers) - radii
+        order = np.argsort(nearest, kind="stable")
+        # Волны растут вдвое: первая — немного ближайших объектов, которые скорее всего закрывают остальные
+        waves = max(min(self.OCCLUSION_WAVES, len(order)), 1)
+        bounds = np.round(len(order) * (2.0 ** np.arange(waves + 1) - 1) / (2.0 ** waves - 1)).astype(int)
+        lower, upper, projectable = self._sphere_bounds(centers, radii, camera)
+        start = self._timed("occlusion", start)
+
+        updated = None  # Число записанных пикселей на момент обновления пирамиды
+        wave = 0
+        while wave < waves:
+            if updated != stats["pixels"]:
+                pyramid.update(framebuffer.depth)
+                updated = stats["pixels"]
+            if not pyramid.occluding and wave > 0:
+                # Нарисованное не закрыло ни одной плитки целиком: остальное рисуется одним пакетом
+                members = order[bounds[wave]:]
+                wave = waves
+            else:
+                members = order[bounds[wave]:bounds[wave + 1]]
+                wave += 1
+            batch = members
+            if pyramid.occluding:
+                hidden = projectable[members] & pyramid.occluded(lower[members], upper[members], nearest[members])
+                for i in members[hidden].tolist():
+                    stats["objects_occluded"] += 1
+                    stats["faces_occluded"] += len(single[i].faces)
+                batch = members[~hidden]
+            batch = [single[i] for i in batch.tolist()] + (instanced if wave == waves else [])
+            start = self._timed("occlusion", start)
+            start = self._draw_batch(batch, camera, lights, framebuffer, projection_center, planes,
+                                     pyramid if pyramid.occluding else None, start)
+        return start
+
+    def _sphere_bounds(self, centers, radii, camera):
+        """Экранные рамки (K, 2), (K, 2) сфер и маска сфер, рамку которых можно построить.
+
+        Рамка строится по восьми углам описанного вокруг сферы куба и поэтому охватывает
+        всю её проекцию; сферы, задевающие ближнюю плоскость, рамки не имеют.
+        """
+        corners = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=np.float64)
+        points = (centers[:, None, :] + radii[:, None, None] * corners).reshape(-1, 3)
+        coordinates = clip_coordinates(points, camera)
+        near = clip_planes(camera, 1.0)[4:]
+        projectable = (plane_distances(coordinates, near) >= 0).all(axis=1).reshape(-1, len(corners)).all(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            screen = self.to_screen(coordinates[:, :2] / coordinates[:, 2:]).reshape(-1, len(corners), 2)
+        return screen.min(axis=1), screen.max(axis=1), projectable
+
+    def _draw_batch(self, objects, camera, lights, framebuffer, projection_center, planes, pyramid, start):
+        """Освещает и растеризует объекты, уже прошедшие отсечение пирамидой видимости.
+
+        Если задана пирамида глубин, треугольники, скрытые уже нарисованным, отбрасываются
+        до освещения. Возвращает момент окончания последней стадии.
+        """
+        stats = self.frame_stats
+        # Геометрия объектов собирается в общие массивы, чтобы проекция, освещение
+        # и растеризация выполнялись одним пакетом
+        vertex_chunks = []
+        triangle_chunks = []
+        normal_chunks = []
+        color_chunks = []
+        vertex_count = 0
+
+        for obj in objects:
+            if isinstance(obj, InstancedMesh):
+                chunk = self._instance_geometry(obj, planes, projection_center, stats)
+                if chunk is not None:
+                    vertices, triangles, normals, colors = chunk
+                    vertex_chunks.append(vertices)
+                    triangle_chunks.append(triangles + vertex_count)
+                    normal_chunks.append(normals)
+                    color_chunks.append(colors)
+                    vertex_count += len(vertices)
+                start = self._timed("instances", start)
+                continue
+
+            # Вершины в мировых координатах: для узлов сцены — одно умножение на мировую матрицу
+            vertices = obj.world_vertices()
+            start = self._timed("transform", start)
+
+            # Нормали посчитаны один раз в координатах модели и только поворачиваются
+            mesh = obj.mesh()
+            normals = obj.world_face_normals()
+            start = self._timed("normals", start)
+
+            # Задние грани отбрасываются до проекции и освещения
+            visible = ~np.isnan(normals[:, 0])
+            if not obj.double_sided:
+                anchors = vertices[mesh.face_corners[:, 0]]
+                back = back_facing(normals, anchors, projection_center) & visible
+                stats["faces_culled"] += int(np.count_nonzero(back))
+                visible &= ~back
+            keep = visible[mesh.triangle_faces]
+            triangles = mesh.triangles[keep]
+
+            vertex_chunks.append(vertices)
+            triangle_chunks.append(triangles + vertex_count)
+            if obj.smooth_shading:
+                # Гуро: освещение считается по сглаженным нормалям вершин
+                normal_chunks.append(obj.world_vertex_normals()[triangles])
+            else:
+                normal_chunks.append(np.repeat(normals[mesh.triangle_faces[keep]][:, None], 3, axis=1))
+            color_chunks.append(np.broadcast_to(np.asarray(obj.color, dtype=np.int64),
+                                                (np.count_nonzero(keep), 3)))
+            vertex_count += len(vertices)
+            start = self._timed("cull", start)
+
+        if vertex_chunks:
+            vertices = np.concatenate(vertex_chunks)
+            triangles = np.concatenate(triangle_chunks)
+
+            # Каждая вершина переводится в однородные координаты и проецируется один раз;
+            # треугольники берут её по индексу. Треугольники целиком за ближней плоскостью
+            # или за одним краем экрана отбрасываются до освещения
+            coordinates = clip_coordinates(vertices, camera)
+            viewport_planes = clip_planes(camera, 1.0)
+            guard_planes = clip_planes(camera, GUARD_BAND)
+            outside = plane_distances(coordinates, np.vstack((viewport_planes, guard_planes))) < 0
+            beyond = outside[:, len(viewport_planes):].any(axis=1)
+            keep = ~outside[:, :len(viewport_planes)][triangles].all(axis=1).any(axis=1)
+            stats["triangles_rejected"] += int(np.count_nonzero(~keep))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                screen = self.to_screen(coordinates[:, :2] / coordinates[:, 2:])
+            # Глубина — расстояние до плоскости через центр проекции; в перспективе она
+            # пропорциональна W, и растеризатор интерполирует по экрану 1 / глубина
+            depths = camera.depth(vertices)
+            perspective = camera.projection_type == "perspective"
+            if pyramid is not None:
+                # Треугольники внутри защитной полосы проверяются по пирамиде глубин. Глубина
+                # аффинна в мировых координатах, поэтому ни один фрагмент не ближе угла треугольника
+                candidates = np.flatnonzero(keep)
+                candidates = candidates[~beyond[triangles[candidates]].any(axis=1)]
+                points = screen[triangles[candidates]]
+                hidden = pyramid.occluded(points.min(axis=1), points.max(axis=1),
+                                          depths[triangles[candidates]].min(axis=1))
+                keep[candidates[hidden]] = False
+                stats["triangles_occluded"] += int(np.count_nonzero(hidden))
+            triangles = triangles[keep]
+            start = self._timed("project", start)
+
+            # Освещение всех вершин треугольников от всех источников одним пакетом; при
+            # плоском затенении нормаль грани общая для её вершин
+            corner_normals = np.concatenate(normal_chunks)[keep].reshape(-1, 3)
+            rgb = LightArray(self._active_lights(lights)).shade(
+                vertices[triangles].reshape(-1, 3), corner_normals, camera.position,
+                specular=self.specular).reshape(-1, 3, 3)
+            triangle_intensities = rgb.max(axis=2)
+            triangle_colors = self._tinted_color_indices(np.concatenate(color_chunks)[keep], rgb)
+            start = self._timed("shade", start)
+
+            # Треугольники, пересекающие ближнюю плоскость или защитную полосу, разрезаются
+            # до деления на w; глубина и освещённость интерполируются вместе с координатами.
+            # Остальное за краем экрана обрезает по рамке растеризатор
+            triangle_points = screen[triangles]
+            triangle_depths = depths[triangles]
+            crossing = beyond[triangles].any(axis=1)
+            if crossing.any():
+                corners = np.concatenate((coordinates[triangles[crossing]],
+                                          triangle_depths[crossing][:, :, None],
+                                          triangle_intensities[crossing][:, :, None]), axis=2)
+                clipped, source = clip_triangles(corners, guard_planes)
+                source = np.concatenate((np.flatnonzero(~crossing), np.flatnonzero(crossing)[source]))
+                order = np.argsort(source, kind="stable")  # Порядок подачи треугольников сохраняется
+                triangle_points = np.concatenate((triangle_points[~crossing],
+                                                  self.to_screen(clipped[:, :, :2] / clipped[:, :, 2:3])))[order]
+                triangle_depths = np.concatenate((triangle_depths[~crossing], clipped[:, :, 3]))[order]
+                triangle_intensities = np.concatenate((triangle_intensities[~crossing], clipped[:, :, 4]))[order]
+                triangle_colors = triangle_colors[source[order]]
+                stats["triangles_clipped"] += int(np.count_nonzero(crossing))
+            start = self._timed("clip", start)
+
+            # Рёберные функции считаются сразу по рамкам всех треугольников
+            if self.tile_rasterizer is not None:
+                counts = self.tile_rasterizer.draw(triangle_points, triangle_depths, triangle_intensities,
+                                                   triangle_colors, len(self.SYMBOLS), perspective)
+            else:
+                counts = framebuffer.draw_triangles(triangle_points, triangle_depths, triangle_intensities,
+                                                    triangle_colors, len(self.SYMBOLS), perspective=perspective)
+            stats["triangles"] += len(triangle_points)
+            stats["fragments"] += counts[0]
+            stats["pixels"] += counts[1]
+        return self._timed("raster", start)
+
+    def render_offscreen(self, objects, camera, lights, flattened=False):
+        """Рисует кадр в буфер кадра без какого-либо ввода-вывода и возвращает его.
+
+        objects — объекты Object3D (вершины уже в мировых координатах) и/или узлы
+        SceneNode; узел рисуется вместе со всеми потомками. Копии InstancedMesh
+        преобразуются, отсекаются и освещаются пакетно. flattened=True означает, что
+        objects — уже развёрнутый список узлов с геометрией (например, ответ SceneIndex),
+        и каждый рисуется сам по себе, без потомков.
+
+        Плоскости framebuffer.glyphs, framebuffer.colors и framebuffer.depth остаются
+        действительными до следующего вызова. Время стадий кадра — в self.stage_times,
+        счётчики отсечения и растеризации — в self.frame_stats.
+        """
+        self.stage_times = {}
+        start = perf_counter()
 
-    def render(self, objects, camera, lights):
         # Save original light positions
         original_positions = [light.copy_position() for light in lights]
         
-        # Создаем буфер глубины для правильного отображения перекрывающихся граней
-        screen_buffer = [[' ' for _ in range(self.screen_width)] for _ in range(self.screen_height)]
-        depth_buffer = [[float('inf') for _ in range(self.screen_width)] for _ in range(self.screen_height)]
+        framebuffer = self.framebuffer
+        framebuffer.clear()
+        start = self._timed("clear", start)
 
-        for obj in objects:
-            normals = obj.calculate_normals()
-            color_code = self.get_ansi_color(obj.color)
-            
-            # Сортируем грани по Z-координате (для правильного порядка отрисовки)
-            faces_with_depth = []
-            for i, face in enumerate(obj.faces):
-                if i >= len(normals) or normals[i] is None:
-                    continue
-                # Вычисляем среднюю Z-координату грани
-                z_avg = sum(obj.vertices[vi].z for vi in face) / len(face)
-                faces_with_depth.append((face, normals[i], z_avg))
-            
-            # Сортируем грани от дальних к ближним
-            faces_with_depth.sort(key=lambda x: x[2], reverse=True)
-            
-            for face, normal, _ in faces_with_depth:
-                # Проецируем все вершины грани
-                projected_vertices = []
-                for vertex_index in face:
-                    vertex = obj.vertices[vertex_index]
-                    projected = self.project(vertex, camera)
-                    if projected:
-                        x = int((projected[0] + 1) * self.screen_width // 2)
-                        y = int((projected[1] + 1) * self.screen_height // 2)
-                        if 0 <= x < self.screen_width and 0 <= y < self.screen_height:
-                            projected_vertices.append((x, y))
-
-                if len(projected_vertices) < 3:
-                    continue
-
-                # Находим границы грани
-                min_x = max(0, min(v[0] for v in projected_vertices))
-                max_x = min(self.screen_width - 1, max(v[0] for v in projected_vertices))
-                min_y = max(0, min(v[1] for v in projected_vertices))
-                max_y = min(self.screen_height - 1, max(v[1] for v in projected_vertices))
-
-                # Вычисляем освещение для каждой вершины грани
-                vertex_intensities = []
-                for vertex_index in face:
-                    vertex = obj.vertices[vertex_index]
-                    intensity = self.calculate_lighting(
-                        vertex,
-                        normal,
-                        lights[0],
-                        camera.position
-                    )
-                    vertex_intensities.append(intensity)
-                
-                # Интерполируем освещение для каждой точки грани
-                for y in range(min_y, max_y + 1):
-                    for x in range(min_x, max_x + 1):
-                        if 0 <= x < self.screen_width and 0 <= y < self.screen_height:
-                            # Вычисляем барицентрические координаты для интерполяции
-                            total_area = 0
-                            weights = []
-                            point = Vector3(x, y, 0)
-                            
-                            for i in range(len(projected_vertices)):
-                                v1 = Vector3(projected_vertices[i][0], projected_vertices[i][1], 0)
-                                v2 = Vector3(projected_vertices[(i+1)%len(projected_vertices)][0], 
-                                           projected_vertices[(i+1)%len(projected_vertices)][1], 0)
-                                area = abs((v2 - v1).cross(point - v1).z)
-                                total_area += area
-                                weights.append(area)
-                            
-                            if total_area > 0:
-                                # Нормализуем веса
-                                weights = [w/total_area for w in weights]
-                                
-                                # Интерполируем интенсивность
-                                interpolated_intensity = sum(w * i for w, i in zip(weights, vertex_intensities))
-                                
-                                # Применяем глубину и символ
-                                current_depth = sum(obj.vertices[vi].z for vi in face) / len(face)
-                                if current_depth < depth_buffer[y][x]:
-                                    depth_buffer[y][x] = current_depth
-                                    symbol = self.get_symbol_from_intensity(interpolated_intensity)
-                                    screen_buffer[y][x] = color_code + symbol
+        # Узлы сцены разворачиваются в список объектов с геометрией
+        objects = list(objects) if flattened else list(iter_drawables(objects))
+        self.frame_stats = {"objects": len(objects), "objects_culled": 0,
+                            "faces": 0, "faces_culled": 0, "triangles": 0,
+                            "triangles_rejected": 0, "triangles_clipped": 0,
+                            "objects_occluded": 0, "faces_occluded": 0, "triangles_occluded": 0,
+                            "fragments": 0, "pixels": 0}
+        if self.static_layer is not None:
+            # Неподвижные объекты берутся из кэшированного слоя, рисуются только остальные
+            objects = self.static_layer.prepare(self, objects, camera, lights)
+            start = perf_counter()
+        start = self._draw_objects(objects, camera, lights, framebuffer, start)
 
         # Restore original light positions
         for light, orig_pos in zip(lights, original_positions):
             light.position = orig_pos
-            
-        # Выводим экранный буфер
-        os.system('cls' if os.name == 'nt' else 'clear')
-        for row in screen_buffer:
-            print(''.join(row) + "\033[0m")  # Сбрасываем цвет после каждой строки
\ No newline at end of file
+
+        return framebuffer
@@ -0,0 +1,342 @@
+# scene.py
+
+import numpy as np
+from vector import transform_points, normal_matrix, transform_normals
+from object import LevelOfDetail
+
+
+def compose_matrix(position, rotation, scale):
+    """Собирает матрицу T @ Rz @ Ry @ Rx @ S из позиции, углов Эйлера (радианы) и масштаба."""
+    return compose_matrices(np.reshape(position, (1, 3)), np.reshape(rotation, (1, 3)),
+                            np.reshape(scale, (-1, 3)))[0]
+
+
+def compose_matrices(positions, rotations=None, scales=None):
+    """Пакетная версия compose_matrix: матрицы (K, 4, 4) из позиций (K, 3), углов (K, 3) и масштабов.
+
+    Углы и масштабы можно не задавать; масштаб может быть общим (3,) или скаляром.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    count = len(positions)
+    rotations = np.zeros((count, 3)) if rotations is None else np.asarray(rotations, dtype=np.float64)
+    scales = np.ones(3) if scales is None else np.asarray(scales, dtype=np.float64)
+    cx, cy, cz = np.cos(rotations).reshape(-1, 3).T
+    sx, sy, sz = np.sin(rotations).reshape(-1, 3).T
+    # Rz @ Ry @ Rx, выписанная явно, чтобы не перемножать три матрицы
+    matrices = np.zeros((count, 4, 4))
+    matrices[:, 0, 0] = cy * cz
+    matrices[:, 0, 1] = sx * sy * cz - cx * sz
+    matrices[:, 0, 2] = cx * sy * cz + sx * sz
+    matrices[:, 1, 0] = cy * sz
+    matrices[:, 1, 1] = sx * sy * sz + cx * cz
+    matrices[:, 1, 2] = cx * sy * sz - sx * cz
+    matrices[:, 2, 0] = -sy
+    matrices[:, 2, 1] = sx * cy
+    matrices[:, 2, 2] = cx * cy
+    matrices[:, :3, :3] *= np.broadcast_to(scales, (count, 3))[:, None, :]
+    matrices[:, :3, 3] = positions
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+class SceneNode:
+    """Узел графа сцены.
+
+    Хранит неизменяемую геометрию в координатах модели (Object3D или None для группы),
+    локальную трансформацию и ссылки на родителя и детей. Мировая матрица кэшируется и
+    пересчитывается, только если узел или кто-то из его предков помечен изменённым.
+
+    Вместо Object3D можно передать LevelOfDetail: тогда рендерер каждый кадр выбирает
+    вариант геометрии по размеру узла на экране (см. select_detail).
+    """
+
+    def __init__(self, geometry=None, position=(0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1),
+                 color=None, name=None):
+        self.lod = None
+        if isinstance(geometry, LevelOfDetail):
+            self.lod = geometry
+            geometry = geometry.level(geometry.segments[-1])
+        self.geometry = geometry  # Общая для узлов; вершины Object3D только для чтения
+        self.name = name
+        self.parent = None
+        self.children = []
+        self._color = color
+
+        self._position = np.array(position, dtype=np.float64)
+        self._rotation = np.array(rotation, dtype=np.float64)
+        self._scale = np.broadcast_to(np.array(scale, dtype=np.float64), (3,)).copy()
+        self._local_matrix = None
+        self._world_matrix = None
+        # Растёт при каждом изменении мировой трансформации; по нему индексы сцены
+        # узнают, какие узлы сдвинулись
+        self.transform_version = 0
+        # Сфера модели общая для всех вариантов детализации
+        self._model_sphere = self.lod.bounding_sphere() if self.lod is not None else None
+
+    # --- Локальная трансформация ---
+
+    @property
+    def position(self):
+        return self._position.copy()
+
+    @position.setter
+    def position(self, value):
+        self._position = np.array(value, dtype=np.float64)
+        self._mark_local_dirty()
+
+    @property
+    def rotation(self):
+        """Углы Эйлера (x, y, z) в радианах; применяются в порядке X, затем Y, затем Z."""
+        return self._rotation.copy()
+
+    @rotation.setter
+    def rotation(self, value):
+        self._rotation = np.array(value, dtype=np.float64)
+        self._mark_local_dirty()
+
+    @property
+    def scale(self):
+        return self._scale.copy()
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = np.broadcast_to(np.array(value, dtype=np.float64), (3,)).copy()
+        self._mark_local_dirty()
+
+    def set_transform(self, position=None, rotation=None, scale=None):
+        """Меняет несколько компонент трансформации с одной пометкой об изменении."""
+        if position is not None:
+            self._position = np.array(position, dtype=np.float64)
+        if rotation is not None:
+            self._rotation = np.array(rotation, dtype=np.float64)
+        if scale is not None:
+            self._scale = np.broadcast_to(np.array(scale, dtype=np.float64), (3,)).copy()
+        self._mark_local_dirty()
+
+    def set_composed_transform(self, position, rotation, scale, matrix):
+        """Задаёт трансформацию вместе с уже собранной локальной матрицей (например, из
+        compose_matrices для многих узлов сразу); matrix должна соответствовать компонентам.
+
+        Массивы (3,) и (4, 4) не копируются. Их владелец может перезаписывать их на месте
+        (так animation.Animator обновляет все узлы одним присваиванием), но после каждого
+        изменения должен вызвать mark_dirty().
+        """
+        self._position = position
+        self._rotation = rotation
+        self._scale = scale
+        self.mark_dirty()
+        self._local_matrix = matrix
+
+    @property
+    def local_matrix(self):
+        if self._local_matrix is None:
+            self._local_matrix = compose_matrix(self._position, self._rotation, self._scale)
+            self._local_matrix.setflags(write=False)
+        return self._local_matrix
+
+    @property
+    def world_matrix(self):
+        """Мировая матрица узла; пересчитывается только после изменений узла или предков."""
+        if self._world_matrix is None:
+            if self.parent is None:
+                self._world_matrix = self.local_matrix
+            else:
+                self._world_matrix = self.parent.world_matrix @ self.local_matrix
+                self._world_matrix.setflags(write=False)
+        return self._world_matrix
+
+    def mark_dirty(self):
+        """Помечает мировые матрицы узла и всех потомков устаревшими.
+
+        Если мировая матрица потомка закэширована, то закэширована и матрица его родителя,
+        поэтому обход можно останавливать на узлах, уже помеченных изменёнными.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node._world_matrix is None:
+                continue
+            node._world_matrix = None
+            node.transform_version += 1
+            stack.extend(node.children)
+
+    def _mark_local_dirty(self):
+        self._local_matrix = None
+        self.mark_dirty()
+
+    # --- Иерархия ---
+
+    def add_child(self, node):
+        """Добавляет дочерний узел (перенося его от прежнего родителя) и возвращает его."""
+        if node.parent is not None:
+            node.parent.remove_child(node)
+        node.parent = self
+        self.children.append(node)
+        node.mark_dirty()
+        return node
+
+    def remove_child(self, node):
+        self.children.remove(node)
+        node.parent = None
+        node.mark_dirty()
+
+    def traverse(self):
+        """Обходит узел и всех потомков в глубину."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    # --- Геометрия для рендерера ---
+
+    @property
+    def faces(self):
+        return self.geometry.faces
+
+    @property
+    def color(self):
+        return self._color if self._color is not None else self.geometry.color
+
+    @color.setter
+    def color(self, value):
+        self._color = value
+
+    @property
+    def double_sided(self):
+        return self.geometry.double_sided
+
+    @property
+    def smooth_shading(self):
+        return self.geometry.smooth_shading
+
+    def mesh(self):
+        return self.geometry.mesh()
+
+    def select_detail(self, screen_radius):
+        """Выбирает вариант геометрии для радиуса узла на экране в пикселях (только для LevelOfDetail)."""
+        if self.lod is not None:
+            self.geometry = self.lod.select(screen_radius)
+
+    def world_vertices(self):
+        """Вершины геометрии в мировых координатах: одно умножение на мировую матрицу."""
+        return transform_points(self.world_matrix, self.geometry.vertices)
+
+    @property
+    def normal_matrix(self):
+        """Матрица нормалей 3x3 мировой трансформации (см. vector.normal_matrix)."""
+        return normal_matrix(self.world_matrix)
+
+    def world_face_normals(self):
+        """Нормали граней в мировых координатах: нормали модели, повёрнутые матрицей нормалей."""
+        return transform_normals(self.normal_matrix, self.geometry.mesh().face_normals)
+
+    def world_vertex_normals(self):
+        """Сглаженные нормали вершин в мировых координатах."""
+        return transform_normals(self.normal_matrix, self.geometry.mesh().vertex_normals)
+
+    def bounding_sphere(self):
+        """Ограничивающая сфера в мировых координатах без преобразования всех вершин."""
+        if self._model_sphere is None:
+            self._model_sphere = self.geometry.bounding_sphere()
+        center, radius = self._model_sphere
+        matrix = self.world_matrix
+        scale = np.sqrt((matrix[:3, :3] ** 2).sum(axis=0)).max()
+        return transform_points(matrix, center[None, :])[0], radius * scale
+
+    def __repr__(self):
+        return f"SceneNode({self.name!r}, children={len(self.children)})"
+
+
+class InstancedMesh(SceneNode):
+    """Узел с множеством копий одной геометрии.
+
+    Копии задаются компактными массивами: матрицы модели (K, 4, 4) относительно узла и
+    цвета (K, 3). Рендерер преобразует, отсекает и освещает все копии пакетно, поэтому
+    на каждую копию не создаётся ни одного объекта Python.
+    """
+
+    def __init__(self, geometry, matrices=None, colors=None, **transform):
+        super().__init__(geometry, **transform)
+        self._matrices = np.zeros((0, 4, 4))
+        self._colors = None
+        if matrices is not None or colors is not None:
+            self.set_instances(matrices if matrices is not None else self._matrices, colors)
+
+    def __len__(self):
+        return len(self._matrices)
+
+    @property
+    def matrices(self):
+        """Матрицы модели копий (K, 4, 4) относительно узла; только для чтения."""
+        return self._matrices
+
+    @property
+    def colors(self):
+        """Цвета копий (K, 3); без собственных цветов копии берут цвет узла."""
+        if self._colors is None:
+            return np.tile(np.asarray(self.color, dtype=np.uint8), (len(self), 1))
+        return self._colors
+
+    def set_instances(self, matrices, colors=None):
+        """Заменяет матрицы (K, 4, 4) и, если заданы, цвета (K, 3) всех копий."""
+        matrices = np.array(matrices, dtype=np.float64).reshape(-1, 4, 4)
+        matrices.setflags(write=False)
+        self._matrices = matrices
+        self.transform_version += 1
+        if colors is not None:
+            colors = np.array(colors, dtype=np.uint8).reshape(-1, 3)
+            if len(colors) != len(matrices):
+                raise ValueError("Instance colors must match the number of instance matrices.")
+            colors.setflags(write=False)
+            self._colors = colors
+        elif self._colors is not None and len(self._colors) != len(matrices):
+            self._colors = None
+
+    def set_transforms(self, positions, rotations=None, scales=None, colors=None):
+        """Задаёт копии позициями (K, 3), углами Эйлера (K, 3) и масштабами, как у SceneNode."""
+        self.set_instances(compose_matrices(positions, rotations, scales), colors)
+
+    def instance_world_matrices(self):
+        """Мировые матрицы копий (K, 4, 4): мировая матрица узла, умноженная на матрицу копии."""
+        return self.world_matrix @ self._matrices
+
+    def instance_spheres(self, matrices=None):
+        """Ограничивающие сферы копий в мировых координатах: центры (K, 3) и радиусы (K,)."""
+        if matrices is None:
+            matrices = self.instance_world_matrices()
+        if self._model_sphere is None:
+            self._model_sphere = self.geometry.bounding_sphere()
+        center, radius = self._model_sphere
+        centers = matrices[:, :3, :3] @ center + matrices[:, :3, 3]
+        scales = np.sqrt((matrices[:, :3, :3] ** 2).sum(axis=1)).max(axis=1)
+        return centers, radius * scales
+
+    def world_vertices(self):
+        """Вершины всех копий в мировых координатах, подряд по копиям: (K * N, 3)."""
+        matrices = self.instance_world_matrices()
+        vertices = self.geometry.vertices
+        return (np.einsum("kij,nj->kni", matrices[:, :3, :3], vertices)
+                + matrices[:, None, :3, 3]).reshape(-1, 3)
+
+    def bounding_sphere(self):
+        """Сфера, охватывающая все копии."""
+        if len(self) == 0:
+            return self.world_matrix[:3, 3].copy(), 0.0
+        centers, radii = self.instance_spheres()
+        center = (np.min(centers - radii[:, None], axis=0) + np.max(centers + radii[:, None], axis=0)) / 2
+        return center, float((np.linalg.norm(centers - center, axis=1) + radii).max())
+
+    def __repr__(self):
+        return f"InstancedMesh({self.name!r}, instances={len(self)}, children={len(self.children)})"
+
+
+def iter_drawables(objects):
+    """Разворачивает список объектов и узлов сцены в узлы и объекты с геометрией."""
+    for obj in objects:
+        if isinstance(obj, SceneNode):
+            for node in obj.traverse():
+                if node.geometry is not None:
+                    yield node
+        else:
+            yield obj
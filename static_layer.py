@@ -0,0 +1,102 @@
+# static_layer.py
+"""Кэш слоя неподвижных объектов: их растеризация переиспользуется между кадрами.
+
+Для каждого объекта кадра строится ключ состояния (версия трансформации, геометрия,
+цвет, режим затенения). Объекты, чей ключ не менялся promote_after кадров подряд,
+один раз растеризуются в отдельный слой — копию плоскостей глубины, символов и цветов.
+В следующих кадрах буфер кадра заполняется копией слоя, а рисуются с тестом глубины
+только остальные объекты, поэтому цена кадра зависит от того, что движется.
+
+Слой сбрасывается, если изменился или пропал хоть один запечённый объект, а также
+при смене камеры, источников света, настроек качества, буфера кадра или палитры.
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+
+def object_key(obj):
+    """Ключ состояния объекта, от которого зависит его изображение при той же камере и свете."""
+    geometry = getattr(obj, "geometry", obj)
+    color = obj.color
+    color = tuple(np.ravel(color).tolist()) if isinstance(color, np.ndarray) else tuple(color)
+    return (getattr(obj, "transform_version", None), id(geometry), id(geometry.vertices), color,
+            geometry.smooth_shading, geometry.double_sided)
+
+
+def camera_key(camera):
+    return (camera.projection_type, camera.get_full_matrix().tobytes(), np.asarray(camera.position).tobytes())
+
+
+def lights_key(lights):
+    return tuple(((light.position.x, light.position.y, light.position.z), tuple(light.color),
+                  light.intensity, tuple(light.attenuation)) for light in lights)
+
+
+class StaticLayer:
+    """Слой запечённых неподвижных объектов для Renderer(static_cache=True)."""
+
+    def __init__(self, promote_after=10):
+        self.promote_after = promote_after
+        self.rebuilds = 0
+        self.objects = 0        # Сколько объектов в слое
+        self._stable = {}       # id объекта -> (объект, ключ, число кадров без изменений)
+        self._baked = None      # id объекта -> (объект, ключ) для объектов в слое
+        self._context = None    # Камера, свет и настройки, при которых построен слой
+        self._last_context = None
+        self._planes = None
+
+    def invalidate(self):
+        """Сбрасывает слой; он будет построен заново, когда объекты снова замрут."""
+        self._baked = None
+        self._planes = None
+        self.objects = 0
+
+    def prepare(self, renderer, objects, camera, lights):
+        """Заполняет очищенный буфер кадра слоем и возвращает объекты, которые надо дорисовать.
+
+        При необходимости (пере)строит слой, растеризуя неподвижные объекты через renderer.
+        """
+        framebuffer = renderer.framebuffer
+        start = perf_counter()
+        stable = {}
+        for obj in objects:
+            key = object_key(obj)
+            previous = self._stable.get(id(obj))
+            frames = previous[2] + 1 if previous is not None and previous[1] == key else 0
+            stable[id(obj)] = (obj, key, frames)
+        self._stable = stable
+
+        context = (id(framebuffer), framebuffer.width, framebuffer.height, framebuffer.palette_version,
+                   renderer.detail_scale, renderer.max_lights, renderer.specular,
+                   camera_key(camera), lights_key(lights))
+        context_stable = context == self._last_context
+        self._last_context = context
+
+        baked = self._baked
+        if baked is not None and not (context == self._context and
+                                      all(stable.get(i, (None, None))[1] == key for i, (_, key) in baked.items())):
+            self.invalidate()
+            baked = None
+        ready = [obj for obj, _, frames in stable.values() if frames >= self.promote_after]
+        if context_stable and ready and (baked is None or any(id(obj) not in baked for obj in ready)):
+            # Новые неподвижные объекты: слой перестраивается вместе с ними
+            renderer._timed("static", start)
+            renderer._draw_objects(ready, camera, lights, framebuffer, perf_counter())
+            start = perf_counter()
+            self._planes = [getattr(framebuffer, name).copy() for name, _ in framebuffer.PLANES]
+            # Ключи берутся заново: при отрисовке могла смениться детализация (LOD)
+            baked = self._baked = {id(obj): (obj, object_key(obj)) for obj in ready}
+            self._context = context
+            self.objects = len(baked)
+            self.rebuilds += 1
+        elif baked is not None:
+            for (name, _), plane in zip(framebuffer.PLANES, self._planes):
+                np.copyto(getattr(framebuffer, name), plane)
+        renderer._timed("static", start)
+
+        renderer.frame_stats["objects_cached"] = len(baked) if baked else 0
+        if not baked:
+            return objects
+        return [obj for obj in objects if id(obj) not in baked]
@@ -0,0 +1,101 @@
+# terminal_input.py
+"""Неблокирующее чтение клавиш из терминала.
+
+В Linux и других POSIX-системах терминал переводится в режим cbreak: символы
+приходят без ожидания Enter и без эха, а Ctrl+C по-прежнему прерывает программу.
+Клавиши читаются через select с нулевым таймаутом. В Windows используется msvcrt.
+"""
+
+import os
+import sys
+
+try:
+    import termios
+    import tty
+    import select
+except ImportError:  # Windows
+    termios = None
+
+ESCAPE = "\x1b"
+
+
+def split_keys(text):
+    """Делит прочитанный текст на клавиши; escape-последовательности (стрелки и т. п.)
+    остаются одной клавишей, например "\\x1b[A"."""
+    keys = []
+    i = 0
+    while i < len(text):
+        end = i + 1
+        if text.startswith(ESCAPE + "O", i):
+            end = i + 3  # SS3: ровно один символ после "\x1bO"
+        elif text.startswith(ESCAPE + "[", i):
+            # CSI: параметры, затем завершающий символ из диапазона @..~
+            end = i + 2
+            while end < len(text) and not "@" <= text[end] <= "~":
+                end += 1
+            end += 1
+        keys.append(text[i:end])
+        i = end
+    return keys
+
+
+class TerminalInput:
+    """Источник нажатых клавиш без блокировки; используется как контекстный менеджер.
+
+    poll() возвращает список клавиш, накопившихся с прошлого вызова (возможно, пустой).
+    Если стандартный ввод — не терминал, режим терминала не меняется, а данные
+    всё равно читаются без ожидания.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdin
+        self._saved = None
+        self._fd = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        """Переводит терминал в режим cbreak (в POSIX); повторный вызов ничего не делает."""
+        if termios is None or self._fd is not None:
+            return
+        try:
+            self._fd = self.stream.fileno()
+        except (AttributeError, ValueError, OSError):
+            return
+        if os.isatty(self._fd):
+            self._saved = termios.tcgetattr(self._fd)
+            tty.setcbreak(self._fd)
+
+    def close(self):
+        """Восстанавливает исходный режим терминала."""
+        if self._saved is not None:
+            termios.tcsetattr(self._fd, termios.TCSADRAIN, self._saved)
+            self._saved = None
+        self._fd = None
+
+    def poll(self):
+        """Все клавиши, доступные прямо сейчас, без ожидания."""
+        if termios is None:
+            return self._poll_windows()
+        if self._fd is None:
+            return []
+        chunks = []
+        while select.select([self._fd], [], [], 0)[0]:
+            data = os.read(self._fd, 1024)
+            if not data:
+                break  # Конец ввода (например, закрытый канал)
+            chunks.append(data)
+        return split_keys(b"".join(chunks).decode("utf-8", "replace"))
+
+    @staticmethod
+    def _poll_windows():
+        import msvcrt
+        keys = []
+        while msvcrt.kbhit():
+            keys.append(msvcrt.getwch())
+        return keys
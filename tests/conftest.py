@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""Модули движка лежат в корне репозитория: делаем их импортируемыми из тестов."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# tests/test_animation.py
+"""Ключевая анимация: интерполяция дорожек и раздача матриц узлам и копиям."""
+
+import numpy as np
+import pytest
+
+from animation import Animator, Track
+from object import Cube
+from scene import InstancedMesh, SceneNode, compose_matrix, compose_matrices
+
+
+def test_track_interpolation_loop_and_hold():
+    animator = Animator()
+    looping, held = SceneNode(Cube()), SceneNode(Cube())
+    keys = [(0.0, 0.0, 0.0), (2.0, 4.0, 0.0), (2.0, 0.0, 0.0)]
+    animator.add(looping, position=Track([0.0, 1.0, 2.0], keys))
+    animator.add(held, position=Track([0.0, 1.0, 2.0], keys, loop=False, easing="step"))
+    positions, rotations, scales = animator.evaluate(2.5)
+    np.testing.assert_allclose(positions, [(1.0, 2.0, 0.0), (2.0, 0.0, 0.0)])
+    np.testing.assert_allclose(animator.evaluate(0.5)[0][1], (0.0, 0.0, 0.0))
+    np.testing.assert_allclose(scales, 1.0)
+
+
+def test_easing_shapes_segment():
+    animator = Animator()
+    node = SceneNode(Cube())
+    animator.add(node, position=Track([0.0, 1.0], [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0)], easing="ease_in"))
+    assert animator.evaluate(0.5)[0][0, 0] == pytest.approx(0.25)
+
+
+def test_apply_updates_nodes_and_instances():
+    root = SceneNode()
+    node = root.add_child(SceneNode(Cube(), position=(1.0, 2.0, 3.0)))
+    child = node.add_child(SceneNode(Cube(), position=(0.0, 1.0, 0.0)))
+    instances = InstancedMesh(Cube())
+    animator = Animator()
+    animator.add(node, rotation=Track([0.0, 1.0], [(0.0, 0.0, 0.0), (0.0, 1.0, 0.0)]))
+    animator.add(instances, position=Track([0.0, 1.0], np.zeros((4, 2, 3)) + np.arange(4)[:, None, None]))
+    child.world_matrix
+    version = child.transform_version
+
+    for time in (0.25, 0.75):
+        animator.apply(time)
+        expected = compose_matrix((1.0, 2.0, 3.0), (0.0, time, 0.0), (1.0, 1.0, 1.0))
+        np.testing.assert_allclose(node.world_matrix, expected)
+        np.testing.assert_allclose(child.world_matrix, expected @ compose_matrix((0, 1, 0), (0, 0, 0), (1, 1, 1)))
+        np.testing.assert_allclose(node.rotation, (0.0, time, 0.0))
+    assert child.transform_version > version
+    np.testing.assert_allclose(instances.matrices, compose_matrices(np.repeat(np.arange(4.0), 3).reshape(4, 3)))
+    assert not animator.matrices.flags.writeable
+
+
+def test_direct_transform_is_overridden_and_removal_keeps_last_pose():
+    node = SceneNode(Cube())
+    animator = Animator()
+    animator.add(node, position=Track([0.0, 1.0], [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0)]))
+    animator.apply(0.5)
+    node.position = (5.0, 5.0, 5.0)
+    animator.apply(0.25)
+    np.testing.assert_allclose(node.world_matrix[:3, 3], (0.25, 0.0, 0.0))
+    assert animator.remove(node)
+    animator.add(SceneNode(Cube()), position=Track.constant((9.0, 9.0, 9.0)))
+    animator.apply(0.75)
+    np.testing.assert_allclose(node.position, (0.25, 0.0, 0.0))
+
+
+def test_track_validation():
+    with pytest.raises(ValueError):
+        Track([1.0, 0.0], [(0.0, 0.0, 0.0), (1.0, 1.0, 1.0)])
+    with pytest.raises(ValueError):
+        Track([0.0], [(0.0, 0.0, 0.0)], easing="bounce")
+    with pytest.raises(TypeError):
+        Animator().add(Cube(), position=Track.constant((0.0, 0.0, 0.0)))
@@ -0,0 +1,98 @@
+# tests/test_bvh.py
+"""Запросы BVH и трассировка лучей по SceneIndex против полного перебора."""
+
+import numpy as np
+import pytest
+
+from bvh import BVH, SceneIndex, ray_boxes, ray_triangles, raycast_object
+from object import Cube, Sphere
+from scene import InstancedMesh, SceneNode, compose_matrices
+
+
+def random_boxes(rng, count):
+    mins = rng.uniform(-10, 10, (count, 3))
+    return mins, mins + rng.uniform(0.1, 2.0, (count, 3))
+
+
+def test_queries_match_brute_force():
+    rng = np.random.default_rng(1)
+    mins, maxs = random_boxes(rng, 300)
+    bvh = BVH(mins, maxs)
+    center, radius = np.array([1.0, -2.0, 0.5]), 4.0
+    nearest = np.clip(center, mins, maxs)
+    expected = np.flatnonzero(((nearest - center) ** 2).sum(axis=1) <= radius ** 2)
+    np.testing.assert_array_equal(bvh.query_sphere(center, radius), expected)
+
+    origin, direction = np.array([-12.0, 0.3, -0.2]), np.array([1.0, 0.05, 0.02])
+    tmin, tmax = ray_boxes(origin, direction, mins, maxs)
+    items, entries = bvh.query_ray(origin, direction)
+    np.testing.assert_array_equal(np.sort(items), np.flatnonzero(tmax >= np.maximum(tmin, 0.0)))
+    assert np.all(np.diff(entries) >= 0)
+
+    # После сдвига части рамок и refit ответы по-прежнему совпадают с перебором
+    moved = np.arange(0, 300, 7)
+    shift = rng.uniform(-5, 5, (len(moved), 3))
+    mins[moved] += shift
+    maxs[moved] += shift
+    bvh.refit(mins[moved], maxs[moved], indices=moved)
+    nearest = np.clip(center, mins, maxs)
+    expected = np.flatnonzero(((nearest - center) ** 2).sum(axis=1) <= radius ** 2)
+    np.testing.assert_array_equal(bvh.query_sphere(center, radius), expected)
+
+
+def make_nodes(rng):
+    cube, sphere = Cube(size=1.0), Sphere(radius=0.8, segments=16)
+    return [SceneNode(cube if i % 2 else sphere, position=rng.uniform(-6, 6, 3), rotation=rng.uniform(0, 3, 3))
+            for i in range(60)]
+
+
+def brute_force(nodes, origin, direction):
+    hits = [raycast_object(node, origin, direction) for node in nodes]
+    hits = [hit for hit in hits if hit is not None]
+    return min(hits, key=lambda hit: hit.distance) if hits else None
+
+
+def test_raycast_matches_brute_force_after_updates():
+    rng = np.random.default_rng(2)
+    nodes = make_nodes(rng)
+    index = SceneIndex(nodes)
+    index.update()
+    hits = 0
+    for step in range(2):
+        for _ in range(40):
+            origin = rng.uniform(-5, 5, 3) + (0.0, 0.0, -20.0)
+            direction = rng.normal(size=3) * 0.3 + (0.0, 0.0, 1.0)
+            direction /= np.linalg.norm(direction)
+            hit, expected = index.raycast(origin, direction), brute_force(nodes, origin, direction)
+            if expected is None:
+                assert hit is None
+            else:
+                hits += 1
+                assert hit.object is expected.object
+                assert hit.distance == pytest.approx(expected.distance)
+                np.testing.assert_allclose(hit.point, origin + hit.distance * direction)
+        for node in nodes[::3]:
+            node.position = node.position + rng.uniform(-2, 2, 3)
+        assert index.update() == len(nodes[::3])
+    assert hits > 10
+
+
+def test_mesh_bvh_matches_all_triangles():
+    sphere = Sphere(radius=1.0, segments=24)
+    node = SceneNode(sphere, position=(0.0, 0.0, 5.0))
+    origin, direction = np.zeros(3), np.array([0.1, 0.05, 1.0]) / np.linalg.norm([0.1, 0.05, 1.0])
+    hit = raycast_object(node, origin, direction)
+    triangles = sphere.mesh().triangles
+    corners = node.world_vertices()[triangles]
+    t = ray_triangles(origin, direction, corners[:, 0], corners[:, 1], corners[:, 2])
+    assert hit.distance == pytest.approx(t.min())
+
+
+def test_instanced_hit_reports_instance():
+    instances = InstancedMesh(Cube(size=1.0), compose_matrices(np.array([[0.0, 0.0, 3.0], [0.0, 0.0, 6.0],
+                                                                         [3.0, 0.0, 3.0]])))
+    index = SceneIndex([instances])
+    index.update()
+    hit = index.raycast(np.array([3.0, 0.0, -5.0]), np.array([0.0, 0.0, 1.0]))
+    assert hit.object is instances and hit.instance == 2
+    assert hit.distance == pytest.approx(7.5)
@@ -0,0 +1,57 @@
+# tests/test_clipping.py
+"""Отсечение треугольников в однородных координатах."""
+
+import numpy as np
+
+from camera import Camera
+from clipping import clip_coordinates, clip_planes, clip_triangles, plane_distances
+from vector import Vector3
+
+PLANES = np.array([(1.0, 0.0, 1.0, 0.0), (-1.0, 0.0, 1.0, 0.0), (0.0, 1.0, 1.0, 0.0), (0.0, -1.0, 1.0, 0.0)])
+
+
+def area(triangles):
+    edges1 = triangles[:, 1, :2] - triangles[:, 0, :2]
+    edges2 = triangles[:, 2, :2] - triangles[:, 0, :2]
+    return np.abs(edges1[:, 0] * edges2[:, 1] - edges1[:, 1] * edges2[:, 0]).sum() / 2
+
+
+def test_inside_triangle_is_unchanged():
+    corners = np.array([[[0.0, 0.0, 1.0], [0.5, 0.0, 1.0], [0.0, 0.5, 1.0]]])
+    triangles, source = clip_triangles(corners, PLANES)
+    np.testing.assert_array_equal(triangles, corners)
+    assert source.tolist() == [0]
+
+
+def test_crossing_triangles_are_cut_to_the_square():
+    # Треугольник, накрывающий квадрат [-1, 1]^2 целиком, и треугольник, срезаемый одной стороной
+    corners = np.array([[[-4.0, -4.0, 1.0], [8.0, -4.0, 1.0], [-4.0, 8.0, 1.0]],
+                        [[0.0, 0.0, 1.0], [2.0, 0.0, 1.0], [0.0, 0.5, 1.0]]])
+    triangles, source = clip_triangles(corners, PLANES)
+    assert (plane_distances(triangles, PLANES) >= -1e-12).all()
+    assert np.isclose(area(triangles[source == 0]), 4.0)
+    # Срезанная часть — трапеция от x = 0 до x = 1
+    assert np.isclose(area(triangles[source == 1]), 0.5 - 0.125)
+    assert np.all(np.diff(source) >= 0)
+
+
+def test_outside_triangle_is_dropped_and_attributes_interpolate():
+    corners = np.array([[[2.0, 2.0, 1.0, 7.0], [3.0, 2.0, 1.0, 7.0], [2.0, 3.0, 1.0, 7.0]],
+                        [[-2.0, 0.0, 1.0, 0.0], [2.0, 0.0, 1.0, 4.0], [0.0, 0.5, 1.0, 2.0]]])
+    triangles, source = clip_triangles(corners, PLANES)
+    assert set(source.tolist()) == {1}
+    # Атрибут линеен по x: 2 + x во всех новых вершинах
+    np.testing.assert_allclose(triangles[..., 3], 2.0 + triangles[..., 0])
+
+
+def test_near_plane_keeps_visible_side():
+    camera = Camera(position=Vector3(0, 0, -10), direction=Vector3(0, 0, 1), up_vector=Vector3(0, 1, 0),
+                    projection_type="perspective", fov=90, near=0.5, far=100)
+    # Точка сзади центра проекции, точка у ближней плоскости и точка перед камерой
+    vertices = np.array([[0.0, 0.0, -3.0], [0.3, 0.0, 2.0], [0.0, 0.4, 5.0]])
+    coordinates = clip_coordinates(vertices, camera)
+    planes = clip_planes(camera, 4.0)
+    triangles, _ = clip_triangles(coordinates[None], planes)
+    assert len(triangles) > 0
+    assert (plane_distances(triangles, planes) >= -1e-9).all()
+    assert (triangles[..., 2] > 0).all()
@@ -0,0 +1,60 @@
+# tests/test_depth.py
+"""Глубина в буфере кадра совпадает с глубиной точки, найденной трассировкой луча."""
+
+import numpy as np
+import pytest
+
+from bvh import SceneIndex
+from camera import Camera
+from light import Light
+from object import Cube
+from renderer import Renderer
+from scene import SceneNode
+from vector import Vector3
+
+
+def make_scene():
+    # Наклонённые пересекающиеся кубы: глубина сильно меняется вдоль граней
+    cube = Cube(size=3)
+    return [SceneNode(cube, position=(-1.0, 0.0, 6.0), rotation=(0.4, 0.9, 0.0)),
+            SceneNode(cube, position=(1.2, 0.5, 7.0), rotation=(0.2, -0.7, 0.3))]
+
+
+@pytest.mark.parametrize("projection, workers", [("perspective", 1), ("orthographic", 1), ("perspective", 2)])
+def test_depth_matches_raycast(projection, workers):
+    camera = Camera(position=Vector3(0, 0, -10), direction=Vector3(0, 0, 1), up_vector=Vector3(0, 1, 0),
+                    projection_type=projection, fov=90, near=0.1, far=100)
+    nodes = make_scene()
+    renderer = Renderer(30, 15, workers=workers, tile_size=16)
+    if renderer.tile_rasterizer is not None:
+        # Растеризация в процессах даже на одном ядре и для маленького кадра
+        renderer.tile_rasterizer.processes = workers
+        renderer.tile_rasterizer.min_area = 0
+    framebuffer = renderer.render_offscreen(nodes, camera, [Light(Vector3(0, 5, 0), color=(255, 255, 255))])
+    index = SceneIndex(nodes)
+    index.update()
+
+    rows, columns = np.nonzero(np.isfinite(framebuffer.depth))
+    assert len(rows) > 50
+    errors = []
+    for row, column in zip(rows.tolist(), columns.tolist()):
+        hit = index.raycast(*renderer.screen_ray(camera, column + 0.5, row + 0.5))
+        if hit is not None:
+            errors.append(abs(framebuffer.depth[row, column] - camera.depth(hit.point[None])[0]))
+    errors = np.sort(errors)
+    # Пиксели на силуэтах могут попасть в соседний треугольник; внутри граней глубина точна
+    assert len(errors) > 0.9 * len(rows)
+    assert errors[int(0.95 * len(errors))] < 1e-3
+    if renderer.tile_rasterizer is not None:
+        assert renderer.tile_rasterizer.frames_parallel == 1
+    renderer.close()
+
+
+def test_depth_plane_passes_through_projection_center():
+    camera = Camera(position=Vector3(1, 2, -10), direction=Vector3(0.3, 0, 1), up_vector=Vector3(0, 1, 0),
+                    projection_type="perspective", fov=60, near=0.1, far=100)
+    center = camera.projection_center()[:3]
+    assert camera.depth(center[None])[0] == pytest.approx(0.0, abs=1e-9)
+    # Глубина растёт на единицу при сдвиге на единицу вдоль нормали плоскости
+    normal = camera.depth_plane()[:3]
+    assert camera.depth((center + 2.5 * normal)[None])[0] == pytest.approx(2.5)
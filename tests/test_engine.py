@@ -0,0 +1,43 @@
+# tests/test_engine.py
+"""Engine.render рисует каждый узел иерархии один раз и не возвращает отсечённых BVH потомков."""
+
+from camera import Camera
+from engine import Engine
+from light import Light
+from object import Cube
+from renderer import Renderer
+from vector import Vector3
+
+
+def make_engine():
+    camera = Camera(position=Vector3(0, 0, -10), direction=Vector3(0, 0, 1), up_vector=Vector3(0, 1, 0),
+                    projection_type="perspective", fov=90, near=0.1, far=100)
+    renderer = Renderer(40, 20)
+    renderer.local_output = False
+    engine = Engine(renderer=renderer, camera=camera)
+    engine.add_light(Light(Vector3(0, 5, 0), color=(255, 255, 255)))
+    return engine
+
+
+def test_nested_nodes_are_drawn_once():
+    engine = make_engine()
+    cube = Cube(size=1.0)
+    parent = engine.add_object(cube, position=(0.0, 0.0, 5.0))
+    child = engine.add_object(cube, parent=parent, position=(1.5, 0.0, 0.0))
+    engine.add_object(cube, parent=child, position=(0.0, 1.5, 0.0))
+    engine.render()
+    stats = engine.renderer.frame_stats
+    assert (stats["objects"], stats["faces"]) == (3, 18)
+    engine.renderer.close()
+
+
+def test_child_outside_frustum_is_not_drawn():
+    engine = make_engine()
+    cube = Cube(size=1.0)
+    parent = engine.add_object(cube, position=(0.0, 0.0, 5.0))
+    engine.add_object(cube, parent=parent, position=(500.0, 0.0, 0.0))
+    engine.add_object(cube, parent=parent, position=(0.0, 1.5, 0.0))
+    engine.render()
+    stats = engine.renderer.frame_stats
+    assert (stats["objects"], stats["faces"]) == (2, 12)
+    engine.renderer.close()
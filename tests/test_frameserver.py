@@ -0,0 +1,141 @@
+# tests/test_frameserver.py
+"""FrameServer: рассылка кадров клиентам, пропуск кадров медленным клиентам и отключения.
+
+Оставшийся от прошлого запуска Unix-сокет заменяется, обычные файлы не удаляются.
+"""
+
+import os
+import socket
+import time
+
+import numpy as np
+import pytest
+
+from framebuffer import Framebuffer
+from frameserver import FrameServer
+from presenter import TerminalPresenter
+from renderer import Renderer
+
+
+def fill(framebuffer, seed, fraction=1.0):
+    """Меняет долю fraction клеток буфера кадра на случайные символы и цвета."""
+    rng = np.random.default_rng(seed)
+    changed = rng.random((framebuffer.height, framebuffer.width)) < fraction
+    count = int(changed.sum())
+    framebuffer.glyphs[changed] = rng.integers(1, len(Renderer.SYMBOLS), count)
+    framebuffer.colors[changed] = framebuffer.color_indices(rng.integers(0, 4, (count, 3)) * 80)
+
+
+def full_frame(framebuffer):
+    return TerminalPresenter(Renderer.SYMBOLS).encode(framebuffer).encode("utf-8")
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def receive(connection, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        assert chunk, "connection closed"
+        data += chunk
+    return bytes(data)
+
+
+def assert_nothing_more(connection):
+    connection.settimeout(0.2)
+    with pytest.raises(socket.timeout):
+        connection.recv(1)
+
+
+def test_refuses_to_replace_regular_file(tmp_path):
+    path = tmp_path / "frames"
+    path.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        FrameServer(str(path), Renderer.SYMBOLS)
+    assert path.read_text() == "keep me"
+
+
+def test_replaces_stale_socket(tmp_path):
+    path = str(tmp_path / "frames.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = FrameServer(path, Renderer.SYMBOLS)
+    server.close()
+    assert not os.path.exists(path)
+
+
+def test_broadcasts_full_frame_then_deltas():
+    framebuffer = Framebuffer(40, 12)
+    reference = TerminalPresenter(Renderer.SYMBOLS)
+    with FrameServer(":0", Renderer.SYMBOLS) as server:
+        clients = [socket.create_connection(server.address, timeout=5) for _ in range(2)]
+        wait_for(lambda: server.client_count == 2)
+
+        fill(framebuffer, 1)
+        server.publish(framebuffer)
+        first = reference.encode(framebuffer).encode("utf-8")
+        fill(framebuffer, 2, fraction=0.1)
+        server.publish(framebuffer)
+        delta = reference.encode(framebuffer).encode("utf-8")
+        assert len(delta) < len(first)
+
+        for client in clients:
+            assert receive(client, len(first) + len(delta)) == first + delta
+            assert_nothing_more(client)
+            client.close()
+        assert server.frames == 2 and server.frames_dropped == 0
+
+
+def test_slow_client_skips_to_newest_frame(tmp_path):
+    # Кадр намного больше буферов сокета: пока клиент не читает, первый кадр ждёт в очереди
+    framebuffer = Framebuffer(120, 60)
+    with FrameServer(str(tmp_path / "frames.sock"), Renderer.SYMBOLS, send_buffer=4096) as server:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(5)
+        client.connect(server.address)
+        wait_for(lambda: server.client_count == 1)
+
+        fill(framebuffer, 1)
+        server.publish(framebuffer)
+        first = full_frame(framebuffer)
+        for seed in (2, 3, 4):
+            fill(framebuffer, seed, fraction=0.2)
+            server.publish(framebuffer)
+        assert server.frames_dropped == 3
+
+        assert receive(client, len(first)) == first
+        wait_for(lambda: server.bytes_sent == len(first))
+        fill(framebuffer, 5, fraction=0.2)
+        server.publish(framebuffer)
+        # Пропущенные кадры не приходят: догнавший клиент получает новейший кадр целиком
+        newest = full_frame(framebuffer)
+        assert receive(client, len(newest)) == newest
+        assert_nothing_more(client)
+        assert server.frames == 5 and server.frames_dropped == 3
+        client.close()
+
+
+def test_disconnected_client_is_removed():
+    framebuffer = Framebuffer(20, 6)
+    fill(framebuffer, 1)
+    with FrameServer(":0", Renderer.SYMBOLS) as server:
+        leaving = socket.create_connection(server.address, timeout=5)
+        staying = socket.create_connection(server.address, timeout=5)
+        wait_for(lambda: server.client_count == 2)
+
+        leaving.close()
+        wait_for(lambda: server.client_count == 1)
+        server.publish(framebuffer)
+        frame = full_frame(framebuffer)
+        assert receive(staying, len(frame)) == frame
+
+        staying.close()
+        wait_for(lambda: server.client_count == 0)
+        server.publish(framebuffer)
+        assert server.frames == 2
@@ -0,0 +1,77 @@
+# tests/test_loader.py
+"""Разбор OBJ и STL и двоичный кэш сеток."""
+
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from loader import CACHE_SUFFIX, STL_RECORD, cache_path, load_mesh, read_cache
+
+OBJ = b"""# quad and triangle
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0 1.0
+vn 0 0 1
+f 1/1/1 2/2/1 3/3/1 4/4/1
+v 0 0 1
+f -1 1 2
+"""
+
+
+def write_obj(tmp_path, data=OBJ):
+    path = tmp_path / "mesh.obj"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_obj_polygons_and_negative_indices(tmp_path):
+    mesh = load_mesh(write_obj(tmp_path), cache=False)
+    np.testing.assert_array_equal(mesh.vertices[3], (0, 1, 0))
+    np.testing.assert_array_equal(np.asarray(mesh.faces), [[0, 1, 2], [0, 2, 3], [4, 0, 1]])
+
+
+def test_cache_is_written_and_reused(tmp_path):
+    path = write_obj(tmp_path)
+    first = load_mesh(path)
+    assert os.path.exists(path + CACHE_SUFFIX)
+    cached = read_cache(cache_path(path), os.stat(path))
+    assert isinstance(cached[0], np.memmap)
+    second = load_mesh(path)
+    np.testing.assert_array_equal(second.vertices, first.vertices)
+    np.testing.assert_array_equal(np.asarray(second.faces), np.asarray(first.faces))
+
+
+def test_stale_cache_is_rebuilt(tmp_path):
+    path = write_obj(tmp_path)
+    load_mesh(path)
+    with open(path, "ab") as f:
+        f.write(b"v 2 2 2\nf 1 2 6\n")
+    mesh = load_mesh(path)
+    assert len(mesh.vertices) == 6
+    assert len(read_cache(cache_path(path), os.stat(path))[1]) == 4
+
+
+def test_unwritable_cache_falls_back_to_parsed_mesh(tmp_path):
+    path = write_obj(tmp_path)
+    mesh = load_mesh(path, cache_dir=str(tmp_path / "missing"))
+    assert len(mesh.vertices) == 5
+    assert not os.path.exists(tmp_path / "missing")
+
+
+def test_malformed_face_raises(tmp_path):
+    with pytest.raises(ValueError):
+        load_mesh(write_obj(tmp_path, b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 x\n"), cache=False)
+
+
+def test_stl_merges_shared_vertices(tmp_path):
+    records = np.zeros(2, dtype=STL_RECORD)
+    records["vertices"] = [[[0, 0, 0], [1, 0, 0], [1, 1, 0]], [[0, 0, 0], [1, 1, 0], [0, 1, 0]]]
+    path = tmp_path / "mesh.stl"
+    path.write_bytes(b"\0" * 80 + struct.pack("<I", 2) + records.tobytes())
+    mesh = load_mesh(str(path), cache_dir=str(tmp_path))
+    assert len(mesh.vertices) == 4
+    assert len(np.asarray(mesh.faces)) == 2
+    assert os.path.exists(cache_path(str(path), str(tmp_path)))
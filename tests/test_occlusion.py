@@ -0,0 +1,48 @@
+# tests/test_occlusion.py
+"""Отсечение по пирамиде глубин не меняет кадр и действительно отбрасывает скрытое."""
+
+import numpy as np
+import pytest
+
+from camera import Camera
+from light import Light
+from object import Cube
+from occlusion import DepthPyramid
+from renderer import Renderer
+from scene import SceneNode
+from vector import Vector3
+
+
+def test_pyramid_keeps_farthest_depth_of_tiles():
+    depth = np.full((20, 30), np.inf, dtype=np.float32)
+    depth[:16, :16] = 2.0
+    depth[3, 5] = 4.0
+    pyramid = DepthPyramid(30, 20, tile_size=8)
+    pyramid.update(depth)
+    assert pyramid.occluding
+    hidden = pyramid.occluded([[1, 1], [1, 1], [10, 10], [20, 1]], [[6, 6], [6, 6], [14, 14], [25, 6]],
+                              [4.5, 3.5, 2.5, 100.0])
+    assert hidden.tolist() == [True, False, True, False]
+
+
+@pytest.mark.parametrize("projection, spacing", [("perspective", 3.0), ("orthographic", 1.0)])
+def test_occlusion_culling_keeps_image(projection, spacing):
+    camera = Camera(position=Vector3(0, 0, -10), direction=Vector3(0, 0, 1), up_vector=Vector3(0, 1, 0),
+                    projection_type=projection, fov=90, near=0.1, far=100)
+    # Слои сеток кубов друг за другом: ближний закрывает большую часть дальних
+    cube = Cube(size=spacing * 0.95)
+    nodes = [SceneNode(cube, position=(x * spacing, y * spacing, z), rotation=(0.1 * z, 0.1 * x, 0.0),
+                       color=(255, 100 + 20 * i, 100))
+             for i, z in enumerate((4.0, 9.0, 14.0)) for x in range(-2, 3) for y in range(-1, 2)]
+    lights = [Light(Vector3(-5, 3, 0), color=(255, 255, 255))]
+
+    frames = []
+    for occlusion_culling in (False, True):
+        renderer = Renderer(40, 20, occlusion_culling=occlusion_culling)
+        framebuffer = renderer.render_offscreen(nodes, camera, lights)
+        frames.append((framebuffer.depth.copy(), framebuffer.glyphs.copy(), dict(renderer.frame_stats)))
+        renderer.close()
+    (depth, glyphs, _), (culled_depth, culled_glyphs, stats) = frames
+    np.testing.assert_array_equal(culled_depth, depth)
+    np.testing.assert_array_equal(culled_glyphs, glyphs)
+    assert stats["objects_occluded"] + stats["triangles_occluded"] > 0
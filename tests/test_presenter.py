@@ -0,0 +1,87 @@
+# tests/test_presenter.py
+"""Разностный вывод TerminalPresenter: после каждого кадра экран совпадает с буфером кадра."""
+
+import io
+import re
+
+import numpy as np
+
+from framebuffer import Framebuffer
+from presenter import TerminalPresenter
+
+SYMBOLS = np.array(list(" .:-=+*#"), dtype=object)
+ESCAPE = re.compile(r"\033\[(?:(\d+);(\d+)H|38;2;(\d+);(\d+);(\d+)m|2J|\?25[lh]|0m)")
+
+
+class Screen:
+    """Минимальный терминал: перемещение курсора, 24-битный цвет текста и очистка экрана."""
+
+    def __init__(self, width, height):
+        self.chars = np.full((height + 1, width), " ", dtype=object)
+        self.colors = np.zeros((height + 1, width, 3), dtype=np.int64)
+        self.row = self.column = 0
+        self.color = (0, 0, 0)
+
+    def feed(self, text):
+        position = 0
+        for match in ESCAPE.finditer(text):
+            self._print(text[position:match.start()])
+            position = match.end()
+            if match.group(1):
+                self.row, self.column = int(match.group(1)) - 1, int(match.group(2)) - 1
+            elif match.group(3):
+                self.color = tuple(int(match.group(i)) for i in (3, 4, 5))
+            elif match.group(0) == "\033[2J":
+                self.chars[:] = " "
+        self._print(text[position:])
+
+    def _print(self, text):
+        for char in text:
+            self.chars[self.row, self.column] = char
+            self.colors[self.row, self.column] = self.color
+            self.column += 1
+
+
+def expected_screen(framebuffer):
+    palette = np.array([(0, 0, 0)] + framebuffer.palette[1:], dtype=np.int64)
+    return SYMBOLS[framebuffer.glyphs], palette[framebuffer.colors]
+
+
+def test_deltas_reproduce_every_frame():
+    rng = np.random.default_rng(4)
+    width, height = 30, 12
+    framebuffer = Framebuffer(width, height)
+    stream = io.StringIO()
+    presenter = TerminalPresenter(SYMBOLS, stream)
+    screen = Screen(width, height)
+    glyphs = np.zeros((height, width), dtype=np.uint8)
+    colors = np.zeros((height, width, 3), dtype=np.int64)
+    sizes = []
+    for index in range(10):
+        # Меняется небольшая часть клеток; пустые клетки сохраняют прежний цвет на экране
+        changed = rng.random((height, width)) < (1.0 if index == 0 else 0.1)
+        glyphs[changed] = rng.integers(1, len(SYMBOLS), changed.sum())
+        colors[changed] = rng.integers(0, 3, (changed.sum(), 3)) * 100
+        framebuffer.clear()
+        framebuffer.glyphs[:] = glyphs
+        framebuffer.colors[:] = framebuffer.color_indices(colors.reshape(-1, 3)).reshape(height, width)
+
+        start = stream.tell()
+        sizes.append(presenter.present(framebuffer))
+        screen.feed(stream.getvalue()[start:])
+        chars, rgb = expected_screen(framebuffer)
+        np.testing.assert_array_equal(screen.chars[:height], chars)
+        np.testing.assert_array_equal(screen.colors[:height], rgb)
+    # Разность заметно меньше полного кадра
+    assert max(sizes[1:]) < sizes[0] / 2
+
+
+def test_unchanged_frame_sends_nothing_and_invalidate_redraws():
+    framebuffer = Framebuffer(8, 4)
+    framebuffer.glyphs[1, 2] = 3
+    framebuffer.colors[1, 2] = framebuffer.color_index((10, 20, 30))
+    presenter = TerminalPresenter(SYMBOLS, io.StringIO())
+    first = presenter.present(framebuffer)
+    assert presenter.present(framebuffer) == 0
+    presenter.invalidate()
+    assert presenter.present(framebuffer) == first
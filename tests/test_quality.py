@@ -0,0 +1,111 @@
+# tests/test_quality.py
+"""Переходы QualityController: выбор настройки по стадиям, гистерезис и отсрочка возврата."""
+
+from quality import QualityController
+
+
+class FakeRenderer:
+    def __init__(self):
+        self.stage_times = {}
+        self.render_scale = 1.0
+        self.detail_scale = 1.0
+        self.max_lights = None
+        self.specular = True
+
+    def set_render_scale(self, scale):
+        self.render_scale = scale
+
+
+def make_controller(**options):
+    renderer = FakeRenderer()
+    options = dict(dict(degrade_frames=2, upgrade_frames=3, cooldown=0, smoothing=1.0), **options)
+    return renderer, QualityController(renderer, 0.1, **options)
+
+
+def run(controller, frame_time, frames):
+    for _ in range(frames):
+        controller.update(frame_time)
+    return controller.level
+
+
+def test_degrades_knob_of_dominant_stage():
+    renderer, controller = make_controller()
+    renderer.stage_times = {"raster": 0.01, "shade": 0.15, "project": 0.02}
+    assert run(controller, 0.2, 2) == 1
+    assert (renderer.max_lights, renderer.specular) == (None, False)
+    assert (renderer.render_scale, renderer.detail_scale) == (1.0, 1.0)
+
+    renderer.stage_times = {"raster": 0.15, "shade": 0.01}
+    run(controller, 0.2, 2)
+    assert renderer.render_scale == 0.75
+
+    renderer.stage_times = {"transform": 0.1, "normals": 0.1, "raster": 0.05}
+    run(controller, 0.2, 2)
+    assert renderer.detail_scale == 0.75
+
+
+def test_exhausted_knob_falls_back_to_next_costliest():
+    renderer, controller = make_controller()
+    renderer.stage_times = {"raster": 0.15, "shade": 0.05}
+    run(controller, 0.2, 2 * 3)
+    assert renderer.render_scale == 0.35
+    run(controller, 0.2, 2)
+    assert renderer.specular is False and renderer.render_scale == 0.35
+
+
+def test_upgrade_reverts_last_degrade_after_margin():
+    renderer, controller = make_controller()
+    renderer.stage_times = {"shade": 0.15}
+    run(controller, 0.2, 2)
+    renderer.stage_times = {"raster": 0.15}
+    run(controller, 0.2, 2)
+    assert controller.level == 2
+    # В зоне гистерезиса между upgrade_ratio * budget и budget ничего не меняется
+    assert run(controller, 0.08, 10) == 2
+    assert run(controller, 0.03, 3) == 1
+    assert renderer.render_scale == 1.0 and renderer.specular is False
+    assert run(controller, 0.03, 3) == 0
+    assert renderer.specular is True
+
+
+def test_backoff_only_after_oscillation():
+    renderer, controller = make_controller()
+    renderer.stage_times = {"shade": 0.15}
+    run(controller, 0.2, 2)
+    # Первое понижение не откладывает возврат
+    assert run(controller, 0.03, 3) == 0
+    # Понижение сразу после повышения удваивает ожидание возврата
+    run(controller, 0.2, 2)
+    assert controller.level == 1
+    assert run(controller, 0.03, 3) == 1
+    assert run(controller, 0.03, 3) == 0
+    run(controller, 0.2, 2)
+    assert run(controller, 0.03, 11) == 1
+    assert run(controller, 0.03, 1) == 0
+
+
+def test_set_level_zero_restores_best_quality():
+    renderer, controller = make_controller()
+    renderer.stage_times = {"raster": 0.15}
+    run(controller, 0.2, 4)
+    assert controller.level == 2
+    controller.set_level(0)
+    assert controller.level == 0 and renderer.render_scale == 1.0
+
+
+def test_preconfigured_settings_are_the_ceiling():
+    renderer = FakeRenderer()
+    renderer.render_scale, renderer.detail_scale = 0.5, 0.6
+    renderer.max_lights, renderer.specular = 2, False
+    controller = QualityController(renderer, 0.1, degrade_frames=2, upgrade_frames=3, cooldown=0, smoothing=1.0)
+    assert (renderer.render_scale, renderer.detail_scale, renderer.max_lights, renderer.specular) == (0.5, 0.6, 2, False)
+    assert controller.max_level == 1 + 1 + 3
+
+    renderer.stage_times = {"raster": 0.15}
+    run(controller, 0.2, 2)
+    assert renderer.render_scale == 0.35
+    controller.set_level(controller.max_level)
+    assert (renderer.render_scale, renderer.detail_scale, renderer.max_lights) == (0.35, 0.25, 1)
+
+    controller.set_level(0)
+    assert (renderer.render_scale, renderer.detail_scale, renderer.max_lights, renderer.specular) == (0.5, 0.6, 2, False)
@@ -0,0 +1,77 @@
+# tests/test_recording.py
+"""Запись кадров и воспроизведение: кадры восстанавливаются точно при любом порядке чтения."""
+
+import numpy as np
+import pytest
+
+from framebuffer import Framebuffer
+from recording import Player, Recorder
+
+SYMBOLS = list(" .:-=+*#")
+
+
+def make_frames(count, width=24, height=10):
+    """Кадры со случайными символами, глубиной и растущей палитрой; раз в пять кадров палитра сбрасывается."""
+    rng = np.random.default_rng(3)
+    framebuffer = Framebuffer(width, height)
+    for index in range(count):
+        if index % 5 == 4:
+            framebuffer.palette_version += 1
+            framebuffer.palette = [None]
+            framebuffer._palette_index = {}
+        framebuffer.clear()
+        ys, xs = np.nonzero(rng.random((height, width)) < 0.4)
+        colors = framebuffer.color_indices(rng.integers(0, 4, (len(ys), 3)) * 60 + index)
+        framebuffer.write(ys, xs, rng.random(len(ys)).astype(np.float32),
+                          rng.integers(1, len(SYMBOLS), len(ys)), colors)
+        yield index, framebuffer
+
+
+def snapshot(frame):
+    palette = np.array([(0, 0, 0)] + frame.palette[1:], dtype=np.int64)
+    return frame.glyphs.copy(), palette[frame.colors], None if frame.depth is None else frame.depth.copy()
+
+
+def assert_same(frame, expected):
+    glyphs, colors, depth = snapshot(frame)
+    np.testing.assert_array_equal(glyphs, expected[0])
+    np.testing.assert_array_equal(colors, expected[1])
+    if expected[2] is not None:
+        np.testing.assert_array_equal(depth, expected[2])
+
+
+@pytest.mark.parametrize("depth", [False, True])
+def test_round_trip_with_seeking(tmp_path, depth):
+    path = tmp_path / "frames.rec"
+    expected = []
+    with Recorder(str(path), 24, 10, SYMBOLS, depth=depth, keyframe_interval=3) as recorder:
+        for index, framebuffer in make_frames(12):
+            recorder.record(framebuffer, timestamp=index * 0.1)
+            glyphs, colors, planes_depth = snapshot(framebuffer)
+            expected.append((glyphs, colors, planes_depth if depth else None))
+
+    with Player(str(path)) as player:
+        assert len(player) == 12 and player.has_depth == depth
+        assert "".join(player.symbols) == "".join(SYMBOLS)
+        for index, frame in enumerate(player):
+            assert_same(frame, expected[index])
+        # Назад, вперёд через опорные кадры и по времени
+        for index in (7, 2, 11, 0, 5, 6):
+            assert_same(player.frame(index), expected[index])
+        assert player.seek_time(0.45).index == 4
+        with pytest.raises(IndexError):
+            player.frame(12)
+
+
+def test_truncated_recording_is_readable(tmp_path):
+    path = tmp_path / "frames.rec"
+    with Recorder(str(path), 24, 10, SYMBOLS, keyframe_interval=4) as recorder:
+        for index, framebuffer in make_frames(6):
+            recorder.record(framebuffer, timestamp=float(index))
+            if index == 4:
+                expected = snapshot(framebuffer)[:2] + (None,)
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    with Player(str(path)) as player:
+        assert len(player) == 5
+        assert_same(player.frame(4), expected)
@@ -0,0 +1,27 @@
+# tests/test_scene.py
+"""Узлы сцены разделяют геометрию, не меняя массивы вызывающего кода."""
+
+import numpy as np
+import pytest
+
+from object import Object3D
+from scene import SceneNode
+
+
+def test_node_does_not_freeze_callers_vertices():
+    vertices = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    geometry = Object3D(vertices, [(0, 1, 2)], (255, 255, 255))
+    SceneNode(geometry, position=(1, 2, 3))
+    vertices[0] = (5.0, 5.0, 5.0)  # Массив вызывающего остаётся изменяемым
+    with pytest.raises(ValueError):
+        geometry.vertices[0] = (0.0, 0.0, 0.0)
+
+
+def test_replacing_vertices_rebuilds_mesh():
+    geometry = Object3D(np.eye(3), [(0, 1, 2)], (255, 255, 255))
+    node = SceneNode(geometry, position=(0, 0, 1))
+    normals = geometry.mesh().face_normals.copy()
+    geometry.transform(np.diag([1.0, 1.0, -1.0, 1.0]))
+    assert not geometry.vertices.flags.writeable
+    np.testing.assert_allclose(node.world_vertices()[:, 2], [1.0, 1.0, 0.0])
+    assert not np.allclose(geometry.mesh().face_normals, normals)
@@ -147,9 +147,51 @@ class Matrix4:
             [0, 0, 0, 1]
         ])
 
+    def transform_points(self, points):
+        """Применяет матрицу ко всем точкам массива (N, 3) одним умножением."""
+        return transform_points(self.values, points)
+
     def __repr__(self):
         return f"Matrix4({self.values})"
 
+
+def transform_points(matrix, points):
+    """Аффинно преобразует массив точек (N, 3) матрицей 4x4 (Matrix4 или ndarray).
+
+    Эквивалентно `matrix * Vector3` для каждой точки, но без создания объектов.
+    """
+    if isinstance(matrix, Matrix4):
+        matrix = matrix.values
+    matrix = np.asarray(matrix, dtype=np.float64)
+    points = np.asarray(points, dtype=np.float64)
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def normal_matrix(matrix):
+    """Матрица нормалей 3x3 (или пачка (..., 3, 3)) для матриц 4x4 (..., 4, 4).
+
+    Это присоединённая (союзная) матрица линейной части, транспонированная: её столбцы —
+    попарные векторные произведения столбцов. Она равна обратной транспонированной,
+    умноженной на определитель, поэтому нормали после умножения нужно нормировать,
+    зато вырожденный масштаб не даёт деления на ноль.
+    """
+    linear = np.asarray(matrix, dtype=np.float64)[..., :3, :3]
+    # Столбцы (a1, a2, a0) x (a2, a0, a1) покомпонентно: np.cross на матрицах 3x3 заметно медленнее
+    u = linear[..., [1, 2, 0]]
+    v = linear[..., [2, 0, 1]]
+    return u[..., [1, 2, 0], :] * v[..., [2, 0, 1], :] - u[..., [2, 0, 1], :] * v[..., [1, 2, 0], :]
+
+
+def transform_normals(matrix, normals):
+    """Переводит единичные нормали (N, 3) матрицей нормалей 3x3 и нормирует их.
+
+    Нормали NaN (грани без нормали) остаются NaN.
+    """
+    normals = np.asarray(normals, dtype=np.float64) @ np.asarray(matrix).T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+    return normals
+
 class Color:
     def __init__(self, r=255, g=255, b=255):
         self.r = max(0, min(255, r))  # Ограничиваем значения от 0 до 255